@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+# Build the LLM client once, before the first request arrives
+from problems import llm  # noqa: E402
+
+llm.warm_up()
@@ -52,6 +52,8 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    # ETag from the body for views that don't set their own validators
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -77,6 +79,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+ASGI_APPLICATION = 'backend.asgi.application'
 
 
 # Database
@@ -139,3 +142,137 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# LLM provider
+# 'gemini' calls the Gemini API with API_KEY; 'fake' returns deterministic
+# offline responses after LLM_FAKE_LATENCY seconds and fails with
+# probability LLM_FAKE_ERROR_RATE, for load tests and local development.
+
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'gemini')
+LLM_MODEL = os.getenv('LLM_MODEL', 'gemini-1.5-flash')
+GEMINI_API_KEY = os.getenv('API_KEY')
+LLM_WARMUP = os.getenv('LLM_WARMUP', 'True') == 'True'
+LLM_FAKE_LATENCY = float(os.getenv('LLM_FAKE_LATENCY', 0))
+LLM_FAKE_ERROR_RATE = float(os.getenv('LLM_FAKE_ERROR_RATE', 0))
+LLM_FAKE_SEED = int(os.getenv('LLM_FAKE_SEED', 0))
+
+
+# Gemini generation cache
+# Entries older than the TTL (seconds) are treated as misses; once the table
+# grows past MAX_ENTRIES the least recently used rows are evicted.
+
+GENERATION_CACHE_TTL = int(os.getenv('GENERATION_CACHE_TTL', 60 * 60 * 24 * 7))
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv('GENERATION_CACHE_MAX_ENTRIES', 5000))
+
+# Estimated input tokens allowed per prompt; longer descriptions are trimmed
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', 4000))
+
+
+# Bulk generation
+# Defaults match the Gemini 1.5 Flash free tier (15 requests per minute).
+
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 15))
+GENERATION_CONCURRENCY = int(os.getenv('GENERATION_CONCURRENCY', 4))
+# Batched prompts (generate_all_test_cases/run_generation_workers --batch):
+# estimated input tokens and problems per model call
+GENERATION_BATCH_TOKEN_BUDGET = int(os.getenv('GENERATION_BATCH_TOKEN_BUDGET', 16000))
+GENERATION_BATCH_MAX_PROBLEMS = int(os.getenv('GENERATION_BATCH_MAX_PROBLEMS', 5))
+
+# Concurrent generations for the same prompt wait for the first one instead
+# of calling Gemini again. Waiters in other processes poll the cache every
+# POLL_INTERVAL seconds and give up after TIMEOUT seconds.
+
+SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv('SINGLE_FLIGHT_POLL_INTERVAL', 0.25))
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT', 60))
+
+
+# NeetCode scraper
+# Each worker keeps one headless Chrome alive and restarts it after
+# MAX_PAGES_PER_DRIVER pages to keep memory in check.
+
+SCRAPER_WORKERS = int(os.getenv('SCRAPER_WORKERS', 2))
+SCRAPER_MAX_PAGES_PER_DRIVER = int(os.getenv('SCRAPER_MAX_PAGES_PER_DRIVER', 50))
+# scrape_all_neetcode skips problems scraped within this many hours
+SCRAPER_MAX_AGE_HOURS = float(os.getenv('SCRAPER_MAX_AGE_HOURS', 20))
+# Scraped problems are upserted in batches of BATCH_SIZE, or whatever has
+# accumulated after FLUSH_INTERVAL seconds
+SCRAPER_BATCH_SIZE = int(os.getenv('SCRAPER_BATCH_SIZE', 50))
+SCRAPER_FLUSH_INTERVAL = float(os.getenv('SCRAPER_FLUSH_INTERVAL', 30))
+
+# 'auto' fetches pages over plain HTTP and only starts Chrome when the
+# expected fields are missing; 'http' and 'selenium' force one backend.
+# NEETCODE_URL can point at a local fixture server, e.g.
+# http://localhost:8001/{slug}.html
+
+SCRAPER_BACKEND = os.getenv('SCRAPER_BACKEND', 'auto')
+SCRAPER_HTTP_TIMEOUT = float(os.getenv('SCRAPER_HTTP_TIMEOUT', 15))
+NEETCODE_URL = os.getenv('NEETCODE_URL', 'https://neetcode.io/problems/{slug}')
+
+# Problem listing
+# Keyset-paginated by id; clients ask for up to MAX_PAGE_SIZE rows with ?limit=
+
+PROBLEM_PAGE_SIZE = int(os.getenv('PROBLEM_PAGE_SIZE', 50))
+PROBLEM_MAX_PAGE_SIZE = int(os.getenv('PROBLEM_MAX_PAGE_SIZE', 200))
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', 20))
+
+# Cache-Control per endpoint (URL name). Problem and test case responses
+# carry ETag/Last-Modified, so 'no-cache' still lets clients revalidate
+# with a cheap 304.
+
+CACHE_CONTROL = {
+    'problems': os.getenv('CACHE_CONTROL_PROBLEMS', 'public, max-age=60'),
+    'problem_detail': os.getenv('CACHE_CONTROL_PROBLEM_DETAIL', 'public, max-age=300'),
+    'generate_test_case': os.getenv('CACHE_CONTROL_GENERATE_TEST_CASE', 'no-cache'),
+    'search': os.getenv('CACHE_CONTROL_SEARCH', 'public, max-age=60'),
+    'test_case_download': os.getenv('CACHE_CONTROL_TEST_CASE_DOWNLOAD', 'public, max-age=86400'),
+    'generation_job': os.getenv('CACHE_CONTROL_GENERATION_JOB', 'no-store'),
+}
+
+# Test case payloads
+# Inputs/outputs larger than INLINE_MAX_BYTES are stored gzipped and
+# content-addressed in the 'testcase_blobs' storage instead of the row.
+# Point TEST_CASE_BLOB_DIR at shared disk, or swap the backend for object
+# storage, when running more than one host.
+
+TEST_CASE_INLINE_MAX_BYTES = int(os.getenv('TEST_CASE_INLINE_MAX_BYTES', 64 * 1024))
+# Largest array (or total string length) a generator spec may expand to
+GENERATOR_MAX_ELEMENTS = int(os.getenv('GENERATOR_MAX_ELEMENTS', 1_000_000))
+# Estimated Jaccard similarity (MinHash) above which a test case is
+# flagged as a near duplicate of another case of its problem
+TEST_CASE_NEAR_DUPLICATE_THRESHOLD = float(os.getenv('TEST_CASE_NEAR_DUPLICATE_THRESHOLD', 0.8))
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'testcase_blobs': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': os.getenv('TEST_CASE_BLOB_DIR', str(BASE_DIR / 'testcase_blobs'))},
+    },
+}
+
+# Reference solution sandbox
+# Expected outputs are computed by running the problem's Python solution
+# in SANDBOX_WORKERS worker processes, each case limited to CPU_SECONDS of
+# CPU, WALL_SECONDS overall and MEMORY_MB of address space. When enabled,
+# the model is only asked for inputs.
+
+SANDBOX_ENABLED = os.getenv('SANDBOX_ENABLED', 'True') == 'True'
+SANDBOX_WORKERS = int(os.getenv('SANDBOX_WORKERS', 2))
+SANDBOX_CPU_SECONDS = int(os.getenv('SANDBOX_CPU_SECONDS', 5))
+SANDBOX_WALL_SECONDS = float(os.getenv('SANDBOX_WALL_SECONDS', 10))
+SANDBOX_MEMORY_MB = int(os.getenv('SANDBOX_MEMORY_MB', 1024))
+
+# Generation job queue
+# generate-test-case/<slug>/ queues a GenerationJob and answers 202 with
+# its id; `manage.py run_generation_workers` runs the jobs. Set
+# GENERATION_QUEUE=False to generate inline in the request instead.
+
+GENERATION_QUEUE = os.getenv('GENERATION_QUEUE', 'True') == 'True'
+GENERATION_JOB_MAX_ATTEMPTS = int(os.getenv('GENERATION_JOB_MAX_ATTEMPTS', 3))
+# Seconds a worker may hold a job before another worker can take it over
+GENERATION_JOB_LEASE_SECONDS = int(os.getenv('GENERATION_JOB_LEASE_SECONDS', 600))
+# First retry delay in seconds, doubled on every further attempt
+GENERATION_JOB_RETRY_DELAY = float(os.getenv('GENERATION_JOB_RETRY_DELAY', 30))
+# Priority of jobs queued by API requests; bulk runs queue at 0
+GENERATION_JOB_INTERACTIVE_PRIORITY = int(os.getenv('GENERATION_JOB_INTERACTIVE_PRIORITY', 10))
@@ -4,15 +4,56 @@ from django.contrib import admin
 # backend/problems/admin.py
 
 from django.contrib import admin
-from .models import Problem, TestCase
+from . import search
+from .models import Problem, Solution, TestCase, GenerationCache, GenerationJob
+
+class FullTextSearchMixin:
+    # Use the full-text index instead of ILIKE '%term%' over search_fields
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search.matching(queryset, search_term), False
+
+class SolutionInline(admin.TabularInline):
+    model = Solution
+    extra = 0
 
 @admin.register(Problem)
-class ProblemAdmin(admin.ModelAdmin):
+class ProblemAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'difficulty')
+    list_filter = ('difficulty',)
     search_fields = ('title', 'description')
+    inlines = [SolutionInline]
 
 @admin.register(TestCase)
-class TestCaseAdmin(admin.ModelAdmin):
-    list_display = ('problem', 'difficulty')
+class TestCaseAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    list_display = ('problem', 'tier', 'input_size', 'expected_output_size')
     search_fields = ('input_data', 'expected_output')
-    list_filter = ('difficulty',)
+    # Set by testcases.set_payload; blob-stored payloads have an empty text field
+    readonly_fields = (
+        'input_size', 'input_sha256', 'input_external',
+        'expected_output_size', 'expected_output_sha256', 'expected_output_external',
+        'expected_output_verified', 'content_hash', 'near_duplicate',
+    )
+    exclude = ('minhash',)
+    list_filter = ('tier', 'expected_output_verified', 'near_duplicate')
+    # problem is shown (and used by __str__) on every row: join it once
+    list_select_related = ('problem',)
+    # A <select> of every problem on the change form, and an exact
+    # COUNT(*) of a table with millions of rows, are both too slow
+    raw_id_fields = ('problem',)
+    show_full_result_count = False
+
+@admin.register(GenerationCache)
+class GenerationCacheAdmin(admin.ModelAdmin):
+    list_display = ('key', 'model_name', 'hit_count', 'created_at', 'last_accessed')
+    list_filter = ('model_name',)
+    readonly_fields = ('created_at', 'last_accessed')
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'problem', 'language', 'status', 'priority', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'language')
+    list_select_related = ('problem',)
+    raw_id_fields = ('problem',)
+    readonly_fields = ('locked_by', 'locked_until', 'created_at', 'started_at', 'finished_at')
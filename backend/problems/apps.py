@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def repair_search_indexes(sender, using, **kwargs):
+    # SQLite drops the FTS triggers whenever a migration rebuilds a table
+    from django.db import connections
+    from .search import install
+
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and 'problems_problem' in connection.introspection.table_names():
+        install(connection)
 
 
 class ProblemsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'problems'
+
+    def ready(self):
+        post_migrate.connect(repair_search_indexes, sender=self)
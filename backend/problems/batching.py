@@ -0,0 +1,192 @@
+# backend/problems/batching.py
+
+import json
+import logging
+
+from django.conf import settings
+
+from . import cache, llm, metrics
+from .api import format_prompt, generate_and_store_test_cases, get_problem_data
+from .models import Problem
+from .prompts import enforce_budget, estimate_tokens, language_name
+from .testcases import (
+    GENERATION_CONFIG, INPUT_INSTRUCTIONS, JSON_INSTRUCTIONS, MissingExpectedOutputs, TestCaseParseError,
+    parse_test_cases, store_test_cases,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bulk generation packs several problems into one prompt, up to
+# GENERATION_BATCH_TOKEN_BUDGET and GENERATION_BATCH_MAX_PROBLEMS, and asks
+# for one JSON object keyed by "slug/language". Each problem's part is
+# validated and stored on its own, and also cached under that problem's
+# single-problem prompt, so later requests for it hit the cache. A problem
+# missing from the response, or whose part doesn't parse, is retried alone;
+# one the reference solution left without outputs is asked for them too.
+# A quota error (llm.QuotaExceeded) fails everything not yet generated
+# instead, so a rate-limited provider isn't asked once per problem.
+
+BATCH_INSTRUCTIONS = """
+    Respond with JSON only: one object with a key for every "Problem key" above, each mapped to that
+    problem's answer, e.g. {"two-sum/python": {"test_cases": [...]}, "valid-anagram/python": {"test_cases": [...]}}.
+    Each problem's answer follows these rules:
+    """
+
+
+def render_section(label, problem_data):
+    return f"""
+    Problem key: {label}
+    Title: {problem_data['title']}
+    Difficulty: {problem_data['difficulty']}
+    Description: {problem_data['description']}
+
+    Here is a {language_name(problem_data['language'])} solution to the problem:
+    {problem_data['solution']}
+    """
+
+
+def render_batch_prompt(sections, inputs_only):
+    return f"""
+    You are a highly capable coding assistant. Your task is to generate comprehensive test cases for each of the following {len(sections)} problems.
+    {''.join(sections)}
+    For every problem, provide a comprehensive test case with {'inputs' if inputs_only else 'inputs and expected outputs'}. Return one easy test case where it is simple and short, one of medium size where it gets a little bit more complex
+    then return a super complex test case, advanced and pretty long relative to the problem, also provide two edge cases that the problem can have for a total of 5 test cases.
+    """ + BATCH_INSTRUCTIONS + (INPUT_INSTRUCTIONS if inputs_only else JSON_INSTRUCTIONS)
+
+
+def pack(entries, budget=None, max_problems=None):
+    """
+    Group entries (dicts with "section", "tokens" and "inputs_only") into
+    batches that fit the token budget, in order. Problems that take
+    outputs and ones that don't need different instructions, so they are
+    never mixed.
+    """
+    budget = budget or settings.GENERATION_BATCH_TOKEN_BUDGET
+    max_problems = max_problems or settings.GENERATION_BATCH_MAX_PROBLEMS
+    overhead = estimate_tokens(render_batch_prompt([], True))
+    batches = []
+    for inputs_only in (True, False):
+        batch, tokens = [], overhead
+        for entry in entries:
+            if entry["inputs_only"] != inputs_only:
+                continue
+            if batch and (tokens + entry["tokens"] > budget or len(batch) >= max_problems):
+                batches.append(batch)
+                batch, tokens = [], overhead
+            batch.append(entry)
+            tokens += entry["tokens"]
+        if batch:
+            batches.append(batch)
+    return batches
+
+
+def split_response(text):
+    """{problem key: that problem's part as JSON text} from a batch response."""
+    try:
+        payload = json.loads(text)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise TestCaseParseError(f"Batch response is not valid JSON: {e}")
+    if not isinstance(payload, dict):
+        raise TestCaseParseError("Batch response is not an object keyed by problem.")
+    return {label: json.dumps(part) for label, part in payload.items()}
+
+
+def _store(entry, text):
+    return store_test_cases(entry["problem"], parse_test_cases(text))
+
+
+def _run_batch(provider, batch, use_cache, results, failed):
+    prompt = render_batch_prompt([entry["section"] for entry in batch], batch[0]["inputs_only"])
+    try:
+        with metrics.span("generate_content"):
+            parts = split_response(provider.generate(prompt, GENERATION_CONFIG))
+    except llm.QuotaExceeded:
+        raise
+    except Exception as e:
+        logger.warning(f"Batch of {len(batch)} problems failed, retrying them one by one: {e}")
+        failed.extend(batch)
+        return
+
+    for entry in batch:
+        part = parts.get(entry["label"])
+        try:
+            if part is None:
+                raise TestCaseParseError("Missing from the batch response.")
+            results[entry["item"]] = _store(entry, part)
+        except Exception as e:
+            logger.warning(f"Batched generation for {entry['label']} failed, retrying alone: {e}")
+            failed.append({**entry, "with_outputs": isinstance(e, MissingExpectedOutputs)})
+            continue
+        if use_cache:
+            cache.set(entry["key"], provider.model_name, part)
+
+
+def generate_and_store_many(items, use_cache=True, acquire=None):
+    """
+    Generate and store test cases for several problems; items are
+    (slug, language, refresh). Those without a cached response share
+    batched model calls. acquire, if given, is called before every model
+    call (e.g. a rate limiter's). Returns {(slug, language): [TestCase, ...]
+    or the exception that stopped that problem}.
+    """
+    acquire = acquire or (lambda: None)
+    provider = llm.get_provider()
+    results = {}
+    pending = {}
+    failed = []
+
+    for slug, language, refresh in items:
+        item = (slug, language)
+        if item in results or item in pending:
+            continue
+        problem = Problem.objects.filter(slug=slug).first()
+        if problem is None:
+            results[item] = Problem.DoesNotExist(f"Problem with slug '{slug}' not found.")
+            continue
+        problem_data = get_problem_data(slug, language)
+        label = f"{slug}/{language}"
+        entry = {
+            "item": item, "label": label, "problem": problem, "refresh": refresh,
+            "inputs_only": problem_data["inputs_only"],
+            # The single-problem prompt's cache key, shared with api.generate_test_case
+            "key": cache.make_key(format_prompt(problem_data), provider.model_name, GENERATION_CONFIG),
+            "section": enforce_budget(lambda data: render_section(label, data), problem_data),
+        }
+        entry["tokens"] = estimate_tokens(entry["section"])
+
+        cached = cache.get(entry["key"]) if use_cache and not refresh else None
+        if cached is None:
+            pending[item] = entry
+            continue
+        try:
+            results[item] = _store(entry, cached)
+        except Exception as e:
+            logger.warning(f"Cached response for {label} failed, regenerating: {e}")
+            failed.append({**entry, "refresh": True, "with_outputs": isinstance(e, MissingExpectedOutputs)})
+
+    try:
+        for batch in pack(list(pending.values())):
+            if len(batch) == 1:
+                # Nothing to share the call with; the single-problem path is the same cost
+                failed.extend(batch)
+                continue
+            acquire()
+            _run_batch(provider, batch, use_cache, results, failed)
+
+        for entry in failed:
+            slug, language = entry["item"]
+            try:
+                results[entry["item"]] = generate_and_store_test_cases(
+                    slug, use_cache=use_cache, refresh=entry["refresh"], language=language, acquire=acquire,
+                    with_outputs=entry.get("with_outputs", False),
+                )
+            except llm.QuotaExceeded:
+                raise
+            except Exception as e:
+                results[entry["item"]] = e
+    except llm.QuotaExceeded as e:
+        # Asking again per problem would only spend more of the quota
+        logger.warning(f"Provider quota exceeded, failing the problems not yet generated: {e}")
+        for entry in [*pending.values(), *failed]:
+            results.setdefault(entry["item"], e)
+    return results
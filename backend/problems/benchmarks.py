@@ -0,0 +1,139 @@
+# backend/problems/benchmarks.py
+
+import asyncio
+import glob
+import os
+import statistics
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from django.test import AsyncClient
+from lxml import html as lxml_html
+
+from .scraper import build_problem, fetch_problem, parse_problem_html, save_problems
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures' / 'neetcode'
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(directory=FIXTURES_DIR):
+    """Serve saved NeetCode pages on a random local port; returns (server, url_template)."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=str(directory)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/{{slug}}.html"
+
+
+def fixture_slugs(directory=FIXTURES_DIR):
+    return sorted(Path(page).stem for page in glob.glob(os.path.join(directory, '*.html')))
+
+
+def rendered_fixture(slug, directory=FIXTURES_DIR):
+    """
+    A fixture page extracted as the browser sees it once the Solution tab
+    is open: the solution markup the page only inserts client-side is
+    parsed too.
+    """
+    content = (Path(directory) / f'{slug}.html').read_bytes()
+    page = parse_problem_html(content)
+    template = lxml_html.fromstring(content).xpath('//script[@id="solution-tab"]')
+    if template:
+        page['solutions'] = parse_problem_html(template[0].text)['solutions']
+    return page
+
+
+def summarize(latencies, elapsed):
+    """Latency percentiles in milliseconds plus throughput for one benchmark run."""
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'count': len(latencies),
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p95_ms': round(cuts[94] * 1000, 3),
+        'p99_ms': round(cuts[98] * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'throughput_per_s': round(len(latencies) / elapsed, 2),
+    }
+
+
+def bench_scrape(url_template, slugs, rounds):
+    """
+    Per-page wall and CPU time of the HTTP scrape path. Returns (report,
+    scraped data); like real pages, the fixtures yield no solutions here.
+    """
+    latencies = []
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    scraped = []
+    for _ in range(rounds):
+        for slug in slugs:
+            page_start = time.perf_counter()
+            scraped.append(build_problem(slug, fetch_problem(slug, url=url_template.format(slug=slug))))
+            latencies.append(time.perf_counter() - page_start)
+    elapsed = time.perf_counter() - start
+    report = summarize(latencies, elapsed)
+    report['cpu_ms_per_page'] = round((time.process_time() - cpu_start) * 1000 / len(latencies), 3)
+    return report, scraped[:len(slugs)]
+
+
+def bench_db_writes(problems, batch_size, batches):
+    """
+    Time save_problems on batches of synthetic problems cloned from the
+    fixtures: first as inserts, then again unchanged, then with new content.
+    """
+    def make_batch(batch_no, revision):
+        return [
+            {**data, 'slug': f"{data['slug']}-bench-{batch_no}-{i}",
+             'title': f"{data['title']} ({batch_no}-{i})",
+             'description': data['description'] + ' ' * revision}
+            for i, data in enumerate(problems * (batch_size // len(problems) + 1))
+        ][:batch_size]
+
+    report = {}
+    for phase, revision in (('insert', 0), ('unchanged', 0), ('update', 1)):
+        latencies = []
+        start = time.perf_counter()
+        for batch_no in range(batches):
+            batch = make_batch(batch_no, revision)
+            batch_start = time.perf_counter()
+            save_problems(batch)
+            latencies.append(time.perf_counter() - batch_start)
+        report[phase] = summarize(latencies, time.perf_counter() - start)
+        report[phase]['batch_size'] = batch_size
+    return report
+
+
+def bench_generation(slugs, requests, concurrency, refresh):
+    """
+    Fire `requests` GETs at generate-test-case/<slug>/ through the ASGI
+    handler, at most `concurrency` in flight. refresh=True forces a model
+    call (cold path); otherwise stored rows are served (hot path).
+    """
+    client = AsyncClient()
+    suffix = '?refresh=true' if refresh else ''
+    latencies = []
+    errors = 0
+
+    async def one(i, semaphore):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(f"/generate-test-case/{slugs[i % len(slugs)]}/{suffix}")
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(one(i, semaphore) for i in range(requests)))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    report = summarize(latencies, time.perf_counter() - start)
+    report.update({'concurrency': concurrency, 'errors': errors})
+    return report
@@ -0,0 +1,120 @@
+# backend/problems/blobs.py
+
+import gzip
+import hashlib
+import os
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.core.files import File
+from django.core.files.storage import storages
+
+# Content-addressed, gzip-compressed payloads for test cases too large to
+# keep in the row. Names derive from the sha256 of the uncompressed text,
+# so identical payloads are stored once and a name never changes content.
+
+STORAGE = 'testcase_blobs'
+CHUNK_SIZE = 64 * 1024
+
+
+def storage():
+    return storages[STORAGE]
+
+
+def blob_name(digest):
+    return f"{digest[:2]}/{digest}.gz"
+
+
+def put_chunks(chunks):
+    """
+    Compress and store an iterable of str/bytes chunks without holding the
+    whole payload. Returns (sha256 hexdigest, uncompressed size in bytes).
+    """
+    sha = hashlib.sha256()
+    size = 0
+    with tempfile.TemporaryFile() as tmp:
+        with gzip.GzipFile(fileobj=tmp, mode='wb', mtime=0) as gz:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                sha.update(chunk)
+                size += len(chunk)
+                gz.write(chunk)
+        digest = sha.hexdigest()
+        name = blob_name(digest)
+        if not _reuse(name):
+            tmp.seek(0)
+            storage().save(name, File(tmp))
+    return digest, size
+
+
+def _reuse(name):
+    """
+    Whether name is already stored. Its mtime is bumped first, so a
+    concurrent delete_unreferenced, which spares recently written blobs,
+    can't remove it before the new row that points at it is saved.
+    """
+    store = storage()
+    try:
+        os.utime(store.path(name))
+        return True
+    except FileNotFoundError:
+        return False
+    except NotImplementedError:
+        # Storages without local files keep their first write time
+        return store.exists(name)
+
+
+def put(text):
+    return put_chunks([text])
+
+
+def open_compressed(digest):
+    return storage().open(blob_name(digest), 'rb')
+
+
+def iter_chunks(digest, compressed=False, chunk_size=CHUNK_SIZE):
+    """Yield the payload in chunks, decompressed unless compressed=True."""
+    with open_compressed(digest) as raw:
+        stream = raw if compressed else gzip.GzipFile(fileobj=raw, mode='rb')
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def read(digest):
+    return b''.join(iter_chunks(digest)).decode('utf-8')
+
+
+async def aiter_chunks(chunks):
+    # Feed a blocking chunk iterator to an async StreamingHttpResponse one
+    # chunk at a time; given a sync iterator, ASGI would buffer all of it
+    sentinel = object()
+    iterator = iter(chunks)
+    while True:
+        chunk = await sync_to_async(next, thread_sensitive=False)(iterator, sentinel)
+        if chunk is sentinel:
+            break
+        yield chunk
+
+
+def delete_unreferenced(referenced, older_than):
+    """
+    Remove stored blobs whose digest is not in referenced and that were
+    last written or reused before older_than (a datetime), so blobs of a
+    store still in flight survive. Returns the number removed.
+    """
+    removed = 0
+    store = storage()
+    directories, _ = store.listdir('')
+    for directory in directories:
+        _, files = store.listdir(directory)
+        for filename in files:
+            name = f"{directory}/{filename}"
+            if filename.removesuffix('.gz') in referenced or store.get_modified_time(name) >= older_than:
+                continue
+            store.delete(name)
+            removed += 1
+    return removed
@@ -0,0 +1,204 @@
+# backend/problems/cache.py
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import GenerationCache
+from . import metrics, singleflight
+
+logger = logging.getLogger(__name__)
+
+# Shared by every request in this process
+_flights = singleflight.SingleFlight()
+
+# Process-wide counters, reset on restart
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "evicted": 0}
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def stats():
+    with _stats_lock:
+        counters = dict(_stats)
+    counters.update(singleflight.stats())
+    return counters
+
+
+@metrics.register_collector
+def collect_metrics():
+    counters = stats()
+    lookups = counters["hits"] + counters["misses"]
+    return metrics.family(
+        "testgen_generation_cache_events_total", "counter",
+        "Generation cache hits, misses, bypasses, evictions and single-flight outcomes.",
+        [({"event": name}, value) for name, value in sorted(counters.items())],
+    ) + metrics.family(
+        "testgen_generation_cache_hit_ratio", "gauge",
+        "Share of cache lookups served from the cache since the process started.",
+        [({}, counters["hits"] / lookups if lookups else 0.0)],
+    )
+
+
+def make_key(prompt, model_name, generation_config=None):
+    # The key covers everything that changes the model output, so editing a
+    # Problem (and therefore its prompt) naturally misses the old entries.
+    payload = json.dumps(
+        {
+            "prompt": prompt,
+            "model": model_name,
+            "config": generation_config or {},
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _lookup(key):
+    # Fresh cached text for key, or None. Does not touch counters.
+    try:
+        entry = GenerationCache.objects.get(key=key)
+    except GenerationCache.DoesNotExist:
+        return None
+
+    ttl = timedelta(seconds=settings.GENERATION_CACHE_TTL)
+    if entry.created_at < timezone.now() - ttl:
+        return None
+    return entry
+
+
+def get(key):
+    entry = _lookup(key)
+    if entry is None:
+        _count("misses")
+        return None
+
+    GenerationCache.objects.filter(pk=entry.pk).update(
+        hit_count=F("hit_count") + 1,
+        last_accessed=timezone.now(),
+    )
+    _count("hits")
+    return entry.response_text
+
+
+def peek(key):
+    entry = _lookup(key)
+    return entry.response_text if entry is not None else None
+
+
+def set(key, model_name, response_text):
+    now = timezone.now()
+    GenerationCache.objects.update_or_create(
+        key=key,
+        defaults={
+            "model_name": model_name,
+            "response_text": response_text,
+            "hit_count": 0,
+            "created_at": now,
+            "last_accessed": now,
+        },
+    )
+    evict()
+
+
+def evict():
+    # Drop expired rows, then trim the least recently used ones over the limit
+    cutoff = timezone.now() - timedelta(seconds=settings.GENERATION_CACHE_TTL)
+    deleted, _ = GenerationCache.objects.filter(created_at__lt=cutoff).delete()
+
+    max_entries = settings.GENERATION_CACHE_MAX_ENTRIES
+    overflow = GenerationCache.objects.count() - max_entries
+    if overflow > 0:
+        stale = GenerationCache.objects.order_by("last_accessed").values_list("pk", flat=True)[:overflow]
+        extra, _ = GenerationCache.objects.filter(pk__in=list(stale)).delete()
+        deleted += extra
+
+    if deleted:
+        _count("evicted", deleted)
+        logger.info(f"Evicted {deleted} generation cache entries.")
+    return deleted
+
+
+def clear():
+    deleted, _ = GenerationCache.objects.all().delete()
+    return deleted
+
+
+def get_or_generate(prompt, model_name, generate, generation_config=None, use_cache=True, refresh=False,
+                    validate=None):
+    """
+    Return the cached response for this prompt, or call generate() and store it.
+
+    use_cache=False skips the cache entirely; refresh=True ignores any stored
+    entry but still writes the new response back. validate, if given, is
+    called with a new response before it is stored; whatever it raises
+    propagates and the response is not cached.
+    """
+    if not use_cache:
+        _count("bypassed")
+        return generate()
+
+    key = make_key(prompt, model_name, generation_config)
+    if not refresh:
+        cached = get(key)
+        if cached is not None:
+            logger.info(f"Generation cache hit for {key[:12]}.")
+            return cached
+
+    def fill():
+        # Concurrent misses for the same key share one model call, across
+        # threads here and across processes through singleflight.run_exclusive
+        def call():
+            logger.info(f"Generation cache miss for {key[:12]}, calling {model_name}.")
+            response_text = generate()
+            if validate is not None:
+                validate(response_text)
+            set(key, model_name, response_text)
+            return response_text
+
+        if refresh:
+            return call()
+        return singleflight.run_exclusive(key, lambda: peek(key), call)
+
+    return _flights.do(key, fill)
+
+
+async def aget_or_generate(prompt, model_name, agenerate, generation_config=None, use_cache=True, refresh=False,
+                           validate=None):
+    # Async twin of get_or_generate; agenerate is a coroutine function
+    if not use_cache:
+        _count("bypassed")
+        return await agenerate()
+
+    key = make_key(prompt, model_name, generation_config)
+    if not refresh:
+        cached = await sync_to_async(get)(key)
+        if cached is not None:
+            logger.info(f"Generation cache hit for {key[:12]}.")
+            return cached
+
+    async def afill():
+        async def call():
+            logger.info(f"Generation cache miss for {key[:12]}, calling {model_name}.")
+            response_text = await agenerate()
+            if validate is not None:
+                validate(response_text)
+            await sync_to_async(set)(key, model_name, response_text)
+            return response_text
+
+        if refresh:
+            return await call()
+        return await singleflight.arun_exclusive(key, lambda: peek(key), call)
+
+    return await _flights.ado(key, afill)
@@ -0,0 +1,34 @@
+# backend/problems/conditional.py
+
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Strong ETag from the values that determine a response body."""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def not_modified(request, etag, last_modified):
+    # 304 (or 412) when the client's validators still match, else None
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def finalize(response, endpoint, etag=None, last_modified=None):
+    """Attach validators and the endpoint's Cache-Control policy."""
+    if etag:
+        response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    policy = settings.CACHE_CONTROL.get(endpoint)
+    if policy:
+        response["Cache-Control"] = policy
+    return response
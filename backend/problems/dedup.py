@@ -0,0 +1,123 @@
+# backend/problems/dedup.py
+
+import hashlib
+import json
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+
+# Exact duplicates share a content_hash: the sha256 of the input with
+# whitespace outside string literals removed, or of the generator spec.
+# The (problem, content_hash) unique constraint rejects them at insert.
+#
+# Near duplicates are found with MinHash over token shingles of that same
+# normalized input, bucketed by LSH: BANDS bands of ROWS signature values
+# each. Two inputs share a bucket with good odds once their estimated
+# Jaccard similarity is around (1/BANDS) ** (1/ROWS) = 0.5; candidates are
+# then confirmed against TEST_CASE_NEAR_DUPLICATE_THRESHOLD.
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_TOKENS = 3
+# Only the start of very large inputs is shingled
+MAX_SHINGLE_CHARS = 64 * 1024
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+# Fixed, so signatures stored in the database stay comparable
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+
+_STRING_OR_SPACE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|\s+')
+_TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|\w+|[^\w\s]')
+
+
+def normalize(text):
+    """text with whitespace outside string literals removed."""
+    return _STRING_OR_SPACE.sub(lambda match: match.group(1) or '', text.strip())
+
+
+def case_key(input_text=None, generator=None):
+    """The normalized form a test case is deduplicated on."""
+    if generator:
+        return 'generator:' + json.dumps(generator, sort_keys=True, separators=(',', ':'))
+    return normalize(input_text or '')
+
+
+def content_hash(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def signature(key):
+    """MinHash signature of key's token shingles, as NUM_PERM uint32s in bytes."""
+    tokens = _TOKEN.findall(key[:MAX_SHINGLE_CHARS])
+    shingles = {
+        ' '.join(tokens[i:i + SHINGLE_TOKENS])
+        for i in range(max(1, len(tokens) - SHINGLE_TOKENS + 1))
+    }
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64, count=len(shingles),
+    )
+    # One row per permutation, one column per shingle; uint64 wrap-around is intended
+    permuted = np.bitwise_and((np.outer(_A, hashes) + _B[:, None]) % _MERSENNE_PRIME, _MAX_HASH)
+    return permuted.min(axis=1).astype(np.uint32).tobytes()
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures."""
+    a = np.frombuffer(first, dtype=np.uint32)
+    b = np.frombuffer(second, dtype=np.uint32)
+    return float(np.mean(a == b))
+
+
+class LSHIndex:
+    """Signatures bucketed by band, for near-duplicate lookups."""
+
+    def __init__(self, threshold=None):
+        self.threshold = settings.TEST_CASE_NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+        self._buckets = defaultdict(list)
+        self._signatures = {}
+
+    @staticmethod
+    def _bands(sig):
+        for band in range(BANDS):
+            yield band, sig[band * ROWS * 4:(band + 1) * ROWS * 4]
+
+    def add(self, key, sig):
+        self._signatures[key] = sig
+        for band in self._bands(sig):
+            self._buckets[band].append(key)
+
+    def query(self, sig):
+        """Keys whose signature is at least threshold-similar to sig, most similar first."""
+        candidates = {key for band in self._bands(sig) for key in self._buckets.get(band, ())}
+        matches = [(key, similarity(sig, self._signatures[key])) for key in candidates]
+        return sorted(
+            [(key, score) for key, score in matches if score >= self.threshold],
+            key=lambda match: -match[1],
+        )
+
+
+def deduplicate(cases):
+    """
+    Add content_hash, minhash and near_duplicate to parsed test case dicts
+    and drop exact duplicates, keeping the first of each.
+    """
+    index = LSHIndex()
+    seen = set()
+    unique = []
+    for case in cases:
+        key = case_key(case.get('input_data'), case.get('generator'))
+        digest = content_hash(key)
+        if digest in seen:
+            continue
+        seen.add(digest)
+        sig = signature(key)
+        unique.append({**case, 'content_hash': digest, 'minhash': sig, 'near_duplicate': bool(index.query(sig))})
+        index.add(digest, sig)
+    return unique
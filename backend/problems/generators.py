@@ -0,0 +1,175 @@
+# backend/problems/generators.py
+
+import json
+import math
+
+import numpy as np
+from django.conf import settings
+
+# A generator spec describes a large input instead of spelling it out:
+#
+#   {"seed": 7, "variables": [
+#       {"name": "nums", "type": "int_array", "size": 10000, "low": -1000, "high": 1000,
+#        "distribution": "uniform", "unique": false, "sorted": false},
+#       {"name": "target", "type": "int", "low": -2000, "high": 2000}
+#   ]}
+#
+# expand_chunks() turns it into "nums = [...], target = 12" text. The same
+# spec and seed always give the same text.
+
+TYPES = ('int', 'float', 'string', 'int_array', 'float_array', 'string_array')
+DISTRIBUTIONS = ('uniform', 'normal')
+DEFAULT_ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+# Array elements formatted per yielded chunk
+CHUNK_ELEMENTS = 16384
+# numpy draws integers as int64
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+class GeneratorSpecError(ValueError):
+    pass
+
+
+def _number(variable, key, default):
+    value = variable.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise GeneratorSpecError(f"'{variable.get('name')}.{key}' must be a number.")
+    return value
+
+
+def _integer(variable, key, default, low=INT64_MIN, high=INT64_MAX):
+    # Models often write 1e9 for a bound; whole-number floats count as ints
+    value = _number(variable, key, default)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if not isinstance(value, int) or not low <= value <= high:
+        raise GeneratorSpecError(f"'{variable.get('name')}.{key}' must be an integer from {low} to {high}.")
+    return value
+
+
+def validate(spec):
+    """Return spec with defaults filled in, or raise GeneratorSpecError."""
+    if not isinstance(spec, dict) or not isinstance(spec.get('variables'), list) or not spec['variables']:
+        raise GeneratorSpecError("Generator spec needs a non-empty 'variables' list.")
+    seed = spec.get('seed', 0)
+    if isinstance(seed, bool) or not isinstance(seed, int) or seed < 0:
+        raise GeneratorSpecError("'seed' must be a non-negative integer.")
+
+    max_size = settings.GENERATOR_MAX_ELEMENTS
+    variables = []
+    for variable in spec['variables']:
+        if not isinstance(variable, dict) or not str(variable.get('name', '')).isidentifier():
+            raise GeneratorSpecError("Every variable needs an identifier 'name'.")
+        kind = variable.get('type')
+        if kind not in TYPES:
+            raise GeneratorSpecError(f"'{variable['name']}.type' must be one of {', '.join(TYPES)}.")
+
+        strings = kind.startswith('string')
+        # For strings, low/high bound the length
+        bound = _number if kind.startswith('float') else _integer
+        filled = {
+            'name': variable['name'],
+            'type': kind,
+            'low': bound(variable, 'low', 1 if strings else 0),
+            'high': bound(variable, 'high', 10 if strings else 100),
+        }
+        if filled['low'] > filled['high']:
+            raise GeneratorSpecError(f"'{variable['name']}.low' is greater than 'high'.")
+
+        if kind.endswith('_array'):
+            size = filled['size'] = _integer(variable, 'size', 0, 0, max_size)
+            filled['sorted'] = {True: 'asc', False: None}.get(variable.get('sorted', False), variable.get('sorted'))
+            if filled['sorted'] not in (None, 'asc', 'desc'):
+                raise GeneratorSpecError(f"'{variable['name']}.sorted' must be false, true, 'asc' or 'desc'.")
+            filled['unique'] = bool(variable.get('unique', False))
+            if filled['unique'] and kind == 'int_array':
+                if size > filled['high'] - filled['low'] + 1:
+                    raise GeneratorSpecError(f"'{variable['name']}' can't hold {size} unique values in [low, high].")
+                if filled['high'] - filled['low'] >= INT64_MAX:
+                    raise GeneratorSpecError(f"'{variable['name']}' unique values need high - low below {INT64_MAX}.")
+
+        if strings:
+            filled['alphabet'] = str(variable.get('alphabet') or DEFAULT_ALPHABET)
+            if filled['low'] < 0:
+                raise GeneratorSpecError(f"'{variable['name']}' string lengths must be non-negative integers.")
+            if filled['high'] * filled.get('size', 1) > max_size:
+                raise GeneratorSpecError(f"'{variable['name']}' would generate more than {max_size} characters.")
+        else:
+            filled['distribution'] = variable.get('distribution', 'uniform')
+            if filled['distribution'] not in DISTRIBUTIONS:
+                raise GeneratorSpecError(f"'{variable['name']}.distribution' must be one of {', '.join(DISTRIBUTIONS)}.")
+            if filled['distribution'] == 'normal':
+                filled['mean'] = _number(variable, 'mean', (filled['low'] + filled['high']) / 2)
+                filled['std'] = _number(variable, 'std', (filled['high'] - filled['low']) / 6)
+
+        variables.append(filled)
+    return {'seed': seed, 'variables': variables}
+
+
+def _numbers(rng, variable, size):
+    low, high = variable['low'], variable['high']
+    integers = variable['type'].startswith('int')
+
+    if variable.get('unique') and integers:
+        # Sampling without replacement from the range, never materializing it
+        return rng.choice(high - low + 1, size=size, replace=False) + low
+    if variable['distribution'] == 'normal':
+        values = np.clip(rng.normal(variable['mean'], variable['std'], size), low, high)
+        return np.rint(values).astype(np.int64) if integers else values
+    if integers:
+        return rng.integers(low, high, size=size, endpoint=True)
+    return rng.uniform(low, high, size)
+
+
+def _strings(rng, variable, size):
+    alphabet = np.array(list(variable['alphabet']))
+    lengths = rng.integers(variable['low'], variable['high'], size=size, endpoint=True)
+    letters = alphabet[rng.integers(0, len(alphabet), size=int(lengths.sum()))]
+    bounds = np.concatenate(([0], np.cumsum(lengths)))
+    return np.array([''.join(letters[start:end]) for start, end in zip(bounds[:-1], bounds[1:])], dtype=object)
+
+
+def _values(rng, variable):
+    size = variable.get('size', 1)
+    if variable['type'].startswith('string'):
+        values = _strings(rng, variable, size)
+    else:
+        values = _numbers(rng, variable, size)
+        if variable['type'].startswith('float'):
+            values = np.round(values, 6)
+    if variable.get('sorted'):
+        values = np.sort(values)
+        if variable['sorted'] == 'desc':
+            values = values[::-1]
+    return values
+
+
+def _format(values, kind):
+    # tolist() hands back Python ints/floats, which str() formats about
+    # twice as fast as numpy's own astype(str)
+    if kind.startswith('string'):
+        return map(json.dumps, values.tolist())
+    return map(str, values.tolist())
+
+
+def expand_chunks(spec):
+    """
+    Yield the input text for a validated spec in chunks, so even a
+    million-element array is never formatted as one string.
+    """
+    rng = np.random.default_rng(spec['seed'])
+    for index, variable in enumerate(spec['variables']):
+        # Draw every variable in order so each one depends only on the seed
+        values = _values(rng, variable)
+        prefix = (', ' if index else '') + f"{variable['name']} = "
+        if not variable['type'].endswith('_array'):
+            yield prefix + next(_format(values, variable['type']))
+            continue
+        yield prefix + '['
+        for start in range(0, len(values), CHUNK_ELEMENTS):
+            yield (', ' if start else '') + ', '.join(_format(values[start:start + CHUNK_ELEMENTS], variable['type']))
+        yield ']'
+
+
+def expand(spec):
+    return ''.join(expand_chunks(spec))
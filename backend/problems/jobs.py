@@ -0,0 +1,188 @@
+# backend/problems/jobs.py
+
+import logging
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, F, Value, When
+from django.utils import timezone
+
+from . import batching, metrics
+from .api import generate_and_store_test_cases
+from .models import GenerationJob, JobStatus
+from .testcases import TestCaseParseError
+
+logger = logging.getLogger(__name__)
+
+# A database-backed queue for test case generation. Requests enqueue and
+# return at once; run_generation_workers claims jobs in priority order.
+# On PostgreSQL the claim is SELECT ... FOR UPDATE SKIP LOCKED, so workers
+# never wait on each other; elsewhere a conditional UPDATE decides which
+# worker wins a job.
+
+ACTIVE = (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+def enqueue(problem, language, refresh=False, priority=0):
+    """
+    Queue generation for problem and return (job, created). A job already
+    queued or running for the same problem and language is returned
+    instead, with its priority raised and refresh set if asked. A running
+    job has already read its refresh flag, so it is marked to run again
+    with refresh once it finishes.
+    """
+    while True:
+        job = GenerationJob.objects.filter(problem=problem, language=language, status__in=ACTIVE).first()
+        if job is not None:
+            updates = {}
+            if priority > job.priority:
+                updates['priority'] = priority
+            flag = 'refresh' if job.status == JobStatus.QUEUED else 'rerun'
+            if refresh and not getattr(job, flag):
+                updates[flag] = True
+            if updates and not GenerationJob.objects.filter(pk=job.pk, status=job.status).update(**updates):
+                # It was claimed or finished meanwhile; look again
+                continue
+            for name, value in updates.items():
+                setattr(job, name, value)
+            return job, False
+        try:
+            with transaction.atomic():
+                job = GenerationJob.objects.create(
+                    problem=problem, language=language, refresh=refresh, priority=priority,
+                )
+            return job, True
+        except IntegrityError:
+            # Another request queued the same job first; return that one
+            continue
+
+
+def requeue_expired():
+    """Put running jobs whose worker let the lease lapse back in the queue (or fail them)."""
+    now = timezone.now()
+    expired = GenerationJob.objects.filter(status=JobStatus.RUNNING, locked_until__lt=now)
+    expired.filter(attempts__gte=settings.GENERATION_JOB_MAX_ATTEMPTS).update(
+        status=JobStatus.FAILED, error="Worker lease expired.", finished_at=now, locked_until=None,
+    )
+    requeued = expired.update(
+        status=JobStatus.QUEUED, locked_by='', locked_until=None,
+        refresh=Case(When(rerun=True, then=Value(True)), default=F('refresh')), rerun=False,
+    )
+    if requeued:
+        logger.warning(f"Requeued {requeued} generation jobs with expired leases.")
+
+
+def claim_many(worker_id, limit):
+    """Up to limit runnable jobs, now locked to worker_id, highest priority first."""
+    requeue_expired()
+    now = timezone.now()
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    # SQLite can't upgrade a read transaction to a write while another
+    # worker writes, so there the conditional UPDATE runs on its own
+    with transaction.atomic() if skip_locked else nullcontext():
+        queued = (
+            GenerationJob.objects.filter(status=JobStatus.QUEUED, available_at__lte=now)
+            .order_by('-priority', 'id')
+        )
+        if skip_locked:
+            queued = queued.select_for_update(skip_locked=True)
+        ids = list(queued.values_list('pk', flat=True)[:limit])
+        if not ids:
+            return []
+        # Without SKIP LOCKED two workers can read the same jobs; each job
+        # is still queued for only one of them here
+        GenerationJob.objects.filter(pk__in=ids, status=JobStatus.QUEUED).update(
+            status=JobStatus.RUNNING, locked_by=worker_id, started_at=now,
+            locked_until=now + timedelta(seconds=settings.GENERATION_JOB_LEASE_SECONDS),
+            attempts=F('attempts') + 1,
+        )
+    claimed = GenerationJob.objects.filter(pk__in=ids, status=JobStatus.RUNNING, locked_by=worker_id)
+    return list(claimed.select_related('problem').order_by('-priority', 'id'))
+
+
+def claim(worker_id):
+    """The next runnable job, now locked to worker_id, or None."""
+    jobs = claim_many(worker_id, 1)
+    return jobs[0] if jobs else None
+
+
+def _finish(job, worker_id, **fields):
+    # Only while the lease is ours: an expired job may already be someone else's
+    return GenerationJob.objects.filter(pk=job.pk, status=JobStatus.RUNNING, locked_by=worker_id).update(
+        locked_until=None, **fields,
+    )
+
+
+def _record(job, worker_id, e):
+    # Mark a finished job done, or (e being its exception) queued for a retry or failed
+    if e is not None:
+        logger.error(f"Generation job {job.pk} ({job.problem.slug}) failed on attempt {job.attempts}: {e}")
+        if job.attempts < settings.GENERATION_JOB_MAX_ATTEMPTS:
+            delay = settings.GENERATION_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            # The cached response is what failed to parse; ask again
+            refresh = job.refresh or isinstance(e, TestCaseParseError)
+            _finish(
+                job, worker_id, status=JobStatus.QUEUED, error=str(e), locked_by='',
+                available_at=timezone.now() + timedelta(seconds=delay),
+                # A refresh asked for during this attempt applies to the retry
+                refresh=Case(When(rerun=True, then=Value(True)), default=Value(refresh)), rerun=False,
+            )
+        else:
+            _finish(job, worker_id, status=JobStatus.FAILED, error=str(e), finished_at=timezone.now())
+        return False
+    rerun = GenerationJob.objects.filter(
+        pk=job.pk, status=JobStatus.RUNNING, locked_by=worker_id, rerun=True,
+    ).update(
+        status=JobStatus.QUEUED, refresh=True, rerun=False, attempts=0, error='', locked_by='',
+        locked_until=None, available_at=timezone.now(),
+    )
+    if rerun:
+        logger.info(f"Generation job {job.pk} queued again for a refresh asked for while it ran.")
+    elif not _finish(job, worker_id, status=JobStatus.DONE, error='', finished_at=timezone.now()):
+        logger.warning(f"Generation job {job.pk} finished after its lease passed to another worker.")
+    return True
+
+
+def run(job, worker_id, acquire=None):
+    """
+    Generate and store the job's test cases; returns whether it succeeded.
+    acquire, if given, is called before the model call (not on cache hits).
+    """
+    try:
+        with metrics.span("job"):
+            generate_and_store_test_cases(
+                job.problem.slug, refresh=job.refresh, language=job.language, acquire=acquire,
+            )
+    except Exception as e:
+        return _record(job, worker_id, e)
+    return _record(job, worker_id, None)
+
+
+def run_batch(jobs, worker_id, acquire=None):
+    """
+    Run several jobs with batched prompts (problems.batching); returns
+    whether each succeeded, in order.
+    """
+    with metrics.span("job_batch"):
+        results = batching.generate_and_store_many(
+            [(job.problem.slug, job.language, job.refresh) for job in jobs], acquire=acquire,
+        )
+    outcomes = []
+    for job in jobs:
+        result = results.get((job.problem.slug, job.language))
+        outcomes.append(_record(job, worker_id, result if isinstance(result, Exception) else None))
+    return outcomes
+
+
+@metrics.register_collector
+def collect_metrics():
+    counts = dict(
+        GenerationJob.objects.filter(status__in=ACTIVE)
+        .values_list('status').annotate(count=Count('id')).order_by()
+    )
+    return metrics.family(
+        "testgen_jobs", "gauge", "Generation jobs queued or running.",
+        [({"status": status.label}, counts.get(status, 0)) for status in ACTIVE],
+    )
@@ -0,0 +1,241 @@
+# backend/problems/llm.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+import weakref
+
+from django.conf import settings
+
+from . import metrics
+from .prompts import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    pass
+
+
+class QuotaExceeded(LLMError):
+    """The provider refused the call for rate or quota limits (HTTP 429)."""
+
+
+class Provider:
+    """
+    A text-generation backend. Instances are built once per process by
+    get_provider() and shared by every request.
+    """
+
+    model_name = None
+
+    def generate(self, prompt, generation_config=None):
+        raise NotImplementedError
+
+    async def agenerate(self, prompt, generation_config=None):
+        raise NotImplementedError
+
+    async def astream(self, prompt, generation_config=None):
+        # Providers without streaming yield the whole response at once
+        yield await self.agenerate(prompt, generation_config)
+
+    def warm_up(self):
+        pass
+
+    def record_usage(self, prompt_tokens, response_tokens):
+        metrics.record_tokens(self.model_name, prompt_tokens, response_tokens)
+
+
+class GeminiProvider(Provider):
+
+    def __init__(self, api_key, model_name):
+        import google.generativeai as genai
+        from google.ai.generativelanguage import GenerativeServiceAsyncClient
+        from google.api_core.exceptions import ResourceExhausted
+
+        self.model_name = model_name
+        # configure() and GenerativeModel() set up the API client; doing it
+        # once keeps its connections open across requests
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name=model_name)
+        self._exhausted = ResourceExhausted
+        # The async client is bound to the event loop it was first used on,
+        # so each loop gets its own: one under ASGI, one per request under
+        # WSGI, where every async view runs in a fresh loop
+        self._genai = genai
+        self._api_key = api_key
+        self._async_client_class = GenerativeServiceAsyncClient
+        self._async_models = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+
+    def _async_model(self):
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            model = self._async_models.get(loop)
+            if model is None:
+                model = self._genai.GenerativeModel(model_name=self.model_name)
+                # GenerativeModel otherwise shares genai's process-wide async client
+                model._async_client = self._async_client_class(client_options={"api_key": self._api_key})
+                self._async_models[loop] = model
+        return model
+
+    def _record(self, response):
+        # Real counts from the API; the last streamed chunk carries the totals
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self.record_usage(usage.prompt_token_count, usage.candidates_token_count)
+
+    def generate(self, prompt, generation_config=None):
+        try:
+            response = self.model.generate_content(prompt, generation_config=generation_config)
+        except self._exhausted as e:
+            raise QuotaExceeded(str(e)) from e
+        self._record(response)
+        return response.text
+
+    async def agenerate(self, prompt, generation_config=None):
+        try:
+            response = await self._async_model().generate_content_async(prompt, generation_config=generation_config)
+        except self._exhausted as e:
+            raise QuotaExceeded(str(e)) from e
+        self._record(response)
+        return response.text
+
+    async def astream(self, prompt, generation_config=None):
+        try:
+            response = await self._async_model().generate_content_async(
+                prompt, generation_config=generation_config, stream=True,
+            )
+        except self._exhausted as e:
+            raise QuotaExceeded(str(e)) from e
+        last = None
+        async for chunk in response:
+            last = chunk
+            yield chunk.text
+        self._record(last)
+
+    def warm_up(self):
+        # A token count is the cheapest call that opens the connection
+        self.model.count_tokens("warm up")
+
+
+class FakeProvider(Provider):
+    """
+    Offline provider for load tests and local development. Responses are
+    derived from a hash of the prompt, so the same prompt always gets the
+    same test cases. latency is in seconds; error_rate is the probability
+    (0-1) that a call raises LLMError, drawn from an RNG seeded with seed.
+    """
+
+    model_name = "fake"
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _maybe_fail(self):
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+        if failed:
+            raise LLMError("Simulated provider error.")
+
+    def respond(self, prompt):
+        # Batched prompts (problems.batching) get one answer per problem key
+        keys = re.findall(r"^\s*Problem key: (\S+)$", prompt, re.MULTILINE)
+        if keys:
+            text = json.dumps({key: self._answer(f"{prompt}\n{key}") for key in keys})
+        else:
+            text = json.dumps(self._answer(prompt))
+        self.record_usage(estimate_tokens(prompt), estimate_tokens(text))
+        return text
+
+    def _answer(self, prompt):
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        rng = random.Random(digest)
+
+        def case(tier, size):
+            nums = [rng.randint(-100, 100) for _ in range(size)]
+            return {"tier": tier, "input": f"nums = {nums}", "expected_output": str(sorted(nums))}
+
+        large = {"tier": "large", "expected_output": "", "generator": {
+            "seed": rng.randrange(2 ** 32),
+            "variables": [{"name": "nums", "type": "int_array", "size": 10000, "low": -100, "high": 100}],
+        }}
+        return {"test_cases": [
+            case("small", 3),
+            case("medium", 10),
+            large,
+            case("edge", 0),
+            case("edge", 1),
+        ]}
+
+    def generate(self, prompt, generation_config=None):
+        time.sleep(self.latency)
+        self._maybe_fail()
+        return self.respond(prompt)
+
+    async def agenerate(self, prompt, generation_config=None):
+        await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        return self.respond(prompt)
+
+    async def astream(self, prompt, generation_config=None):
+        text = self.respond(prompt)
+        chunks = [text[i:i + 64] for i in range(0, len(text), 64)]
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            yield chunk
+        self._maybe_fail()
+
+
+PROVIDERS = {
+    "gemini": lambda: GeminiProvider(settings.GEMINI_API_KEY, settings.LLM_MODEL),
+    "fake": lambda: FakeProvider(
+        latency=settings.LLM_FAKE_LATENCY,
+        error_rate=settings.LLM_FAKE_ERROR_RATE,
+        seed=settings.LLM_FAKE_SEED,
+    ),
+}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                try:
+                    factory = PROVIDERS[settings.LLM_PROVIDER]
+                except KeyError:
+                    raise LLMError(f"Unknown LLM_PROVIDER {settings.LLM_PROVIDER!r}.")
+                _provider = factory()
+                logger.info(f"Using {settings.LLM_PROVIDER} provider ({_provider.model_name}).")
+    return _provider
+
+
+def set_provider(provider):
+    # Override the process-wide provider, e.g. from a management command or benchmark
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+def warm_up():
+    """Build the provider and open its connection before the first request."""
+    provider = get_provider()
+    if not settings.LLM_WARMUP:
+        return
+    try:
+        provider.warm_up()
+        logger.info(f"Warmed up {provider.model_name}.")
+    except Exception as e:
+        logger.warning(f"LLM warm-up failed: {e}")
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from problems import api, llm
+from problems.models import Problem
+
+
+class Command(BaseCommand):
+    help = 'Compare sync (thread-per-request) and async generation throughput against a simulated slow LLM.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('slug', type=str, help='Slug of an existing problem to generate for.')
+        parser.add_argument('--requests', type=int, default=200, help='Number of concurrent generations.')
+        parser.add_argument('--workers', type=int, default=8, help='Sync worker threads (WSGI worker count).')
+        parser.add_argument('--latency', type=float, default=1.0, help='Simulated LLM latency in seconds.')
+
+    def handle(self, *args, **kwargs):
+        slug = kwargs['slug']
+        if not Problem.objects.filter(slug=slug).exists():
+            raise CommandError(f"Problem with slug '{slug}' not found.")
+
+        total = kwargs['requests']
+        llm.set_provider(llm.FakeProvider(latency=kwargs['latency']))
+
+        # Sync: every in-flight call pins one of a fixed number of worker threads
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=kwargs['workers']) as pool:
+            list(pool.map(lambda _: api.generate_test_case(slug, use_cache=False), range(total)))
+        sync_elapsed = time.perf_counter() - start
+
+        # Async: one event loop holds every call while it waits on the model
+        async def run_async():
+            await asyncio.gather(*(api.agenerate_test_case(slug, use_cache=False) for _ in range(total)))
+
+        start = time.perf_counter()
+        asyncio.run(run_async())
+        async_elapsed = time.perf_counter() - start
+
+        self.stdout.write(json.dumps({
+            "requests": total,
+            "latency_s": kwargs['latency'],
+            "sync": {"workers": kwargs['workers'], "elapsed_s": round(sync_elapsed, 3),
+                     "throughput_rps": round(total / sync_elapsed, 2)},
+            "async": {"elapsed_s": round(async_elapsed, 3),
+                      "throughput_rps": round(total / async_elapsed, 2)},
+        }, indent=2))
@@ -0,0 +1,107 @@
+import glob
+import json
+import os
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException
+
+from problems.benchmarks import FIXTURES_DIR, serve_fixtures
+from problems.scraper import build_problem, create_driver, fetch_problem, scrape_problem
+
+
+def scrape_with_find_elements(driver, url, tab_sleep):
+    """The original per-element extraction, kept as the benchmark baseline."""
+    driver.get(url)
+    title = driver.find_element(By.CSS_SELECTOR, 'h1').text.strip()
+    container = driver.find_element(By.CLASS_NAME, 'my-article-component-container')
+    elements = container.find_elements(By.XPATH, './/p | .//pre')
+    description = "\n".join([elem.text.strip() for elem in elements if elem.text.strip()])
+
+    solution_tab = driver.find_element(By.XPATH, "//span[text()='Solution']")
+    parent_li = solution_tab.find_element(By.XPATH, "./ancestor::li")
+    if 'my-active-tab' not in parent_li.get_attribute('class'):
+        solution_tab.click()
+        time.sleep(tab_sleep)
+
+    solution_texts = []
+    for toolbar in driver.find_elements(By.CLASS_NAME, 'code-toolbar'):
+        for pre in toolbar.find_elements(By.TAG_NAME, 'pre'):
+            language_class = pre.get_attribute('class')
+            if 'language-' in language_class:
+                try:
+                    code_text = pre.find_element(By.TAG_NAME, 'code').text.strip()
+                except NoSuchElementException:
+                    continue
+                solution_texts.append(f"{language_class.split('language-')[-1].capitalize()} Solution:\n{code_text}")
+    return {'title': title, 'description': description, 'solution': "\n\n".join(solution_texts)}
+
+
+class Command(BaseCommand):
+    help = ('Benchmark per-page scrape time on saved NeetCode HTML fixtures: '
+            'per-element calls vs one execute_script vs the HTTP fast path.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fixtures', type=str, default=str(FIXTURES_DIR), help='Directory of saved .html pages.')
+        parser.add_argument('--rounds', type=int, default=3, help='Times to scrape each fixture.')
+        parser.add_argument('--tab-sleep', type=float, default=2.0,
+                            help='Fixed sleep after tab clicks in the baseline (the old behaviour).')
+        parser.add_argument('--skip-selenium', action='store_true', help='Only benchmark the HTTP fast path.')
+        parser.add_argument('--output', type=str, help='Write the JSON report to this file as well.')
+
+    def handle(self, *args, **kwargs):
+        pages = sorted(glob.glob(os.path.join(kwargs['fixtures'], '*.html')))
+        if not pages:
+            raise CommandError(f"No .html fixtures found in {kwargs['fixtures']}.")
+
+        timings = {'http': []}
+        server, url_template = serve_fixtures(kwargs['fixtures'])
+        try:
+            for _ in range(kwargs['rounds']):
+                for page in pages:
+                    slug = Path(page).stem
+                    start = time.perf_counter()
+                    build_problem(slug, fetch_problem(slug, url=url_template.format(slug=slug)))
+                    timings['http'].append(time.perf_counter() - start)
+
+            if not kwargs['skip_selenium']:
+                timings.update(self.benchmark_selenium(pages, url_template, kwargs['rounds'], kwargs['tab_sleep']))
+        finally:
+            server.shutdown()
+
+        report = {
+            'pages': len(pages),
+            'rounds': kwargs['rounds'],
+            'mean_seconds_per_page': {
+                name: round(sum(values) / len(values), 4) for name, values in timings.items()
+            },
+        }
+        output = json.dumps(report, indent=2)
+        if kwargs['output']:
+            Path(kwargs['output']).write_text(output)
+        self.stdout.write(output)
+
+    def benchmark_selenium(self, pages, url_template, rounds, tab_sleep):
+        driver = create_driver()
+        timings = {'find_elements': [], 'execute_script': []}
+        try:
+            for _ in range(rounds):
+                for page in pages:
+                    slug = Path(page).stem
+                    url = url_template.format(slug=slug)
+
+                    start = time.perf_counter()
+                    baseline = scrape_with_find_elements(driver, url, tab_sleep)
+                    timings['find_elements'].append(time.perf_counter() - start)
+
+                    start = time.perf_counter()
+                    data = scrape_problem(driver, slug, url=url)
+                    timings['execute_script'].append(time.perf_counter() - start)
+
+                    if data['solution'] != baseline['solution'] or data['title'] != baseline['title']:
+                        self.stderr.write(self.style.WARNING(f"Extractors disagree on {slug}."))
+        finally:
+            driver.quit()
+        return timings
@@ -0,0 +1,81 @@
+import json
+import platform
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from problems import llm
+from problems.benchmarks import (
+    bench_db_writes, bench_generation, bench_scrape, fixture_slugs, rendered_fixture, serve_fixtures,
+)
+from problems.scraper import build_problem, save_problems
+
+
+class Command(BaseCommand):
+    help = ('Run the offline end-to-end benchmarks (generation endpoint, scraping, DB writes) '
+            'against a throwaway test database and report JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Generation requests per scenario.')
+        parser.add_argument('--concurrency', type=int, default=20, help='Generation requests in flight at once.')
+        parser.add_argument('--latency', type=float, default=0.2, help='Fake LLM latency in seconds.')
+        parser.add_argument('--scrape-rounds', type=int, default=20, help='Times to scrape each fixture page.')
+        parser.add_argument('--batch-size', type=int, default=settings.SCRAPER_BATCH_SIZE,
+                            help='Problems per DB write batch.')
+        parser.add_argument('--batches', type=int, default=10, help='DB write batches per phase.')
+        parser.add_argument('--output', type=str, help='Write the JSON report to this file as well.')
+
+    def handle(self, *args, **kwargs):
+        # Never touch the real database: work in a test database like the test runner does
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        server, url_template = serve_fixtures()
+        try:
+            # Generation inline, so the cold scenario times the whole pipeline rather than an enqueue
+            with override_settings(ALLOWED_HOSTS=['*'], SINGLE_FLIGHT_POLL_INTERVAL=0.01, GENERATION_QUEUE=False):
+                report = self.run_benchmarks(url_template, kwargs)
+        finally:
+            server.shutdown()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = json.dumps(report, indent=2)
+        if kwargs['output']:
+            Path(kwargs['output']).write_text(output)
+        self.stdout.write(output)
+
+    def run_benchmarks(self, url_template, kwargs):
+        slugs = fixture_slugs()
+
+        self.stderr.write("Benchmarking scraping...")
+        scrape_report, _ = bench_scrape(url_template, slugs, kwargs['scrape_rounds'])
+        # Complete pages, solutions included, as the Selenium fallback would store them
+        problems = [build_problem(slug, rendered_fixture(slug)) for slug in slugs]
+        save_problems(problems)
+
+        self.stderr.write("Benchmarking DB writes...")
+        db_report = bench_db_writes(problems, kwargs['batch_size'], kwargs['batches'])
+
+        self.stderr.write("Benchmarking generation...")
+        llm.set_provider(llm.FakeProvider(latency=kwargs['latency']))
+        generation = {
+            'cold': bench_generation(slugs, kwargs['requests'], kwargs['concurrency'], refresh=True),
+            'hot': bench_generation(slugs, kwargs['requests'], kwargs['concurrency'], refresh=False),
+        }
+
+        return {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'fixtures': slugs,
+                'fake_llm_latency_s': kwargs['latency'],
+            },
+            'generation': generation,
+            'scrape_http': scrape_report,
+            'db_write_batch': db_report,
+        }
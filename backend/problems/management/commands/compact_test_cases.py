@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from problems import dedup
+from problems.models import TestCase
+from problems.testcases import read_payload
+
+
+class Command(BaseCommand):
+    help = (
+        'Backfill content hashes and MinHash signatures, delete exact duplicate test cases '
+        'and flag near duplicates, one problem at a time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete-near', action='store_true',
+                            help='Also delete near duplicates instead of only flagging them.')
+        parser.add_argument('--dry-run', action='store_true', help='Report without changing anything.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk update.')
+
+    def handle(self, *args, **kwargs):
+        problem_ids = TestCase.objects.order_by().values_list('problem_id', flat=True).distinct()
+        totals = {'hashed': 0, 'duplicates': 0, 'near': 0}
+        for problem_id in problem_ids.iterator():
+            for name, count in self.compact(problem_id, kwargs).items():
+                totals[name] += count
+
+        verb = 'Would delete' if kwargs['dry_run'] else 'Deleted'
+        near = 'deleted' if kwargs['delete_near'] else 'flagged'
+        self.stdout.write(self.style.SUCCESS(
+            f"Hashed {totals['hashed']} test cases. {verb} {totals['duplicates']} exact duplicates; "
+            f"{totals['near']} near duplicates {near}."
+        ))
+
+    def compact(self, problem_id, options):
+        # Oldest first, so the surviving copy is the original
+        rows = TestCase.objects.filter(problem_id=problem_id).order_by('id')
+        index = dedup.LSHIndex()
+        seen = set()
+        duplicates, near, changed = [], [], []
+        hashed = 0
+        for test_case in rows.defer('expected_output').iterator(chunk_size=options['batch_size']):
+            backfill = test_case.content_hash is None or test_case.minhash is None
+            if backfill:
+                key = dedup.case_key(
+                    None if test_case.generator else read_payload(test_case, 'input'), test_case.generator,
+                )
+                test_case.content_hash = dedup.content_hash(key)
+                test_case.minhash = dedup.signature(key)
+                hashed += 1
+            if test_case.content_hash in seen:
+                duplicates.append(test_case.pk)
+                continue
+            seen.add(test_case.content_hash)
+
+            minhash = bytes(test_case.minhash)
+            is_near = bool(index.query(minhash))
+            index.add(test_case.content_hash, minhash)
+            if is_near:
+                near.append(test_case.pk)
+                if options['delete_near']:
+                    continue
+            if backfill or is_near != test_case.near_duplicate:
+                test_case.near_duplicate = is_near
+                changed.append(test_case)
+
+        if not options['dry_run']:
+            # bulk_update skips auto_now; without a new updated_at the
+            # problem and test case ETags would not change
+            now = timezone.now()
+            for test_case in changed:
+                test_case.updated_at = now
+            with transaction.atomic():
+                # Deleted first: two copies can't both take the same hash
+                deleted = duplicates + (near if options['delete_near'] else [])
+                TestCase.objects.filter(pk__in=deleted).delete()
+                TestCase.objects.bulk_update(
+                    changed, ['content_hash', 'minhash', 'near_duplicate', 'updated_at'], batch_size=options['batch_size'],
+                )
+        return {'hashed': hashed, 'duplicates': len(duplicates), 'near': len(near)}
@@ -0,0 +1,145 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F, Min, Q
+
+from problems.api import DEFAULT_LANGUAGE, generate_and_store_test_cases
+from problems.models import Difficulty, Problem
+from problems.ratelimit import TokenBucket
+from problems import batching, cache, jobs, llm
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    filename='generate_all_test_cases.log',
+    filemode='a',
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+class Command(BaseCommand):
+    help = 'Pre-generate test cases for every problem (or a filtered subset) so TestCase rows are ready before traffic arrives.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--api_key', type=str, help='Your Gemini API key (defaults to the API_KEY setting).')
+        parser.add_argument('--slugs', nargs='+', help='Only generate for these slugs.')
+        parser.add_argument('--difficulty', type=str.lower, choices=[label.lower() for label in Difficulty.labels],
+                            help='Only generate for problems with this difficulty.')
+        parser.add_argument('--concurrency', type=int, default=settings.GENERATION_CONCURRENCY,
+                            help='Number of generations to run in parallel.')
+        parser.add_argument('--rpm', type=float, default=settings.GEMINI_REQUESTS_PER_MINUTE,
+                            help='Gemini requests per minute allowed by the quota.')
+        parser.add_argument('--refresh', action='store_true',
+                            help='Regenerate even when a cached response or an up-to-date stored set exists.')
+        parser.add_argument('--checkpoint', type=str,
+                            default=os.path.join(settings.BASE_DIR, 'generate_all_test_cases.checkpoint'),
+                            help='File recording finished slugs so an interrupted run can resume.')
+        parser.add_argument('--restart', action='store_true', help='Ignore and clear the checkpoint file.')
+        parser.add_argument('--batch', type=int, default=1,
+                            help='Problems packed into one prompt, within GENERATION_BATCH_TOKEN_BUDGET.')
+        parser.add_argument('--enqueue', action='store_true',
+                            help='Queue low-priority jobs for run_generation_workers instead of generating here.')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['rpm'] < 1:
+            raise CommandError('--rpm must be at least 1.')
+        checkpoint = kwargs['checkpoint']
+        if kwargs['restart'] and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        done = set()
+        if os.path.exists(checkpoint):
+            with open(checkpoint, 'r') as f:
+                done = {line.strip() for line in f if line.strip()}
+
+        problems = Problem.objects.order_by('id')
+        if kwargs['slugs']:
+            problems = problems.filter(slug__in=kwargs['slugs'])
+        if kwargs['difficulty']:
+            problems = problems.filter(difficulty=Difficulty[kwargs['difficulty'].upper()])
+        current = 0
+        if not kwargs['refresh']:
+            # Stored cases newer than the problem's last change would only be
+            # stored again from the cached response
+            stale = problems.annotate(stored_at=Min('test_cases__updated_at')).filter(
+                Q(stored_at__isnull=True) | Q(stored_at__lt=F('updated_at')),
+            )
+            current = problems.count() - stale.count()
+            problems = stale
+        if kwargs['enqueue']:
+            created = sum(
+                jobs.enqueue(problem, DEFAULT_LANGUAGE, refresh=kwargs['refresh'])[1]
+                for problem in problems.iterator()
+            )
+            self.stdout.write(self.style.SUCCESS(f"Queued {created} generation jobs."))
+            return
+
+        slugs = [slug for slug in problems.values_list('slug', flat=True) if slug not in done]
+
+        total = len(slugs)
+        logger.info(
+            f"Generating test cases for {total} problems "
+            f"({len(done)} already checkpointed, {current} already stored)."
+        )
+        self.stdout.write(self.style.NOTICE(
+            f"Generating test cases for {total} problems ({len(done)} already checkpointed, {current} already stored)."
+        ))
+
+        bucket = TokenBucket.per_minute(kwargs['rpm'])
+        if kwargs['api_key']:
+            llm.set_provider(llm.GeminiProvider(kwargs['api_key'], settings.LLM_MODEL))
+        refresh = kwargs['refresh']
+
+        batch = max(1, kwargs['batch'])
+
+        def run(group):
+            # {slug: stored test cases, or the exception that stopped it}
+            try:
+                if len(group) > 1:
+                    items = [(slug, DEFAULT_LANGUAGE, refresh) for slug in group]
+                    results = batching.generate_and_store_many(items, acquire=bucket.acquire)
+                    return {slug: result for (slug, _), result in results.items()}
+                try:
+                    # Cache hits don't spend rate limit tokens
+                    return {group[0]: generate_and_store_test_cases(group[0], refresh=refresh, acquire=bucket.acquire)}
+                except Exception as e:
+                    return {group[0]: e}
+            finally:
+                # Worker threads each hold their own DB connection
+                connection.close()
+
+        groups = [slugs[i:i + batch] for i in range(0, len(slugs), batch)]
+        failed = 0
+        idx = 0
+        with open(checkpoint, 'a') as log, ThreadPoolExecutor(max_workers=kwargs['concurrency']) as pool:
+            futures = {pool.submit(run, group): group for group in groups}
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    results = {slug: e for slug in futures[future]}
+                for slug, result in results.items():
+                    idx += 1
+                    if isinstance(result, Exception):
+                        failed += 1
+                        logger.error(f"Generation failed for {slug}: {result}")
+                        self.stderr.write(self.style.ERROR(f"[{idx}/{total}] {slug} failed: {result}"))
+                        continue
+                    # Only record slugs whose result has been persisted
+                    log.write(slug + '\n')
+                    log.flush()
+                    logger.info(f"[{idx}/{total}] Generated test cases for {slug}.")
+                    self.stdout.write(self.style.SUCCESS(f"[{idx}/{total}] {slug}"))
+
+        # A clean run starts the next one from scratch
+        if not failed and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        logger.info(f"Completed bulk generation: {total - failed} succeeded, {failed} failed. Cache: {cache.stats()}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Completed bulk generation: {total - failed} succeeded, {failed} failed."
+        ))
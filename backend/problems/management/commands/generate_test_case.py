@@ -1,15 +1,29 @@
+import json
 from django.core.management.base import BaseCommand
-from problems.api import generate_test_case
+from django.conf import settings
+from problems.api import generate_and_store_test_cases
+from problems.serializers import TestCaseSerializer
+from problems import cache, llm
 
 class Command(BaseCommand):
-    help = "Generate a test case for a specific problem using the Gemini API."
+    help = "Generate test cases for a specific problem using the Gemini API and store them."
 
     def add_arguments(self, parser):
         parser.add_argument("slug", type=str, help="The slug of the problem.")
-        parser.add_argument("--api_key", type=str, help="Your Gemini API key.")
+        parser.add_argument("--api_key", type=str, help="Your Gemini API key (defaults to the API_KEY setting).")
+        parser.add_argument("--no-cache", action="store_true", help="Bypass the generation cache entirely.")
+        parser.add_argument("--refresh", action="store_true", help="Ignore any cached response and store a fresh one.")
+        parser.add_argument("--language", type=str, default="python", help="Solution language to include in the prompt.")
 
     def handle(self, *args, **kwargs):
         slug = kwargs["slug"]
-        api_key = kwargs["api_key"]
-        result = generate_test_case(slug, api_key)
-        self.stdout.write(result)
+        if kwargs["api_key"]:
+            llm.set_provider(llm.GeminiProvider(kwargs["api_key"], settings.LLM_MODEL))
+        test_cases = generate_and_store_test_cases(
+            slug,
+            use_cache=not kwargs["no_cache"],
+            refresh=kwargs["refresh"],
+            language=kwargs["language"],
+        )
+        self.stdout.write(json.dumps(TestCaseSerializer(test_cases, many=True).data, indent=2))
+        self.stderr.write(f"Generation cache: {cache.stats()}")
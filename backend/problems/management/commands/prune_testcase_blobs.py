@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from problems import blobs
+from problems.models import TestCase
+
+
+class Command(BaseCommand):
+    help = 'Delete stored test case payloads that no test case references any more.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=float, default=1.0,
+                            help='Keep unreferenced blobs younger than this many hours (stores in flight).')
+
+    def handle(self, *args, **kwargs):
+        referenced = set()
+        for part in TestCase.PAYLOADS:
+            referenced.update(
+                TestCase.objects.filter(**{f'{part}_external': True})
+                .values_list(f'{part}_sha256', flat=True).iterator()
+            )
+        older_than = timezone.now() - timedelta(hours=kwargs['min_age'])
+        removed = blobs.delete_unreferenced(referenced, older_than)
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} unreferenced blobs ({len(referenced)} in use)."))
@@ -0,0 +1,92 @@
+import logging
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from problems import jobs
+from problems.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of workers that process queued test case generation jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.GENERATION_CONCURRENCY,
+                            help='Number of jobs to run in parallel.')
+        parser.add_argument('--rpm', type=float, default=settings.GEMINI_REQUESTS_PER_MINUTE,
+                            help='Gemini requests per minute allowed by the quota, shared by all workers.')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds an idle worker waits before looking for jobs again.')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument('--batch', type=int, default=1,
+                            help='Jobs a worker claims at once and packs into shared prompts.')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['rpm'] < 1:
+            raise CommandError('--rpm must be at least 1.')
+        stop = threading.Event()
+        bucket = TokenBucket.per_minute(kwargs['rpm'])
+        counts = {'done': 0, 'failed': 0}
+        lock = threading.Lock()
+
+        def work(worker_id):
+            try:
+                while not stop.is_set():
+                    try:
+                        claimed = jobs.claim_many(worker_id, kwargs['batch'])
+                    except DatabaseError as e:
+                        logger.warning(f"{worker_id} could not claim a job: {e}")
+                        stop.wait(kwargs['poll_interval'])
+                        continue
+                    if not claimed:
+                        if kwargs['burst']:
+                            return
+                        stop.wait(kwargs['poll_interval'])
+                        continue
+                    # One token per model call, batched or alone; cache hits are free
+                    if len(claimed) == 1:
+                        outcomes = [jobs.run(claimed[0], worker_id, acquire=bucket.acquire)]
+                    else:
+                        outcomes = jobs.run_batch(claimed, worker_id, acquire=bucket.acquire)
+                    for job, succeeded in zip(claimed, outcomes):
+                        with lock:
+                            counts['done' if succeeded else 'failed'] += 1
+                        style = self.style.SUCCESS if succeeded else self.style.ERROR
+                        self.stdout.write(style(f"[{worker_id}] job {job.pk} {job.problem.slug}: "
+                                                f"{'done' if succeeded else 'failed'}"))
+            finally:
+                # Worker threads each hold their own DB connection
+                connection.close()
+
+        def shut_down(signum, frame):
+            # Running jobs finish; nothing new is claimed
+            self.stdout.write(self.style.WARNING("Stopping after the running jobs..."))
+            stop.set()
+
+        signal.signal(signal.SIGINT, shut_down)
+        signal.signal(signal.SIGTERM, shut_down)
+
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        threads = [
+            threading.Thread(target=work, args=(f"{prefix}:{n}",), name=f"generation-worker-{n}")
+            for n in range(kwargs['workers'])
+        ]
+        self.stdout.write(self.style.NOTICE(f"Started {len(threads)} generation workers ({prefix})."))
+        for thread in threads:
+            thread.start()
+        # join() with a timeout keeps the main thread responsive to signals
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+
+        logger.info(f"Generation workers exited: {counts['done']} done, {counts['failed']} failed.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Generation workers exited: {counts['done']} done, {counts['failed']} failed."
+        ))
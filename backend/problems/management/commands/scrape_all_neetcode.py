@@ -1,11 +1,17 @@
 import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from django.core.management.base import BaseCommand
 from django.conf import settings  # Import settings to access BASE_DIR
+from django.utils import timezone
+from datetime import timedelta
 import os
-from subprocess import call
 import time
 import random
 
+from problems import metrics
+from problems.models import Problem
+from problems.scraper import BACKENDS, DriverPool, ProblemWriter, scrape
+
 # Configure logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(
@@ -18,6 +24,30 @@ logging.basicConfig(
 class Command(BaseCommand):
     help = 'Scrape all NeetCode problems listed in slugs.txt.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.SCRAPER_WORKERS,
+                            help='Number of browsers scraping in parallel.')
+        parser.add_argument('--max-pages', type=int, default=settings.SCRAPER_MAX_PAGES_PER_DRIVER,
+                            help='Restart a browser after it has scraped this many pages.')
+        parser.add_argument('--backend', choices=BACKENDS, default=settings.SCRAPER_BACKEND,
+                            help="'http' (no browser), 'selenium', or 'auto' (http with Selenium fallback).")
+        parser.add_argument('--url-template', type=str,
+                            help='Page URL with a {slug} placeholder, e.g. a local fixture server.')
+        parser.add_argument('--max-age', type=float, default=settings.SCRAPER_MAX_AGE_HOURS,
+                            help='Skip problems scraped less than this many hours ago.')
+        parser.add_argument('--force', action='store_true', help='Rescrape every slug regardless of age.')
+        parser.add_argument('--checkpoint', type=str,
+                            default=os.path.join(settings.BASE_DIR, 'scrape_all_neetcode.checkpoint'),
+                            help='File recording finished slugs so an interrupted run can resume.')
+        parser.add_argument('--restart', action='store_true', help='Ignore and clear the checkpoint file.')
+        parser.add_argument('--batch-size', type=int, default=settings.SCRAPER_BATCH_SIZE,
+                            help='Write scraped problems to the DB in batches of this size.')
+        parser.add_argument('--flush-interval', type=float, default=settings.SCRAPER_FLUSH_INTERVAL,
+                            help='Write a partial batch after this many seconds.')
+        parser.add_argument('--metrics-file', type=str,
+                            help='Write per-phase timings here in Prometheus text format '
+                                 '(e.g. for the node_exporter textfile collector).')
+
     def handle(self, *args, **kwargs):
         # Use BASE_DIR to locate slugs.txt in backend/
         slugs_file = os.path.join(settings.BASE_DIR, 'slugs.txt')
@@ -29,20 +59,94 @@ class Command(BaseCommand):
         with open(slugs_file, 'r') as f:
             slugs = [line.strip() for line in f if line.strip()]
 
+        # Resume an interrupted run from its checkpoint
+        checkpoint = kwargs['checkpoint']
+        if kwargs['restart'] and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        done = set()
+        if os.path.exists(checkpoint):
+            with open(checkpoint, 'r') as f:
+                done = {line.strip() for line in f if line.strip()}
+
+        # Skip problems that were scraped recently enough
+        fresh = set()
+        if not kwargs['force']:
+            cutoff = timezone.now() - timedelta(hours=kwargs['max_age'])
+            fresh = set(Problem.objects.filter(slug__in=slugs, last_scraped_at__gte=cutoff)
+                        .values_list('slug', flat=True))
+
+        skipped = len(slugs)
+        slugs = [slug for slug in slugs if slug not in done and slug not in fresh]
+        skipped -= len(slugs)
+
         total_slugs = len(slugs)
-        logger.info(f"Starting to scrape {total_slugs} problems.")
-        self.stdout.write(self.style.NOTICE(f"Starting to scrape {total_slugs} problems."))
-
-        for idx, slug in enumerate(slugs, start=1):
-            logger.info(f"Scraping problem {idx}/{total_slugs}: {slug}")
-            self.stdout.write(self.style.NOTICE(f"Scraping problem {idx}/{total_slugs}: {slug}"))
-            # Call the single scraper command
-            call(['python', 'manage.py', 'scrape_neetcode', slug])
-            # Optional: Add a delay to prevent overwhelming the server
-            sleep_time = random.uniform(2, 5)  # Random delay between 2 to 5 seconds
-            logger.info(f"Sleeping for {sleep_time:.2f} seconds to prevent server overload.")
-            self.stdout.write(self.style.NOTICE(f"Sleeping for {sleep_time:.2f} seconds."))
-            time.sleep(sleep_time)
-
-        logger.info("Completed scraping all problems.")
-        self.stdout.write(self.style.SUCCESS("Completed scraping all problems."))
+        logger.info(f"Starting to scrape {total_slugs} problems ({skipped} fresh or checkpointed).")
+        self.stdout.write(self.style.NOTICE(f"Starting to scrape {total_slugs} problems ({skipped} fresh or checkpointed)."))
+
+        pool = DriverPool(kwargs['workers'], max_pages=kwargs['max_pages'])
+
+        def scrape_one(slug):
+            try:
+                return scrape(slug, backend=kwargs['backend'], pool=pool, url_template=kwargs['url_template'])
+            finally:
+                # Optional: Add a delay to prevent overwhelming the server
+                sleep_time = random.uniform(2, 5)  # Random delay between 2 to 5 seconds
+                logger.info(f"Sleeping for {sleep_time:.2f} seconds to prevent server overload.")
+                time.sleep(sleep_time)
+
+        failed = 0
+        changed = 0
+        with open(checkpoint, 'a') as log:
+
+            def on_flush(results, errors):
+                nonlocal changed, failed
+                # Only checkpoint slugs whose batch has been committed
+                for slug, was_changed in results.items():
+                    changed += was_changed
+                    log.write(slug + '\n')
+                log.flush()
+                for slug, e in errors.items():
+                    failed += 1
+                    self.stderr.write(self.style.ERROR(f"Failed to save {slug}: {e}"))
+                self.stdout.write(self.style.NOTICE(
+                    f"Saved {len(results)} problems ({sum(results.values())} changed)."
+                ))
+
+            writer = ProblemWriter(kwargs['batch_size'], kwargs['flush_interval'], on_flush=on_flush)
+            try:
+                with ThreadPoolExecutor(max_workers=kwargs['workers']) as executor:
+                    futures = {executor.submit(scrape_one, slug): slug for slug in slugs}
+                    pending = set(futures)
+                    idx = 0
+                    while pending:
+                        # Wake up for the flush interval too, so buffered rows
+                        # aren't held back while every worker is on a slow page
+                        finished, pending = wait(pending, timeout=writer.due_in(), return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            idx += 1
+                            slug = futures[future]
+                            try:
+                                data = future.result()
+                            except Exception as e:
+                                failed += 1
+                                logger.error(f"Failed to scrape {slug}: {e}")
+                                self.stderr.write(self.style.ERROR(f"Problem {idx}/{total_slugs} failed: {slug}: {e}"))
+                                continue
+                            logger.info(f"Scraped problem {idx}/{total_slugs}: {slug}")
+                            self.stdout.write(self.style.NOTICE(f"Scraped problem {idx}/{total_slugs}: {slug}"))
+                            writer.add(data)
+                        writer.flush_if_due()
+            finally:
+                writer.flush()
+                pool.close()
+
+        # A clean run starts the next one from scratch; freshness decides what to skip
+        if not failed and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        if kwargs['metrics_file']:
+            with open(kwargs['metrics_file'], 'w') as f:
+                f.write(metrics.render())
+
+        logger.info(f"Completed scraping all problems ({changed} changed, {failed} failed).")
+        self.stdout.write(self.style.SUCCESS(f"Completed scraping all problems ({changed} changed, {failed} failed)."))
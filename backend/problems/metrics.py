@@ -0,0 +1,170 @@
+# backend/problems/metrics.py
+
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a ~1ms DB lookup up to a slow model call or page load
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.samples().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._lock = threading.Lock()
+        # key -> [per-bucket counts, sum, count]
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = [counts, total + value, count + 1]
+
+    def samples(self):
+        with self._lock:
+            return {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.samples().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _labels(self.labelnames, key, [("le", _number(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "testgen_stage_seconds",
+    "Time spent in each generation and scraping stage.",
+    ["stage"],
+)
+STAGE_ERRORS = Counter(
+    "testgen_stage_errors_total",
+    "Stages that ended with an exception.",
+    ["stage"],
+)
+LLM_TOKENS = Counter(
+    "testgen_llm_tokens_total",
+    "Tokens sent to and received from the model.",
+    ["model", "direction"],
+)
+LLM_CALL_TOKENS = Histogram(
+    "testgen_llm_call_tokens",
+    "Tokens per model call.",
+    ["model", "direction"],
+    buckets=TOKEN_BUCKETS,
+)
+
+REGISTRY = [STAGE_SECONDS, STAGE_ERRORS, LLM_TOKENS, LLM_CALL_TOKENS]
+
+# Callables returning extra exposition lines, for state kept elsewhere
+# (e.g. the generation cache counters)
+_collectors = []
+
+
+def register_collector(collect):
+    _collectors.append(collect)
+    return collect
+
+
+def family(name, kind, help, samples):
+    """Exposition lines for one metric family; samples is a list of ({label: value}, number)."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+    return lines
+
+
+@contextmanager
+def span(stage):
+    """
+    Time the enclosed block into testgen_stage_seconds{stage=...}. Also
+    works as a decorator on plain (not async) functions.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        logger.debug(f"stage={stage} seconds={elapsed:.4f}")
+
+
+def record_tokens(model, prompt_tokens, response_tokens):
+    for direction, tokens in (("prompt", prompt_tokens), ("response", response_tokens)):
+        if tokens is None:
+            continue
+        LLM_TOKENS.inc(tokens, model=model, direction=direction)
+        LLM_CALL_TOKENS.observe(tokens, model=model, direction=direction)
+
+
+def render():
+    """All metrics of this process in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        lines.extend(collect())
+    return "\n".join(lines) + "\n"
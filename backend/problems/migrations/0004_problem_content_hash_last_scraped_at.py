@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0003_generationcache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='last_scraped_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0004_problem_content_hash_last_scraped_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Solution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=50)),
+                ('code', models.TextField()),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='solutions', to='problems.problem')),
+            ],
+            options={
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['problem', 'language'], name='problems_so_problem_159b2e_idx')],
+            },
+        ),
+    ]
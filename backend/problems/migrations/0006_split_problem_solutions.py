@@ -0,0 +1,35 @@
+import re
+
+from django.db import migrations
+
+# Matches the "<Language> Solution:\n" headers the scraper used to join
+# every language into Problem.solution
+HEADER = re.compile(r'(?:^|\n\n)(\w+) Solution:\n')
+
+
+def split_solutions(apps, schema_editor):
+    Problem = apps.get_model('problems', 'Problem')
+    Solution = apps.get_model('problems', 'Solution')
+
+    rows = []
+    for problem in Problem.objects.exclude(solution='').iterator():
+        parts = HEADER.split(problem.solution)
+        # parts is ['', language, code, language, code, ...]
+        for position, (language, code) in enumerate(zip(parts[1::2], parts[2::2])):
+            rows.append(Solution(problem=problem, language=language.lower(), code=code.strip(), position=position))
+    Solution.objects.bulk_create(rows, batch_size=500)
+
+
+def remove_solutions(apps, schema_editor):
+    apps.get_model('problems', 'Solution').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0005_solution'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_solutions, remove_solutions),
+    ]
@@ -0,0 +1,85 @@
+from django.db import migrations
+
+# The statements problems.search.install() ran when this migration was
+# written, frozen here so later changes to that module don't rewrite
+# history. install() still repairs the SQLite triggers after every migrate.
+
+POSTGRES = [
+    "ALTER TABLE problems_problem ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', left(coalesce(title, ''), 100000)), 'A') || "
+    "setweight(to_tsvector('english', left(coalesce(description, ''), 100000)), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS problems_problem_search_vector_gin ON problems_problem USING GIN (search_vector)",
+    "ALTER TABLE problems_testcase ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', left(coalesce(input_data, ''), 100000)), 'A') || "
+    "setweight(to_tsvector('simple', left(coalesce(expected_output, ''), 100000)), 'A')) STORED",
+    "CREATE INDEX IF NOT EXISTS problems_testcase_search_vector_gin ON problems_testcase USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS problems_problem_search_vector_gin",
+    "ALTER TABLE problems_problem DROP COLUMN IF EXISTS search_vector",
+    "DROP INDEX IF EXISTS problems_testcase_search_vector_gin",
+    "ALTER TABLE problems_testcase DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS problems_problem_fts USING fts5("
+    "title, description, content='problems_problem', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS problems_problem_fts_ai AFTER INSERT ON problems_problem BEGIN "
+    "INSERT INTO problems_problem_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS problems_problem_fts_ad AFTER DELETE ON problems_problem BEGIN "
+    "INSERT INTO problems_problem_fts(problems_problem_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS problems_problem_fts_au AFTER UPDATE ON problems_problem BEGIN "
+    "INSERT INTO problems_problem_fts(problems_problem_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO problems_problem_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "INSERT INTO problems_problem_fts(problems_problem_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS problems_testcase_fts USING fts5("
+    "input_data, expected_output, content='problems_testcase', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS problems_testcase_fts_ai AFTER INSERT ON problems_testcase BEGIN "
+    "INSERT INTO problems_testcase_fts(rowid, input_data, expected_output) "
+    "VALUES (new.id, new.input_data, new.expected_output); END",
+    "CREATE TRIGGER IF NOT EXISTS problems_testcase_fts_ad AFTER DELETE ON problems_testcase BEGIN "
+    "INSERT INTO problems_testcase_fts(problems_testcase_fts, rowid, input_data, expected_output) "
+    "VALUES ('delete', old.id, old.input_data, old.expected_output); END",
+    "CREATE TRIGGER IF NOT EXISTS problems_testcase_fts_au AFTER UPDATE ON problems_testcase BEGIN "
+    "INSERT INTO problems_testcase_fts(problems_testcase_fts, rowid, input_data, expected_output) "
+    "VALUES ('delete', old.id, old.input_data, old.expected_output); "
+    "INSERT INTO problems_testcase_fts(rowid, input_data, expected_output) "
+    "VALUES (new.id, new.input_data, new.expected_output); END",
+    "INSERT INTO problems_testcase_fts(problems_testcase_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}"
+    for table in ('problems_problem', 'problems_testcase') for suffix in ('ai', 'ad', 'au')
+] + [
+    "DROP TABLE IF EXISTS problems_problem_fts",
+    "DROP TABLE IF EXISTS problems_testcase_fts",
+]
+
+
+def _run(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            cursor.execute(statement)
+
+
+def install_search(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES, 'sqlite': SQLITE})
+
+
+def uninstall_search(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0007_problem_updated_at_testcase_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
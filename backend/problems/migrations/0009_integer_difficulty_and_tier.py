@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+DIFFICULTIES = {'easy': 1, 'medium': 2, 'hard': 3}
+TIERS = {'small': 1, 'medium': 2, 'large': 3, 'edge': 4}
+# Older rows stored easy/medium/hard as the test case "difficulty"
+LEGACY_TIERS = {**TIERS, 'easy': 1, 'hard': 3}
+
+
+def to_codes(apps, schema_editor):
+    Problem = apps.get_model('problems', 'Problem')
+    TestCase = apps.get_model('problems', 'TestCase')
+    # One UPDATE per distinct old value instead of one per row
+    for value in Problem.objects.values_list('difficulty', flat=True).distinct():
+        code = DIFFICULTIES.get((value or '').strip().lower(), 1)
+        Problem.objects.filter(difficulty=value).update(difficulty_code=code)
+    for value in TestCase.objects.values_list('difficulty', flat=True).distinct():
+        code = LEGACY_TIERS.get((value or '').strip().lower(), 2)
+        TestCase.objects.filter(difficulty=value).update(tier=code)
+
+
+def to_names(apps, schema_editor):
+    Problem = apps.get_model('problems', 'Problem')
+    TestCase = apps.get_model('problems', 'TestCase')
+    for name, code in DIFFICULTIES.items():
+        Problem.objects.filter(difficulty_code=code).update(difficulty=name)
+    for name, code in TIERS.items():
+        TestCase.objects.filter(tier=code).update(difficulty=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0008_full_text_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='difficulty_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='tier',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        # Nullable first, so unapplying can re-add the columns and let to_names fill them
+        migrations.AlterField(
+            model_name='problem',
+            name='difficulty',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='testcase',
+            name='difficulty',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.RunPython(to_codes, to_names),
+        migrations.RemoveField(
+            model_name='problem',
+            name='difficulty',
+        ),
+        migrations.RenameField(
+            model_name='problem',
+            old_name='difficulty_code',
+            new_name='difficulty',
+        ),
+        migrations.AlterField(
+            model_name='problem',
+            name='difficulty',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Easy'), (2, 'Medium'), (3, 'Hard')], db_index=True, default=1),
+        ),
+        migrations.RemoveField(
+            model_name='testcase',
+            name='difficulty',
+        ),
+        migrations.AlterField(
+            model_name='testcase',
+            name='tier',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'small'), (2, 'medium'), (3, 'large'), (4, 'edge')]),
+        ),
+        migrations.AddIndex(
+            model_name='testcase',
+            index=models.Index(fields=['problem', 'tier'], name='problems_te_problem_5cd77b_idx'),
+        ),
+        migrations.AlterField(
+            model_name='testcase',
+            name='problem',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='test_cases', to='problems.problem'),
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:07
+
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import migrations, models
+
+# Self-contained copy of the blob layout problems.blobs used when this was
+# written: gzip, content-addressed as <sha[:2]>/<sha>.gz in 'testcase_blobs'
+STORAGE = 'testcase_blobs'
+INLINE_MAX_BYTES = getattr(settings, 'TEST_CASE_INLINE_MAX_BYTES', 64 * 1024)
+PARTS = {'input': 'input_data', 'expected_output': 'expected_output'}
+FIELDS = [f'{part}_{suffix}' for part in PARTS for suffix in ('size', 'sha256', 'external')] + list(PARTS.values())
+
+
+def _blob_name(digest):
+    return f"{digest[:2]}/{digest}.gz"
+
+
+def _set_payload(test_case, part, text):
+    data = (text or '').encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    external = len(data) > INLINE_MAX_BYTES
+    if external:
+        store = storages[STORAGE]
+        if not store.exists(_blob_name(digest)):
+            store.save(_blob_name(digest), ContentFile(gzip.compress(data, mtime=0)))
+        setattr(test_case, PARTS[part], '')
+    setattr(test_case, f'{part}_external', external)
+    setattr(test_case, f'{part}_sha256', digest)
+    setattr(test_case, f'{part}_size', len(data))
+
+
+def externalize(apps, schema_editor):
+    # Fill size/hash metadata and move payloads over the inline limit out of the row
+    TestCase = apps.get_model('problems', 'TestCase')
+    batch = []
+    for test_case in TestCase.objects.only('id', *PARTS.values()).iterator(chunk_size=500):
+        for part, field in PARTS.items():
+            _set_payload(test_case, part, getattr(test_case, field))
+        batch.append(test_case)
+        if len(batch) >= 500:
+            TestCase.objects.bulk_update(batch, FIELDS)
+            batch = []
+    if batch:
+        TestCase.objects.bulk_update(batch, FIELDS)
+
+
+def inline(apps, schema_editor):
+    TestCase = apps.get_model('problems', 'TestCase')
+    store = storages[STORAGE]
+    for part, field in PARTS.items():
+        external = TestCase.objects.filter(**{f'{part}_external': True}).only('id', f'{part}_sha256')
+        for test_case in external.iterator(chunk_size=500):
+            with store.open(_blob_name(getattr(test_case, f'{part}_sha256')), 'rb') as raw:
+                text = gzip.decompress(raw.read()).decode('utf-8')
+            TestCase.objects.filter(pk=test_case.pk).update(**{field: text})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0009_integer_difficulty_and_tier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcase',
+            name='expected_output_external',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='expected_output_sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='expected_output_size',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='input_external',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='input_sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='input_size',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='testcase',
+            name='expected_output',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='testcase',
+            name='input_data',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(externalize, inline),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0010_test_case_payload_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcase',
+            name='generator',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
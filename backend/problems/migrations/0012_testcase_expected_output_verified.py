@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0011_testcase_generator'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcase',
+            name='expected_output_verified',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0012_testcase_expected_output_verified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcase',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='minhash',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='near_duplicate',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name='testcase',
+            constraint=models.UniqueConstraint(fields=('problem', 'content_hash'), name='unique_test_case_content'),
+        ),
+    ]
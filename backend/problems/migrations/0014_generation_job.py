@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0013_test_case_dedup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=50)),
+                ('refresh', models.BooleanField(default=False)),
+                ('priority', models.SmallIntegerField(default=0)),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'queued'), (2, 'running'), (3, 'done'), (4, 'failed')], default=1)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generation_jobs', to='problems.problem')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 1)), fields=['-priority', 'id'], name='generation_job_queue'), models.Index(condition=models.Q(('status', 2)), fields=['locked_until'], name='generation_job_running')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', [1, 2])), fields=('problem', 'language'), name='unique_active_generation_job')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0014_generation_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='rerun',
+            field=models.BooleanField(default=False),
+        ),
+    ]
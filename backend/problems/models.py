@@ -1,22 +1,148 @@
 # backend/problems/models.py
 
 from django.db import models
+from django.utils import timezone
+
+class Difficulty(models.IntegerChoices):
+    EASY = 1, 'Easy'
+    MEDIUM = 2, 'Medium'
+    HARD = 3, 'Hard'
+
+class Tier(models.IntegerChoices):
+    # Labels are the names used in the generation prompt and the API
+    SMALL = 1, 'small'
+    MEDIUM = 2, 'medium'
+    LARGE = 3, 'large'
+    EDGE = 4, 'edge'
 
 class Problem(models.Model):
     title = models.CharField(max_length=255, unique=True)
     slug = models.SlugField(max_length=255, unique=True)
     description = models.TextField()
-    difficulty = models.CharField(max_length=50)
+    difficulty = models.PositiveSmallIntegerField(choices=Difficulty.choices, default=Difficulty.EASY, db_index=True)
     solution = models.TextField()
+    # sha256 of the scraped title/description/solution, used to skip no-op writes
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    last_scraped_at = models.DateTimeField(null=True, blank=True)
+    # Bumped on every content change; feeds Last-Modified and ETag
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
 
+class Solution(models.Model):
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='solutions')
+    language = models.CharField(max_length=50)  # lower-case, e.g. 'python', 'cpp'
+    code = models.TextField()
+    # Order on the Solution tab; NeetCode lists approaches from brute force to optimal
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['position']
+        indexes = [models.Index(fields=['problem', 'language'])]
+
+    def __str__(self):
+        return f"{self.language} solution for {self.problem.title}"
+
 class TestCase(models.Model):
-    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='test_cases')
-    input_data = models.TextField()
-    expected_output = models.TextField()
-    difficulty = models.CharField(max_length=50)
+    # Indexed through (problem, tier) below rather than on its own
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='test_cases', db_index=False)
+    # Payloads over TEST_CASE_INLINE_MAX_BYTES are kept gzipped in the blob
+    # store (problems.blobs) under their sha256; the text column is then empty
+    input_data = models.TextField(blank=True)
+    expected_output = models.TextField(blank=True)
+    input_size = models.PositiveBigIntegerField(default=0)
+    input_sha256 = models.CharField(max_length=64, blank=True, default='')
+    input_external = models.BooleanField(default=False)
+    expected_output_size = models.PositiveBigIntegerField(default=0)
+    expected_output_sha256 = models.CharField(max_length=64, blank=True, default='')
+    expected_output_external = models.BooleanField(default=False)
+    tier = models.PositiveSmallIntegerField(choices=Tier.choices)
+    # Spec the input was expanded from (problems.generators), if any; the
+    # input can be regenerated from it exactly
+    generator = models.JSONField(null=True, blank=True)
+    # expected_output came from running the reference solution, not the model
+    expected_output_verified = models.BooleanField(default=False)
+    # problems.dedup: sha256 of the normalized input (null until backfilled
+    # by compact_test_cases), its MinHash signature, and whether it is close
+    # to an earlier case of the same problem
+    content_hash = models.CharField(max_length=64, null=True, blank=True)
+    minhash = models.BinaryField(null=True, blank=True)
+    near_duplicate = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Downloadable part -> text column
+    PAYLOADS = {'input': 'input_data', 'expected_output': 'expected_output'}
+
+    class Meta:
+        indexes = [models.Index(fields=['problem', 'tier'])]
+        constraints = [
+            models.UniqueConstraint(fields=['problem', 'content_hash'], name='unique_test_case_content'),
+        ]
 
     def __str__(self):
         return f"TestCase for {self.problem.title}"
+
+class JobStatus(models.IntegerChoices):
+    QUEUED = 1, 'queued'
+    RUNNING = 2, 'running'
+    DONE = 3, 'done'
+    FAILED = 4, 'failed'
+
+class GenerationJob(models.Model):
+    # Queued by generate_test_case_view, run by the run_generation_workers
+    # command (problems.jobs)
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='generation_jobs')
+    language = models.CharField(max_length=50)
+    refresh = models.BooleanField(default=False)
+    # A refresh was asked for while the job ran; it is queued again, with
+    # refresh, once this run finishes
+    rerun = models.BooleanField(default=False)
+    # Higher runs first
+    priority = models.SmallIntegerField(default=0)
+    status = models.PositiveSmallIntegerField(choices=JobStatus.choices, default=JobStatus.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # Not claimable before this (retry backoff)
+    available_at = models.DateTimeField(default=timezone.now)
+    # A running job whose worker hasn't finished by this is claimable again
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The claim query: queued jobs by priority, oldest first
+            models.Index(
+                fields=['-priority', 'id'], name='generation_job_queue',
+                condition=models.Q(status=JobStatus.QUEUED),
+            ),
+            models.Index(
+                fields=['locked_until'], name='generation_job_running',
+                condition=models.Q(status=JobStatus.RUNNING),
+            ),
+        ]
+        constraints = [
+            # At most one pending job per problem and language; enqueue reuses it
+            models.UniqueConstraint(
+                fields=['problem', 'language'], name='unique_active_generation_job',
+                condition=models.Q(status__in=[JobStatus.QUEUED, JobStatus.RUNNING]),
+            ),
+        ]
+
+    def __str__(self):
+        return f"GenerationJob {self.pk} for {self.problem.title} ({self.get_status_display()})"
+
+class GenerationCache(models.Model):
+    # sha256 of the formatted prompt, model name and generation parameters
+    key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=100)
+    response_text = models.TextField()
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"GenerationCache {self.key[:12]} ({self.model_name})"
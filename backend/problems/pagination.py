@@ -0,0 +1,43 @@
+# backend/problems/pagination.py
+
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(last_id):
+    payload = json.dumps({"id": last_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """The id to continue after; cursors are opaque to clients."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+    # bool is an int subclass, so {"id": true} would otherwise pass
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return last_id
+
+
+async def keyset_page(queryset, cursor, limit):
+    """
+    One page of queryset ordered by id, starting after cursor. Returns
+    (rows, next_cursor); next_cursor is None on the last page. Each page is
+    an index range scan on the primary key, so its cost does not grow with
+    how deep the client has paged.
+    """
+    if cursor:
+        queryset = queryset.filter(id__gt=decode_cursor(cursor))
+    # One extra row tells whether another page exists without a COUNT(*)
+    rows = [row async for row in queryset.order_by("id")[:limit + 1]]
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].id)
+    return rows, None
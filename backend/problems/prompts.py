@@ -0,0 +1,58 @@
+# backend/problems/prompts.py
+
+from django.conf import settings
+
+LANGUAGE_NAMES = {
+    'cpp': 'C++',
+    'csharp': 'C#',
+    'javascript': 'JavaScript',
+    'typescript': 'TypeScript',
+}
+
+TRUNCATION_MARK = "\n[... description truncated ...]"
+
+
+def language_name(language):
+    return LANGUAGE_NAMES.get(language, language.capitalize())
+
+
+def estimate_tokens(text):
+    # Gemini averages roughly four characters per token on English and code
+    return len(text) // 4 + 1
+
+
+def enforce_budget(render, problem_data, budget=None):
+    """
+    Render the prompt and, if it is over the token budget, first keep only the
+    last (usually optimal) solution, then cut the description to fit.
+    """
+    budget = budget or settings.PROMPT_TOKEN_BUDGET
+    prompt = render(problem_data)
+    overflow = estimate_tokens(prompt) - budget
+    if overflow <= 0:
+        return prompt
+
+    solutions = problem_data['solutions']
+    if len(solutions) > 1:
+        problem_data = {**problem_data, 'solutions': solutions[-1:], 'solution': solutions[-1]}
+        prompt = render(problem_data)
+        overflow = estimate_tokens(prompt) - budget
+        if overflow <= 0:
+            return prompt
+
+    description = problem_data['description']
+    keep = max(0, len(description) - overflow * 4 - len(TRUNCATION_MARK))
+    problem_data = {**problem_data, 'description': description[:keep] + TRUNCATION_MARK}
+    return render(problem_data)
+
+
+def pick_solutions(rows, language):
+    """
+    From (language, code) rows return (language, [code, ...]) for the requested
+    language, falling back to the first language available.
+    """
+    codes = [code for row_language, code in rows if row_language == language]
+    if not codes and rows:
+        language = rows[0][0]
+        codes = [code for row_language, code in rows if row_language == language]
+    return language, codes
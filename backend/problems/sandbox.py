@@ -0,0 +1,504 @@
+# backend/problems/sandbox.py
+
+import ast
+import atexit
+import collections
+import functools
+import inspect
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import resource
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Runs a problem's reference Python solution against test inputs in a pool
+# of long-lived worker processes. Each worker has an empty environment, a
+# memory (address space) cap, no file writes and no child processes, and
+# every case gets a CPU and a wall-clock limit; a worker that hits one is
+# killed and replaced. This contains runaway or greedy solutions; it is not
+# a boundary against hostile code, and the solutions are the ones scraped
+# from NeetCode. As on LeetCode, linked list and tree arguments are written
+# as lists, and a design problem's input is its list of calls and their
+# arguments (["LRUCache","put","get"] then [[2],[1,1],[1]]).
+
+# What LeetCode's Python environment has imported for a solution
+PRELUDE = """
+from typing import *
+import bisect, collections, functools, heapq, itertools, math, string
+from collections import Counter, OrderedDict, defaultdict, deque
+from functools import cache, lru_cache
+from heapq import heapify, heappop, heappush
+from math import inf
+
+
+class ListNode:
+    def __init__(self, val=0, next=None):
+        self.val = val
+        self.next = next
+
+
+class TreeNode:
+    def __init__(self, val=0, left=None, right=None):
+        self.val = val
+        self.left = left
+        self.right = right
+"""
+
+RECURSION_LIMIT = 20_000
+
+
+class SandboxError(Exception):
+    pass
+
+
+_NAME = re.compile(r'\s*([A-Za-z_]\w*)\s*=\s*')
+_SEPARATOR = re.compile(r'\s*(?:,|$)')
+_decoder = json.JSONDecoder()
+_LITERAL_NAMES = {'true': True, 'false': False, 'null': None, 'None': None, 'True': True, 'False': False}
+
+
+def _json_arguments(text):
+    # The common case, "nums = [2,7,11,15], target = 9", at C speed
+    arguments = {}
+    position = 0
+    while position < len(text):
+        name = _NAME.match(text, position)
+        if not name:
+            raise ValueError(text[position:position + 20])
+        value, position = _decoder.raw_decode(text, name.end())
+        separator = _SEPARATOR.match(text, position)
+        if not separator:
+            raise ValueError(text[position:position + 20])
+        arguments[name.group(1)] = value
+        position = separator.end()
+    return (), arguments
+
+
+class _Literals(ast.NodeTransformer):
+    def visit_Name(self, node):
+        if node.id not in _LITERAL_NAMES:
+            raise ValueError(f"unknown name {node.id!r}")
+        return ast.copy_location(ast.Constant(_LITERAL_NAMES[node.id]), node)
+
+
+def _python_arguments(text):
+    # Single-quoted strings, tuples and positional arguments
+    call = ast.parse(f"f({text})", mode='eval').body
+    literals = _Literals()
+    args = tuple(ast.literal_eval(literals.visit(arg)) for arg in call.args)
+    kwargs = {keyword.arg: ast.literal_eval(literals.visit(keyword.value)) for keyword in call.keywords}
+    return args, kwargs
+
+
+def parse_arguments(text):
+    """(args, kwargs) from input written the way LeetCode shows it."""
+    try:
+        return _json_arguments(text.strip())
+    except ValueError:
+        pass
+    try:
+        return _python_arguments(text.strip())
+    except (SyntaxError, ValueError, TypeError) as e:
+        raise SandboxError(f"Can't read the test input as arguments: {e}")
+
+
+_BETWEEN = re.compile(r'\s*,?\s*')
+
+
+def parse_calls(text):
+    """
+    (operations, arguments) from a design problem's input, written the way
+    LeetCode shows it: ["LRUCache","put","get"] then [[2],[1,1],[1]].
+    """
+    text = text.strip()
+    try:
+        operations, position = _decoder.raw_decode(text)
+        arguments, position = _decoder.raw_decode(text, _BETWEEN.match(text, position).end())
+        if position != len(text):
+            raise ValueError(text[position:position + 20])
+    except ValueError:
+        # Also "operations = [...], arguments = [...]"
+        args, kwargs = parse_arguments(text)
+        values = [*args, *kwargs.values()]
+        if len(values) != 2:
+            raise SandboxError("Can't read the test input as a list of calls and a list of their arguments.")
+        operations, arguments = values
+    if not (
+        isinstance(operations, (list, tuple)) and operations and all(isinstance(name, str) for name in operations)
+        and isinstance(arguments, (list, tuple)) and len(arguments) == len(operations)
+        and all(isinstance(call, (list, tuple)) for call in arguments)
+    ):
+        raise SandboxError("Can't read the test input as a list of calls and a list of their arguments.")
+    return list(operations), [list(call) for call in arguments]
+
+
+def format_output(value):
+    # LeetCode style: compact JSON, so [0,1], true and "abc"
+    try:
+        return json.dumps(value, separators=(',', ':'), default=_jsonable)
+    except (TypeError, ValueError) as e:
+        raise SandboxError(f"Can't write the solution's return value: {e}")
+
+
+def _list_values(head):
+    values, seen = [], set()
+    while head is not None:
+        if id(head) in seen:
+            raise ValueError("the linked list has a cycle")
+        seen.add(id(head))
+        values.append(head.val)
+        head = head.next
+    return values
+
+
+def _tree_values(root):
+    # Level order with null for a missing child, trailing nulls dropped
+    values, nodes = [], collections.deque([root])
+    while nodes:
+        node = nodes.popleft()
+        if node is None:
+            values.append(None)
+            continue
+        values.append(node.val)
+        nodes.extend((node.left, node.right))
+    while values and values[-1] is None:
+        values.pop()
+    return values
+
+
+def _jsonable(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if type(value).__name__ == 'ListNode':
+        return _list_values(value)
+    if type(value).__name__ == 'TreeNode':
+        return _tree_values(value)
+    raise TypeError(f"{type(value).__name__} is not supported")
+
+
+def _build_list(namespace, values):
+    head = None
+    for value in reversed(values):
+        head = namespace['ListNode'](value, head)
+    return head
+
+
+def _build_tree(namespace, values):
+    if not values or values[0] is None:
+        return None
+    root = namespace['TreeNode'](values[0])
+    nodes = collections.deque([root])
+    rest = iter(values[1:])
+    while nodes:
+        node = nodes.popleft()
+        for side in ('left', 'right'):
+            value = next(rest, None)
+            if value is not None:
+                child = namespace['TreeNode'](value)
+                setattr(node, side, child)
+                nodes.append(child)
+    return root
+
+
+_NODE_BUILDERS = {'ListNode': _build_list, 'TreeNode': _build_tree}
+_LIST_OF = re.compile(r'^(?:typing\.)?[Ll]ist\[')
+
+
+def _annotation_text(annotation):
+    return annotation if isinstance(annotation, str) else repr(annotation)
+
+
+def _node_arguments(namespace, method, args, kwargs):
+    # Linked lists and trees are written as lists; build the nodes the signature asks for
+    signature = inspect.signature(method)
+    try:
+        bound = signature.bind(None, *args, **kwargs)
+    except TypeError:
+        return args, kwargs
+    for name, value in bound.arguments.items():
+        text = _annotation_text(signature.parameters[name].annotation)
+        for kind, build in _NODE_BUILDERS.items():
+            if kind not in text or not isinstance(value, list):
+                continue
+            if _LIST_OF.match(text):
+                value = [build(namespace, item) if isinstance(item, list) else item for item in value]
+            else:
+                value = build(namespace, value)
+            bound.arguments[name] = value
+            break
+    return bound.args[1:], bound.kwargs
+
+
+def _entry_point(solution, args, kwargs):
+    methods = [
+        (name, member) for name, member in vars(solution).items()
+        if callable(member) and not name.startswith('_')
+    ]
+    if len(methods) > 1 and kwargs:
+        # Several methods: the one whose parameters are the input names
+        for name, member in methods:
+            if set(list(inspect.signature(member).parameters)[1:]) == set(kwargs):
+                return name, member
+    if len(methods) == 1:
+        return methods[0]
+    raise SandboxError("Can't tell which method of Solution to call.")
+
+
+def _load(code):
+    namespace = {'__name__': 'solution'}
+    exec(compile(PRELUDE + code, '<solution>', 'exec'), namespace)
+    # A Solution class, or a design problem's class(es)
+    if not any(
+        isinstance(value, type) and value.__module__ == 'solution' and name not in _NODE_BUILDERS
+        for name, value in namespace.items()
+    ):
+        raise SandboxError("The reference solution defines no class to call.")
+    return namespace
+
+
+def _run_calls(namespace, text):
+    # A design problem: construct the first operation's class, then call the rest on it
+    operations, arguments = parse_calls(text)
+    del text
+    cls = namespace.get(operations[0])
+    if not isinstance(cls, type):
+        raise SandboxError(f"The reference solution has no {operations[0]} class.")
+    instance = cls(*arguments[0])
+    outputs = [None]
+    for name, call_args in zip(operations[1:], arguments[1:]):
+        if name.startswith('_'):
+            raise SandboxError(f"Can't call {name}.")
+        outputs.append(getattr(instance, name)(*call_args))
+    return format_output(outputs)
+
+
+def _run(solutions, code, payload):
+    if code not in solutions:
+        solutions[code] = _load(code)
+    namespace = solutions[code]
+    if payload.get('dry_run'):
+        return None
+
+    if 'generator' in payload:
+        from .generators import expand
+        text = expand(payload['generator'])
+    else:
+        text = payload['input']
+    solution = namespace.get('Solution')
+    if not isinstance(solution, type):
+        return _run_calls(namespace, text)
+    args, kwargs = parse_arguments(text)
+    del text
+
+    name, method = _entry_point(solution, args, kwargs)
+    args, kwargs = _node_arguments(namespace, method, args, kwargs)
+    result = getattr(solution(), name)(*args, **kwargs)
+    returns = inspect.signature(method).return_annotation
+    if result is None and returns in (None, 'None'):
+        # "Do not return anything, modify nums in-place": the answer is the argument
+        result = args[0] if args else next(iter(kwargs.values()), None)
+    elif result is None and any(kind in _annotation_text(returns) for kind in _NODE_BUILDERS):
+        # An empty linked list or tree is written []
+        result = []
+    return format_output(result)
+
+
+# Audit events a solution has no business raising. RLIMIT_FSIZE alone
+# still lets open(path, 'w') truncate a file (Python ignores SIGXFSZ)
+_BLOCKED_EVENTS = {
+    'os.chmod', 'os.chown', 'os.exec', 'os.fork', 'os.forkpty', 'os.kill', 'os.link', 'os.mkdir',
+    'os.posix_spawn', 'os.putenv', 'os.remove', 'os.rename', 'os.rmdir', 'os.spawn', 'os.symlink',
+    'os.system', 'os.truncate', 'os.unsetenv', 'shutil.rmtree', 'socket.bind', 'socket.connect',
+    'socket.getaddrinfo', 'subprocess.Popen',
+}
+_WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_TRUNC
+
+
+def _audit(event, args):
+    if event in _BLOCKED_EVENTS:
+        raise PermissionError(f"{event} is not allowed in the sandbox.")
+    if event == 'open' and (
+        (isinstance(args[1], str) and any(flag in args[1] for flag in 'wax+'))
+        or (args[2] or 0) & _WRITE_FLAGS
+    ):
+        raise PermissionError("Writing files is not allowed in the sandbox.")
+
+
+def _cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _worker(conn, memory_bytes):
+    # Nothing from the server's environment (keys, database URLs)
+    os.environ.clear()
+    os.environ['OPENBLAS_NUM_THREADS'] = '1'
+    # Imported before the memory cap, which also counts numpy's mappings
+    from . import generators  # noqa: F401
+
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    sys.setrecursionlimit(RECURSION_LIMIT)
+    sys.addaudithook(_audit)
+
+    # Loaded Solution classes by source, kept while the worker is warm
+    solutions = {}
+    while True:
+        try:
+            code, payload, cpu_seconds = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        # Exceeding the soft limit sends SIGXCPU, which ends the worker
+        limit = int(_cpu_seconds() + cpu_seconds) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (limit, resource.RLIM_INFINITY))
+        try:
+            result = ('ok', _run(solutions, code, payload))
+        except MemoryError:
+            result = ('error', "Memory limit exceeded.")
+        except RecursionError:
+            result = ('error', "Recursion limit exceeded.")
+        except BaseException as e:
+            result = ('error', f"{type(e).__name__}: {e}")
+        conn.send(result)
+
+
+class Worker:
+    def __init__(self, context, memory_bytes):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker, args=(child, memory_bytes), daemon=True)
+        self.process.start()
+        child.close()
+
+    def run(self, code, payload, cpu_seconds, wall_seconds):
+        """The case's output, or SandboxError; a worker that hit a limit is killed."""
+        try:
+            self.conn.send((code, payload, cpu_seconds))
+            if not self.conn.poll(wall_seconds):
+                self.kill()
+                raise SandboxError(f"Time limit of {wall_seconds}s exceeded.")
+            status, value = self.conn.recv()
+        except (EOFError, OSError):
+            self.kill()
+            raise SandboxError(f"Worker exited with code {self.process.exitcode}, e.g. over its CPU or memory limit.")
+        if status != 'ok':
+            raise SandboxError(value)
+        return value
+
+    @property
+    def alive(self):
+        return self.process.is_alive()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    size worker processes, started on first use and reused between cases;
+    a worker that hit a limit is replaced on its next checkout.
+    """
+
+    def __init__(self, size, memory_bytes, cpu_seconds, wall_seconds):
+        self.size = size
+        self.memory_bytes = memory_bytes
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds
+        # Spawned, not forked: forking a threaded server process is unsafe
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(None)
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def _checkout(self):
+        worker = self._idle.get()
+        if worker is None or not worker.alive:
+            if worker is not None:
+                # Reaps the exited process and closes its end of the pipe
+                worker.kill()
+            replacement = Worker(self._context, self.memory_bytes)
+            with self._lock:
+                if worker in self._workers:
+                    self._workers.remove(worker)
+                self._workers.append(replacement)
+            worker = replacement
+        return worker
+
+    def run(self, code, payload):
+        worker = self._checkout()
+        try:
+            return worker.run(code, payload, self.cpu_seconds, self.wall_seconds)
+        finally:
+            self._idle.put(worker)
+
+    def run_many(self, code, payloads):
+        """
+        Run every payload ({"input": text} or {"generator": spec}) across
+        the pool; returns one (output, None) or (None, error) per payload.
+        """
+        def attempt(payload):
+            try:
+                return self.run(code, payload), None
+            except SandboxError as e:
+                return None, str(e)
+
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(attempt, payloads))
+
+    def dry_run(self, code):
+        """Load code in a worker without running a case; SandboxError if it can't be."""
+        self.run(code, {'dry_run': True})
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            if worker.alive:
+                worker.kill()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = WorkerPool(
+                    settings.SANDBOX_WORKERS,
+                    settings.SANDBOX_MEMORY_MB * 1024 * 1024,
+                    settings.SANDBOX_CPU_SECONDS,
+                    settings.SANDBOX_WALL_SECONDS,
+                )
+                atexit.register(_pool.shutdown)
+    return _pool
+
+
+@functools.lru_cache(maxsize=1024)
+def loads(code):
+    """
+    Whether code loads in the sandbox with a class to call. Checked before
+    the model is asked for inputs only, since a reference that can't run
+    leaves those cases without expected outputs.
+    """
+    try:
+        get_pool().dry_run(code)
+    except SandboxError as e:
+        logger.warning(f"Reference solution doesn't load in the sandbox: {e}")
+        return False
+    return True
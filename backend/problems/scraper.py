@@ -0,0 +1,530 @@
+# backend/problems/scraper.py
+
+import hashlib
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException, TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from webdriver_manager.chrome import ChromeDriverManager
+
+from . import metrics
+from .models import Difficulty, Problem, Solution
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+    'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.6778.70 Safari/537.36'
+)
+
+BACKENDS = ('auto', 'http', 'selenium')
+
+
+def problem_url(slug, url_template=None):
+    return (url_template or settings.NEETCODE_URL).format(slug=slug)
+
+
+def chrome_options():
+    options = Options()
+    options.add_argument('--headless')  # Enable headless mode; comment out for debugging
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument(f'user-agent={USER_AGENT}')
+    return options
+
+
+@lru_cache(maxsize=None)
+def chromedriver_path():
+    # Resolve (and download if needed) the driver binary once per process
+    return ChromeDriverManager().install()
+
+
+def create_driver():
+    service = Service(chromedriver_path())
+    return webdriver.Chrome(service=service, options=chrome_options())
+
+
+# Everything below runs inside the page, so each call is one WebDriver round trip
+
+OPEN_TAB_SCRIPT = """
+const span = Array.from(document.querySelectorAll('span')).find(s => s.textContent.trim() === arguments[0]);
+if (!span) return 'missing';
+const li = span.closest('li');
+if (li && li.classList.contains('my-active-tab')) return 'active';
+span.click();
+return 'clicked';
+"""
+
+TAB_READY_SCRIPT = """
+const span = Array.from(document.querySelectorAll('span')).find(s => s.textContent.trim() === arguments[0]);
+const li = span && span.closest('li');
+return !!(li && li.classList.contains('my-active-tab') && document.querySelector(arguments[1]));
+"""
+
+EXTRACT_SCRIPT = """
+const text = el => (el.innerText || el.textContent || '').trim();
+const h1 = document.querySelector('h1');
+const container = document.querySelector('.my-article-component-container');
+const blocks = container ? Array.from(container.querySelectorAll('p, pre')).map(text).filter(Boolean) : null;
+const solutions = [];
+document.querySelectorAll('.code-toolbar pre').forEach(pre => {
+    const match = (pre.getAttribute('class') || '').match(/language-(\\S+)/);
+    const code = pre.querySelector('code');
+    if (match && code) solutions.push([match[1], text(code)]);
+});
+return {title: h1 ? text(h1) : null, description: blocks, solutions: solutions};
+"""
+
+# CSS selector that must be present before a tab's content counts as loaded
+TAB_CONTENT = {
+    'Question': '.my-article-component-container',
+    'Solution': '.code-toolbar pre code',
+}
+
+
+@metrics.span('scrape_tab_wait')
+def _open_tab(driver, wait, name):
+    state = driver.execute_script(OPEN_TAB_SCRIPT, name)
+    if state == 'missing':
+        logger.warning(f"'{name}' tab not found.")
+        return False
+    if state == 'clicked':
+        logger.info(f"Switched to '{name}' tab.")
+    # Wait for the content to load instead of sleeping a fixed time
+    try:
+        wait.until(lambda d: d.execute_script(TAB_READY_SCRIPT, name, TAB_CONTENT[name]))
+    except TimeoutException:
+        logger.warning(f"Timed out waiting for the '{name}' tab to load.")
+    return True
+
+
+@metrics.span('scrape_extract')
+def extract_page(driver):
+    """Return {'title', 'description', 'solutions'} for the page currently loaded."""
+    return driver.execute_script(EXTRACT_SCRIPT)
+
+
+def scrape_problem(driver, slug, url=None):
+    """
+    Scrape one NeetCode problem with an already running driver and return
+    {'slug', 'title', 'description', 'solution'}. Nothing is written to the DB.
+    """
+    url = url or problem_url(slug)
+    # Increased wait time for dynamic content; polled every 50ms, since the
+    # default 0.5s interval dominated the time per page
+    wait = WebDriverWait(driver, 20, poll_frequency=0.05)
+
+    logger.info(f"Navigating to {url}.")
+    with metrics.span('scrape_navigate'):
+        driver.get(url)
+
+        # Wait for the main content to load
+        try:
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'ul.tabs-list')))
+        except TimeoutException:
+            logger.warning("Timed out waiting for the tabs to load.")
+
+    # 1. Title and description from the Question tab
+    _open_tab(driver, wait, 'Question')
+    page = extract_page(driver)
+
+    # 2. Solutions, only switching tabs when they are not already in the DOM
+    if not page['solutions'] and _open_tab(driver, wait, 'Solution'):
+        page['solutions'] = extract_page(driver)['solutions']
+
+    return build_problem(slug, page)
+
+
+def build_problem(slug, page):
+    """Turn an extracted page ({'title', 'description', 'solutions'}) into Problem fields."""
+    problem_title = page['title'] or 'Unknown Title'
+    if page['title'] is None:
+        logger.warning("Problem title not found.")
+    if page['description'] is None:
+        logger.warning("Problem description not found.")
+    description = "\n".join(page['description'] or [])
+
+    if not page['solutions']:
+        logger.warning("No solution sections found.")
+
+    solution_texts = []
+    for language, code_text in page['solutions']:
+        language = language.capitalize()
+        solution_texts.append(f"{language} Solution:\n{code_text}")
+        logger.info(f"Extracted {language} solution.")
+
+    logger.info(f"Problem extracted: {problem_title}")
+    return {
+        'slug': slug,
+        'title': problem_title,
+        'description': description,
+        # Concatenate all solutions
+        'solution': "\n\n".join(solution_texts),
+        # Per-language rows for the Solution model
+        'solutions': [(language.lower(), code_text) for language, code_text in page['solutions']],
+    }
+
+
+# HTTP fast path: plain GET plus lxml, no browser
+
+_local = threading.local()
+
+
+def http_session():
+    # One keep-alive session per thread; requests.Session is not thread-safe
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.SCRAPER_WORKERS)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['User-Agent'] = USER_AGENT
+        _local.session = session
+    return session
+
+
+def _text(element):
+    return element.text_content().strip()
+
+
+@metrics.span('scrape_extract')
+def parse_problem_html(content):
+    """Same output as extract_page, computed from raw HTML."""
+    tree = lxml_html.fromstring(content)
+
+    h1 = tree.xpath('//h1')
+    containers = tree.xpath("//*[contains(concat(' ', normalize-space(@class), ' '), ' my-article-component-container ')]")
+    blocks = None
+    if containers:
+        blocks = [text for text in (_text(el) for el in containers[0].xpath('.//p | .//pre')) if text]
+
+    solutions = []
+    for pre in tree.xpath("//*[contains(concat(' ', normalize-space(@class), ' '), ' code-toolbar ')]//pre"):
+        match = re.search(r'language-(\S+)', pre.get('class', ''))
+        code = pre.find('.//code')
+        if match and code is not None:
+            solutions.append([match.group(1), _text(code)])
+
+    return {
+        'title': _text(h1[0]) if h1 else None,
+        'description': blocks,
+        'solutions': solutions,
+    }
+
+
+def is_complete(page):
+    return bool(page['title'] and page['description'] and page['solutions'])
+
+
+def fetch_problem(slug, url=None):
+    url = url or problem_url(slug)
+    logger.info(f"Fetching {url} over HTTP.")
+    with metrics.span('scrape_navigate'):
+        response = http_session().get(url, timeout=settings.SCRAPER_HTTP_TIMEOUT)
+        response.raise_for_status()
+    return parse_problem_html(response.content)
+
+
+def scrape(slug, backend='auto', pool=None, url_template=None):
+    """
+    Scrape one problem with the chosen backend. 'auto' tries the HTTP fast
+    path and only falls back to a pooled browser when fields are missing.
+    """
+    url = problem_url(slug, url_template)
+
+    if backend in ('auto', 'http'):
+        try:
+            page = fetch_problem(slug, url=url)
+        except requests.RequestException as e:
+            if backend == 'http':
+                raise
+            logger.warning(f"HTTP fetch failed for {slug}: {e}")
+        else:
+            if backend == 'http' or is_complete(page):
+                return build_problem(slug, page)
+            logger.info(f"HTTP fast path incomplete for {slug}, falling back to Selenium.")
+
+    if pool is None:
+        raise ValueError("A DriverPool is required for the Selenium backend.")
+    with pool.driver() as driver:
+        return scrape_problem(driver, slug, url=url)
+
+
+def content_hash(data):
+    payload = json.dumps([data['title'], data['description'], data['solution']])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _solution_rows(problem_id, data):
+    return [
+        Solution(problem_id=problem_id, language=language, code=code, position=position)
+        for position, (language, code) in enumerate(data['solutions'])
+    ]
+
+
+@metrics.span('scrape_db_write')
+def save_problem(data):
+    """
+    Create or update the Problem instance. Returns (problem, created, changed);
+    when the scraped content is unchanged only last_scraped_at is touched.
+    """
+    digest = content_hash(data)
+    now = timezone.now()
+
+    existing = Problem.objects.filter(slug=data['slug']).first()
+    if existing is not None and existing.content_hash == digest:
+        Problem.objects.filter(pk=existing.pk).update(last_scraped_at=now)
+        logger.info(f"Unchanged Problem: {data['title']}")
+        return existing, False, False
+
+    with transaction.atomic():
+        problem, created = Problem.objects.update_or_create(
+            slug=data['slug'],
+            defaults={
+                'title': data['title'],
+                'description': data['description'],
+                'solution': data['solution'],
+                'content_hash': digest,
+                'last_scraped_at': now,
+            },
+            # The page doesn't show a difficulty; keep whatever was set by hand
+            create_defaults={
+                'title': data['title'],
+                'description': data['description'],
+                'difficulty': Difficulty.EASY,
+                'solution': data['solution'],
+                'content_hash': digest,
+                'last_scraped_at': now,
+            },
+        )
+        Solution.objects.filter(problem=problem).delete()
+        Solution.objects.bulk_create(_solution_rows(problem.pk, data))
+    logger.info(f"{'Created' if created else 'Updated'} Problem: {data['title']}")
+    return problem, created, True
+
+
+@metrics.span('scrape_db_write')
+def save_problems(batch):
+    """
+    Upsert a batch of scraped problems in one transaction. Returns
+    {slug: changed}; unchanged rows only get last_scraped_at bumped.
+    """
+    now = timezone.now()
+    existing = dict(
+        Problem.objects.filter(slug__in=[data['slug'] for data in batch])
+        .values_list('slug', 'content_hash')
+    )
+
+    changed = []
+    results = {}
+    for data in batch:
+        digest = content_hash(data)
+        results[data['slug']] = existing.get(data['slug']) != digest
+        if results[data['slug']]:
+            changed.append(Problem(
+                slug=data['slug'],
+                title=data['title'],
+                description=data['description'],
+                difficulty=Difficulty.EASY,
+                solution=data['solution'],
+                content_hash=digest,
+                last_scraped_at=now,
+            ))
+    unchanged = [slug for slug, was_changed in results.items() if not was_changed]
+
+    with transaction.atomic():
+        if changed:
+            Problem.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=['slug'],
+                # difficulty only applies to new rows, as in save_problem
+                update_fields=['title', 'description', 'solution', 'content_hash', 'last_scraped_at', 'updated_at'],
+            )
+            # Replace the per-language solutions of every changed problem
+            ids = dict(Problem.objects.filter(slug__in=[problem.slug for problem in changed]).values_list('slug', 'id'))
+            Solution.objects.filter(problem_id__in=ids.values()).delete()
+            Solution.objects.bulk_create([
+                row for data in batch if results[data['slug']]
+                for row in _solution_rows(ids[data['slug']], data)
+            ])
+        if unchanged:
+            Problem.objects.filter(slug__in=unchanged).update(last_scraped_at=now)
+
+    logger.info(f"Saved batch of {len(batch)} problems ({len(changed)} changed).")
+    return results
+
+
+class ProblemWriter:
+    """
+    Buffers scraped problems and writes them with save_problems once
+    batch_size results are waiting or flush_interval seconds have passed,
+    so a crash loses at most one batch. add() only checks on arrival; a
+    caller waiting on slow scrapes should wait at most due_in() seconds
+    and then call flush_if_due(). If the batch write fails, its
+    problems are saved one at a time so one bad row only fails itself.
+    on_flush gets ({slug: changed}, {slug: error}) after every write.
+    Not thread-safe: feed it from one thread.
+    """
+
+    def __init__(self, batch_size, flush_interval, on_flush=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def add(self, data):
+        self._buffer.append(data)
+        self.flush_if_due()
+
+    def due_in(self):
+        """Seconds until the buffered rows are due, or None when nothing is buffered."""
+        if not self._buffer:
+            return None
+        return max(0.0, self.flush_interval - (time.monotonic() - self._last_flush))
+
+    def flush_if_due(self):
+        if self._buffer and (len(self._buffer) >= self.batch_size or self.due_in() == 0):
+            return self.flush()
+        return {}
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return {}
+        batch, self._buffer = self._buffer, []
+        errors = {}
+        try:
+            results = save_problems(batch)
+        except DatabaseError as e:
+            logger.warning(f"Batch of {len(batch)} problems failed ({e}), saving them one at a time.")
+            results = {}
+            for data in batch:
+                try:
+                    results[data['slug']] = save_problem(data)[2]
+                except DatabaseError as e:
+                    logger.error(f"Failed to save {data['slug']}: {e}")
+                    errors[data['slug']] = e
+        if self.on_flush is not None:
+            self.on_flush(results, errors)
+        return results
+
+
+class DriverPool:
+    """
+    A fixed set of long-lived Chrome drivers shared by scraping threads.
+    Drivers are started lazily, health-checked when handed out and replaced
+    after max_pages pages or after a WebDriverException.
+    """
+
+    def __init__(self, size, max_pages=50):
+        self.size = size
+        self.max_pages = max_pages
+        self._idle = queue.Queue()
+        self._pages = {}
+        self._started = 0
+        self._lock = threading.Lock()
+        self._all = set()
+
+    def _start(self):
+        with metrics.span('scrape_driver_start'):
+            driver = create_driver()
+        logger.info("Started a new ChromeDriver.")
+        with self._lock:
+            self._pages[driver] = 0
+            self._all.add(driver)
+        return driver
+
+    def _retire(self, driver):
+        with self._lock:
+            self._pages.pop(driver, None)
+            self._all.discard(driver)
+            self._started -= 1
+        try:
+            driver.quit()
+            logger.info("ChromeDriver has been closed.")
+        except Exception as e:
+            logger.error(f"Error while closing ChromeDriver: {e}")
+
+    @staticmethod
+    def is_healthy(driver):
+        try:
+            driver.execute_script('return 1')
+            return True
+        except WebDriverException:
+            return False
+
+    def acquire(self):
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_start = self._started < self.size
+                    if can_start:
+                        self._started += 1
+                if can_start:
+                    try:
+                        return self._start()
+                    except Exception:
+                        with self._lock:
+                            self._started -= 1
+                        raise
+                try:
+                    # Wake up periodically in case a retired driver freed a slot
+                    driver = self._idle.get(timeout=1)
+                except queue.Empty:
+                    continue
+
+            if self.is_healthy(driver):
+                return driver
+            logger.warning("Discarding unhealthy ChromeDriver.")
+            self._retire(driver)
+
+    def release(self, driver, broken=False):
+        with self._lock:
+            self._pages[driver] = self._pages.get(driver, 0) + 1
+            worn_out = self._pages[driver] >= self.max_pages
+        if broken or worn_out:
+            self._retire(driver)
+        else:
+            self._idle.put(driver)
+
+    @contextmanager
+    def driver(self):
+        driver = self.acquire()
+        broken = False
+        try:
+            yield driver
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def close(self):
+        with self._lock:
+            drivers = list(self._all)
+        for driver in drivers:
+            self._retire(driver)
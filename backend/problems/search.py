@@ -0,0 +1,156 @@
+# backend/problems/search.py
+
+import logging
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+# Indexed text per table. On PostgreSQL each table gets a generated
+# search_vector column with a GIN index; on SQLite an external-content FTS5
+# table kept in sync by triggers. Problems use the english stemmer; test
+# case data is numbers and identifiers, so it is only lower-cased.
+INDEXES = {
+    'problems_problem': {
+        'columns': ('title', 'description'),
+        'weights': ('A', 'B'),
+        'config': 'english',
+    },
+    'problems_testcase': {
+        'columns': ('input_data', 'expected_output'),
+        'weights': ('A', 'A'),
+        'config': 'simple',
+    },
+}
+
+# to_tsvector fails on values over 1MB; large generated inputs are only
+# indexed up to this many characters
+MAX_INDEXED_CHARS = 100_000
+
+
+def _postgres_statements(table, spec):
+    vector = ' || '.join(
+        f"setweight(to_tsvector('{spec['config']}', left(coalesce({column}, ''), {MAX_INDEXED_CHARS})), '{weight}')"
+        for column, weight in zip(spec['columns'], spec['weights'])
+    )
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX IF NOT EXISTS {table}_search_vector_gin ON {table} USING GIN (search_vector)",
+    ]
+
+
+def _sqlite_statements(table, spec):
+    fts = f"{table}_fts"
+    columns = ', '.join(spec['columns'])
+    new = ', '.join(f"new.{column}" for column in spec['columns'])
+    old = ', '.join(f"old.{column}" for column in spec['columns'])
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', content_rowid='id')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+    ]
+
+
+def _sqlite_triggers_missing(cursor, table):
+    cursor.execute(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+        [f"{table}_fts_a_"],
+    )
+    return cursor.fetchone()[0] < 3
+
+
+def install(connection):
+    """
+    Create (or repair) the search indexes; safe to run repeatedly. SQLite
+    rebuilds a table on most ALTERs and drops its triggers with it, so this
+    also runs after every migrate (see ProblemsConfig.ready).
+    """
+    with connection.cursor() as cursor:
+        for table, spec in INDEXES.items():
+            if connection.vendor == 'postgresql':
+                for statement in _postgres_statements(table, spec):
+                    cursor.execute(statement)
+            elif connection.vendor == 'sqlite':
+                stale = _sqlite_triggers_missing(cursor, table)
+                for statement in _sqlite_statements(table, spec):
+                    cursor.execute(statement)
+                if stale:
+                    # Rows may have changed while the triggers were missing
+                    cursor.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+                    logger.info(f"Rebuilt full-text index for {table}.")
+
+
+def uninstall(connection):
+    with connection.cursor() as cursor:
+        for table in INDEXES:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f"DROP INDEX IF EXISTS {table}_search_vector_gin")
+                cursor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+            elif connection.vendor == 'sqlite':
+                for suffix in ('ai', 'ad', 'au'):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+                cursor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+
+def fts5_query(query):
+    # Quote every term so user input can't hit FTS5 query syntax; terms are ANDed
+    terms = re.findall(r'\w+', query)
+    return ' '.join('"' + term + '"' for term in terms)
+
+
+def _search(queryset, query, ranked):
+    table = queryset.model._meta.db_table
+    spec = INDEXES[table]
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        tsquery = f"websearch_to_tsquery('{spec['config']}', %s)"
+        queryset = queryset.filter(
+            RawSQL(f"{table}.search_vector @@ {tsquery}", [query], output_field=BooleanField())
+        )
+        rank = RawSQL(f"ts_rank_cd({table}.search_vector, {tsquery})", [query], output_field=FloatField())
+    elif vendor == 'sqlite':
+        match = fts5_query(query)
+        if not match:
+            return queryset.none()
+        fts = f"{table}_fts"
+        queryset = queryset.filter(id__in=RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [match]))
+        # bm25() is lower-is-better, so negate it to sort like ts_rank
+        rank = RawSQL(
+            f"(SELECT -bm25({fts}) FROM {fts} WHERE {fts} MATCH %s AND {fts}.rowid = {table}.id)",
+            [match], output_field=FloatField(),
+        )
+    else:
+        # Unindexed fallback for other backends
+        condition = Q()
+        for column in spec['columns']:
+            condition |= Q(**{f"{column}__icontains": query})
+        queryset = queryset.filter(condition)
+        rank = Value(0.0, output_field=FloatField())
+
+    if ranked:
+        queryset = queryset.annotate(rank=rank).order_by('-rank', 'id')
+    return queryset
+
+
+def matching(queryset, query):
+    """queryset narrowed to rows matching query, in its own order."""
+    if not query.strip():
+        return queryset.none()
+    return _search(queryset, query, ranked=False)
+
+
+def ranked(queryset, query):
+    """Rows matching query, annotated with rank and best matches first."""
+    if not query.strip():
+        return queryset.none()
+    return _search(queryset, query, ranked=True)
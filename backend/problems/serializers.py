@@ -1,16 +1,75 @@
 # backend/problems/serializers.py
 
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Problem, TestCase
+from .models import GenerationJob, Problem, TestCase
 
 class TestCaseSerializer(serializers.ModelSerializer):
+    """
+    Payload text is only inlined when it is stored in the row and the
+    context allows it (inline_payloads, default True); otherwise it is
+    null and clients fetch it from the *_url download link.
+    """
+    tier = serializers.CharField(source='get_tier_display', read_only=True)
+    input_data = serializers.SerializerMethodField()
+    expected_output = serializers.SerializerMethodField()
+    input_url = serializers.SerializerMethodField()
+    expected_output_url = serializers.SerializerMethodField()
+
     class Meta:
         model = TestCase
-        fields = ['id', 'input_data', 'expected_output', 'difficulty']
+        fields = [
+            'id', 'tier', 'generator',
+            'input_data', 'input_size', 'input_sha256', 'input_url',
+            'expected_output', 'expected_output_size', 'expected_output_sha256', 'expected_output_url',
+            'expected_output_verified', 'near_duplicate',
+        ]
+
+    def _inline(self, obj, part):
+        if getattr(obj, f'{part}_external') or not self.context.get('inline_payloads', True):
+            return None
+        return getattr(obj, TestCase.PAYLOADS[part])
+
+    def get_input_data(self, obj):
+        return self._inline(obj, 'input')
+
+    def get_expected_output(self, obj):
+        return self._inline(obj, 'expected_output')
+
+    def get_input_url(self, obj):
+        return reverse('test_case_download', args=[obj.pk, 'input'])
+
+    def get_expected_output_url(self, obj):
+        return reverse('test_case_download', args=[obj.pk, 'expected_output'])
 
 class ProblemSerializer(serializers.ModelSerializer):
     test_cases = TestCaseSerializer(many=True, read_only=True)
+    difficulty = serializers.CharField(source='get_difficulty_display', read_only=True)
+
+    # Large text columns that listings only load on request
+    DEFERRABLE_FIELDS = ('description', 'solution')
 
     class Meta:
         model = Problem
-        fields = ['id', 'title', 'description', 'difficulty', 'solution', 'test_cases']
+        fields = ['id', 'slug', 'title', 'description', 'difficulty', 'solution', 'test_cases']
+
+    def __init__(self, *args, exclude=(), **kwargs):
+        # exclude drops fields from the output, e.g. ones deferred in the query
+        super().__init__(*args, **kwargs)
+        for name in exclude:
+            self.fields.pop(name, None)
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    slug = serializers.CharField(source='problem.slug', read_only=True)
+    status = serializers.CharField(source='get_status_display', read_only=True)
+    status_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GenerationJob
+        fields = [
+            'id', 'slug', 'language', 'status', 'status_url', 'priority', 'refresh', 'rerun', 'attempts', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+
+    def get_status_url(self, obj):
+        return reverse('generation_job', args=[obj.pk])
@@ -0,0 +1,166 @@
+# backend/problems/singleflight.py
+
+import asyncio
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+
+_stats_lock = threading.Lock()
+_stats = {"leaders": 0, "coalesced": 0, "cross_process_coalesced": 0}
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one: the first caller
+    runs the function, everyone else arriving before it finishes waits for
+    and shares its result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            _count("coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        _count("leaders")
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def ado(self, key, afn):
+        # Tasks belong to the running event loop, so async callers are
+        # tracked per loop (under WSGI every request runs its own) and
+        # separately from threads
+        loop = asyncio.get_running_loop()
+        flight = (loop, key)
+        with self._lock:
+            task = self._tasks.get(flight)
+            leader = task is None
+            if leader:
+                task = self._tasks[flight] = loop.create_task(afn())
+        if leader:
+            _count("leaders")
+            task.add_done_callback(lambda done: self._landed(flight, done))
+        else:
+            _count("coalesced")
+        # Shielded, so a cancelled caller (e.g. a disconnected client, even
+        # the leader's) leaves the call running for everyone else
+        return await asyncio.shield(task)
+
+    def _landed(self, flight, task):
+        with self._lock:
+            self._tasks.pop(flight, None)
+        # Mark the exception as retrieved when every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+
+# Cross-process coalescing through PostgreSQL advisory locks. Other backends
+# (e.g. SQLite in development) only get the in-process behaviour.
+
+def _lock_id(key):
+    return int(key[:15], 16)
+
+
+def try_lock(key):
+    if connection.vendor != "postgresql":
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [_lock_id(key)])
+        return cursor.fetchone()[0]
+
+
+def unlock(key):
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", [_lock_id(key)])
+
+
+def run_exclusive(key, lookup, fn):
+    """
+    Run fn() while holding the cross-process lock for key. If another process
+    holds it, poll lookup() until that process has stored its result.
+    """
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_TIMEOUT
+    while not try_lock(key):
+        cached = lookup()
+        if cached is not None:
+            _count("cross_process_coalesced")
+            return cached
+        if time.monotonic() > deadline:
+            # The other process is taking too long; do the work ourselves
+            return fn()
+        time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+
+    try:
+        # The previous holder may have finished between our lookup and lock
+        cached = lookup()
+        if cached is not None:
+            _count("cross_process_coalesced")
+            return cached
+        return fn()
+    finally:
+        unlock(key)
+
+
+async def arun_exclusive(key, lookup, afn):
+    # Async twin of run_exclusive; lookup is sync, afn is a coroutine function
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_TIMEOUT
+    while not await sync_to_async(try_lock)(key):
+        cached = await sync_to_async(lookup)()
+        if cached is not None:
+            _count("cross_process_coalesced")
+            return cached
+        if time.monotonic() > deadline:
+            return await afn()
+        await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+
+    try:
+        cached = await sync_to_async(lookup)()
+        if cached is not None:
+            _count("cross_process_coalesced")
+            return cached
+        return await afn()
+    finally:
+        await sync_to_async(unlock)(key)
@@ -0,0 +1,253 @@
+# backend/problems/testcases.py
+
+import hashlib
+import itertools
+import json
+import logging
+import re
+
+from django.conf import settings
+from django.db import transaction
+
+from . import blobs, dedup, generators, metrics, sandbox
+from .models import Problem, TestCase, Tier
+
+logger = logging.getLogger(__name__)
+
+TIERS = tuple(Tier.labels)
+
+# Ask Gemini for JSON directly instead of prose
+GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+JSON_INSTRUCTIONS = """
+    Respond with JSON only, using exactly this shape:
+    {"test_cases": [{"tier": "small", "input": "...", "expected_output": "..."}, ...]}
+    "tier" must be one of "small", "medium", "large" or "edge". Return one small, one medium and one large
+    test case plus up to two edge cases. "input" and "expected_output" are strings written the way
+    LeetCode shows them, e.g. "nums = [2,7,11,15], target = 9" and "[0,1]".
+    Do not write out the large test case. Instead of "input", give a "generator" describing it, e.g.
+    {"tier": "large", "generator": {"seed": 7, "variables": [
+        {"name": "nums", "type": "int_array", "size": 10000, "low": -1000000000, "high": 1000000000, "unique": true},
+        {"name": "target", "type": "int", "low": -2000000000, "high": 2000000000}]}, "expected_output": ""}
+    Variable types are int, float, string, int_array, float_array and string_array. Arrays take "size",
+    "sorted" (false, "asc" or "desc") and "unique"; numbers take "low", "high" and "distribution"
+    ("uniform", or "normal" with "mean" and "std"); strings take "low"/"high" lengths and "alphabet".
+    Leave "expected_output" empty for the large case.
+    """
+
+# When the problem has a Python solution the outputs are computed by
+# running it (problems.sandbox), so the model only writes inputs
+INPUT_INSTRUCTIONS = """
+    Respond with JSON only, using exactly this shape:
+    {"test_cases": [{"tier": "small", "input": "..."}, ...]}
+    "tier" must be one of "small", "medium", "large" or "edge". Return one small, one medium and one large
+    test case plus up to two edge cases. "input" is a string written the way LeetCode shows it, e.g.
+    "nums = [2,7,11,15], target = 9", naming every argument of the solution. Do not give expected outputs.
+    Do not write out the large test case. Instead of "input", give a "generator" describing it, e.g.
+    {"tier": "large", "generator": {"seed": 7, "variables": [
+        {"name": "nums", "type": "int_array", "size": 10000, "low": -1000000000, "high": 1000000000, "unique": true},
+        {"name": "target", "type": "int", "low": -2000000000, "high": 2000000000}]}}
+    Variable types are int, float, string, int_array, float_array and string_array. Arrays take "size",
+    "sorted" (false, "asc" or "desc") and "unique"; numbers take "low", "high" and "distribution"
+    ("uniform", or "normal" with "mean" and "std"); strings take "low"/"high" lengths and "alphabet".
+    """
+
+
+class TestCaseParseError(ValueError):
+    pass
+
+
+class MissingExpectedOutputs(Exception):
+    """The reference solution failed on cases the model gave only inputs for."""
+
+
+# Models sometimes wrap the JSON in a Markdown code fence anyway
+_FENCE = re.compile(r"^\s*```[\w-]*\s*\n(.*?)\n?\s*```\s*$", re.DOTALL)
+
+
+def _as_text(value):
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _output(item):
+    value = item.get("expected_output")
+    return None if value in (None, "") else _as_text(value)
+
+
+@metrics.span("parse_response")
+def parse_test_cases(text):
+    """
+    Validate a Gemini JSON response and return a list of
+    {"tier", "input_data", "generator", "expected_output"} dicts; a case
+    given as a generator spec has input_data None, and expected_output is
+    None where the model gave none (see INPUT_INSTRUCTIONS).
+    """
+    fenced = _FENCE.match(text) if isinstance(text, str) else None
+    if fenced:
+        text = fenced.group(1)
+    try:
+        payload = json.loads(text)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise TestCaseParseError(f"Response is not valid JSON: {e}")
+
+    if isinstance(payload, dict):
+        payload = payload.get("test_cases")
+    if not isinstance(payload, list) or not payload:
+        raise TestCaseParseError("Response does not contain a non-empty 'test_cases' list.")
+
+    cases = []
+    for idx, item in enumerate(payload):
+        if not isinstance(item, dict):
+            raise TestCaseParseError(f"Test case {idx} is not an object.")
+        tier = str(item.get("tier", "")).lower()
+        if tier not in TIERS:
+            raise TestCaseParseError(f"Test case {idx} has unknown tier {tier!r}.")
+        if "generator" in item:
+            try:
+                spec = generators.validate(item["generator"])
+            except generators.GeneratorSpecError as e:
+                raise TestCaseParseError(f"Test case {idx} has an invalid generator: {e}")
+            cases.append({
+                "tier": tier,
+                "input_data": None,
+                "generator": spec,
+                "expected_output": _output(item),
+            })
+            continue
+        if "input" not in item:
+            raise TestCaseParseError(f"Test case {idx} is missing 'input'.")
+        cases.append({
+            "tier": tier,
+            "input_data": _as_text(item["input"]),
+            "generator": None,
+            "expected_output": _output(item),
+        })
+    return cases
+
+
+def set_payload_chunks(test_case, part, chunks):
+    """
+    Store an iterable of text chunks as test_case's input or
+    expected_output (part). Up to TEST_CASE_INLINE_MAX_BYTES it is kept in
+    the row; past that the rest is streamed, compressed, to the blob store.
+    """
+    field = TestCase.PAYLOADS[part]
+    chunks = iter(chunks)
+    head, size = [], 0
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        head.append(data)
+        size += len(data)
+        if size > settings.TEST_CASE_INLINE_MAX_BYTES:
+            digest, size = blobs.put_chunks(itertools.chain(head, chunks))
+            setattr(test_case, field, "")
+            setattr(test_case, f"{part}_external", True)
+            break
+    else:
+        data = b"".join(head)
+        digest = hashlib.sha256(data).hexdigest()
+        setattr(test_case, field, data.decode("utf-8"))
+        setattr(test_case, f"{part}_external", False)
+    setattr(test_case, f"{part}_sha256", digest)
+    setattr(test_case, f"{part}_size", size)
+
+
+def set_payload(test_case, part, text):
+    set_payload_chunks(test_case, part, [text])
+
+
+def payload_chunks(test_case, part):
+    """The payload as an iterator of bytes chunks, wherever it is stored."""
+    if getattr(test_case, f"{part}_external"):
+        return blobs.iter_chunks(getattr(test_case, f"{part}_sha256"))
+    return iter([getattr(test_case, TestCase.PAYLOADS[part]).encode("utf-8")])
+
+
+def read_payload(test_case, part):
+    return b"".join(payload_chunks(test_case, part)).decode("utf-8")
+
+
+def build_test_case(problem, case):
+    test_case = TestCase(
+        problem=problem, tier=Tier[case["tier"].upper()],
+        content_hash=case.get("content_hash"), minhash=case.get("minhash"),
+        near_duplicate=case.get("near_duplicate", False),
+    )
+    if case.get("generator"):
+        # Expanded straight into storage, never held as one string
+        test_case.generator = case["generator"]
+        with metrics.span("expand_generator"):
+            set_payload_chunks(test_case, "input", generators.expand_chunks(case["generator"]))
+    else:
+        set_payload(test_case, "input", case["input_data"])
+    test_case.expected_output_verified = case.get("verified", False)
+    set_payload(test_case, "expected_output", case["expected_output"] or "")
+    return test_case
+
+
+def reference_solution(problem):
+    """The problem's last (usually optimal) Python solution, or None."""
+    if not settings.SANDBOX_ENABLED:
+        return None
+    return (
+        problem.solutions.filter(language="python")
+        .order_by("-position").values_list("code", flat=True).first()
+    )
+
+
+@metrics.span("run_reference")
+def compute_expected_outputs(code, cases):
+    """
+    Run the reference solution on every case's input and use its result
+    as the expected output. A case it fails on keeps the model's output,
+    if any, unverified.
+    """
+    payloads = [
+        {"generator": case["generator"]} if case.get("generator") else {"input": case["input_data"]}
+        for case in cases
+    ]
+    results = sandbox.get_pool().run_many(code, payloads)
+    computed = []
+    for case, (output, error) in zip(cases, results):
+        if error is not None:
+            logger.warning(f"Reference solution failed on a {case['tier']} case: {error}")
+            computed.append(case)
+        else:
+            computed.append({**case, "expected_output": output, "verified": True})
+    return computed
+
+
+# Everything but the key, for the upsert in store_test_cases
+UPSERT_FIELDS = [
+    field.name for field in TestCase._meta.concrete_fields
+    if field.name not in ("id", "problem", "content_hash")
+]
+
+
+@metrics.span("store_test_cases")
+def store_test_cases(problem, cases):
+    # Duplicates are dropped before they cost a reference run or a blob write
+    cases = dedup.deduplicate(cases)
+    code = reference_solution(problem)
+    if code:
+        cases = compute_expected_outputs(code, cases)
+        # A generator case may have no output either way (JSON_INSTRUCTIONS)
+        missing = sum(case["expected_output"] is None and not case.get("generator") for case in cases)
+        if missing:
+            raise MissingExpectedOutputs(f"{missing} test cases have no expected output.")
+    # Blobs are written before the transaction; an aborted store only
+    # leaves unreferenced blobs for prune_testcase_blobs
+    test_cases = [build_test_case(problem, case) for case in cases]
+    # Replace the problem's rows in one transaction so readers never see a
+    # partial set. The Problem row lock queues concurrent stores for the same
+    # problem, so the last one's set replaces the first's instead of the two
+    # merging (SQLite serializes writers anyway).
+    with transaction.atomic():
+        Problem.objects.select_for_update().only("pk").get(pk=problem.pk)
+        TestCase.objects.filter(problem=problem).delete()
+        return TestCase.objects.bulk_create(
+            test_cases, update_conflicts=True,
+            unique_fields=["problem", "content_hash"], update_fields=UPSERT_FIELDS,
+        )
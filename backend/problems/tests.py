@@ -1,3 +1,1460 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import api, batching, blobs, cache, dedup, generators, jobs, llm, prompts, sandbox, scraper, search, singleflight
+from .benchmarks import FIXTURES_DIR, rendered_fixture, serve_fixtures
+from .models import GenerationCache, GenerationJob, JobStatus, Problem
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from .testcases import TestCaseParseError, parse_test_cases, read_payload, store_test_cases
+
+
+def _problem(slug, **fields):
+    fields = {'title': slug.replace('-', ' ').title(), 'description': '', 'solution': '', **fields}
+    return Problem.objects.create(slug=slug, **fields)
+
+
+def _use_fake_provider(test):
+    llm.set_provider(llm.FakeProvider())
+    test.addCleanup(llm.set_provider, None)
+
+
+class GenerationCacheTests(TestCase):
+    def test_hit_updates_counters(self):
+        cache.set('key', 'model', 'response')
+        hits = cache.stats()['hits']
+
+        self.assertEqual(cache.get('key'), 'response')
+        self.assertEqual(cache.stats()['hits'], hits + 1)
+        self.assertEqual(GenerationCache.objects.get(key='key').hit_count, 1)
+
+    @override_settings(GENERATION_CACHE_TTL=60)
+    def test_expired_entry_is_a_miss(self):
+        cache.set('key', 'model', 'response')
+        GenerationCache.objects.update(created_at=timezone.now() - timedelta(seconds=61))
+        misses = cache.stats()['misses']
+
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.stats()['misses'], misses + 1)
+        self.assertEqual(cache.evict(), 1)
+        self.assertFalse(GenerationCache.objects.exists())
+
+    @override_settings(GENERATION_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entry_is_evicted_at_the_cap(self):
+        cache.set('first', 'model', 'one')
+        cache.set('second', 'model', 'two')
+        now = timezone.now()
+        GenerationCache.objects.filter(key='first').update(last_accessed=now)
+        GenerationCache.objects.filter(key='second').update(last_accessed=now - timedelta(minutes=1))
+
+        cache.set('third', 'model', 'three')
+        self.assertEqual(sorted(GenerationCache.objects.values_list('key', flat=True)), ['first', 'third'])
+
+    def test_get_or_generate_calls_the_model_once(self):
+        calls = []
+
+        def generate():
+            calls.append(1)
+            return f'response {len(calls)}'
+
+        self.assertEqual(cache.get_or_generate('prompt', 'model', generate), 'response 1')
+        self.assertEqual(cache.get_or_generate('prompt', 'model', generate), 'response 1')
+        self.assertEqual(len(calls), 1)
+        # A different model or config is a different entry
+        self.assertEqual(cache.get_or_generate('prompt', 'other-model', generate), 'response 2')
+        self.assertEqual(cache.get_or_generate('prompt', 'model', generate, {'temperature': 0}), 'response 3')
+
+    def test_refresh_replaces_the_entry(self):
+        cache.get_or_generate('prompt', 'model', lambda: 'old')
+
+        self.assertEqual(cache.get_or_generate('prompt', 'model', lambda: 'new', refresh=True), 'new')
+        self.assertEqual(cache.get_or_generate('prompt', 'model', lambda: 'unused'), 'new')
+
+    def test_bypass_skips_the_cache(self):
+        cache.get_or_generate('prompt', 'model', lambda: 'stored')
+        bypassed = cache.stats()['bypassed']
+
+        self.assertEqual(cache.get_or_generate('prompt', 'model', lambda: 'fresh', use_cache=False), 'fresh')
+        self.assertEqual(cache.stats()['bypassed'], bypassed + 1)
+        self.assertEqual(GenerationCache.objects.get().response_text, 'stored')
+
+    def test_rejected_response_is_not_cached(self):
+        def validate(text):
+            raise ValueError(text)
+
+        with self.assertRaises(ValueError):
+            cache.get_or_generate('prompt', 'model', lambda: 'garbage', validate=validate)
+        self.assertFalse(GenerationCache.objects.exists())
+
+
+class ParseTestCasesTests(SimpleTestCase):
+    def test_parses_cases(self):
+        cases = parse_test_cases(
+            '{"test_cases": [{"tier": "Small", "input": "nums = [1,2], target = 3", "expected_output": [0, 1]},'
+            ' {"tier": "edge", "input": "nums = [], target = 0"}]}'
+        )
+
+        self.assertEqual(cases, [
+            {'tier': 'small', 'input_data': 'nums = [1,2], target = 3', 'generator': None, 'expected_output': '[0, 1]'},
+            {'tier': 'edge', 'input_data': 'nums = [], target = 0', 'generator': None, 'expected_output': None},
+        ])
+
+    def test_fenced_json(self):
+        text = '```json\n{"test_cases": [{"tier": "small", "input": "n = 1", "expected_output": "1"}]}\n```\n'
+
+        self.assertEqual(parse_test_cases(text)[0]['input_data'], 'n = 1')
+
+    def test_bare_list(self):
+        self.assertEqual(len(parse_test_cases('[{"tier": "large", "input": "n = 1"}]')), 1)
+
+    def test_generator_case(self):
+        case = parse_test_cases('[{"tier": "large", "generator": {"variables": [{"name": "n", "type": "int"}]}}]')[0]
+
+        self.assertIsNone(case['input_data'])
+        self.assertEqual(case['generator']['variables'][0]['high'], 100)
+
+    def test_invalid_responses(self):
+        for text in (
+            'Here are your test cases!',
+            '{"cases": [{"tier": "small", "input": "n = 1"}]}',
+            '{"test_cases": []}',
+            '{"test_cases": ["n = 1"]}',
+            '{"test_cases": [{"tier": "huge", "input": "n = 1"}]}',
+            '{"test_cases": [{"tier": "small"}]}',
+            '{"test_cases": [{"tier": "large", "generator": {"variables": []}}]}',
+        ):
+            with self.subTest(text=text), self.assertRaises(TestCaseParseError):
+                parse_test_cases(text)
+
+
+def _events(body):
+    # [(event, data), ...] from a text/event-stream body
+    events = []
+    for block in body.decode().split('\n\n'):
+        if block:
+            event, data = block.split('\n')
+            events.append((event.removeprefix('event: '), json.loads(data.removeprefix('data: '))))
+    return events
+
+
+async def _stream(response):
+    return _events(b''.join([chunk async for chunk in response.streaming_content]))
+
+
+class GenerateStreamViewTests(TestCase):
+    def setUp(self):
+        _use_fake_provider(self)
+        self.problem = _problem('contains-duplicate')
+        self.url = reverse('generate_test_case_stream', args=['contains-duplicate'])
+
+    async def test_chunks_then_complete(self):
+        response = await self.async_client.get(self.url)
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = await _stream(response)
+        names = [event for event, _ in events]
+        self.assertGreater(names.count('chunk'), 1)
+        self.assertEqual(names[-1], 'complete')
+        self.assertEqual(set(names), {'chunk', 'complete'})
+        text = ''.join(data['text'] for event, data in events if event == 'chunk')
+        self.assertEqual(len(events[-1][1]['test_cases']), len(parse_test_cases(text)))
+        self.assertEqual(await self.problem.test_cases.acount(), len(parse_test_cases(text)))
+
+        # Stored cases are sent without another generation
+        events = await _stream(await self.async_client.get(self.url))
+        self.assertEqual([event for event, _ in events], ['complete'])
+
+    async def test_unparseable_response_is_an_error_event(self):
+        async def garbage(*args, **kwargs):
+            yield 'not json'
+
+        with mock.patch('problems.views.astream_test_case', garbage):
+            events = await _stream(await self.async_client.get(self.url))
+
+        self.assertEqual([event for event, _ in events], ['chunk', 'error'])
+        self.assertIn('Could not parse', events[-1][1]['error'])
+        self.assertEqual(await self.problem.test_cases.acount(), 0)
+
+    async def test_store_failure_is_an_error_event(self):
+        with mock.patch('problems.views.store_test_cases', side_effect=RuntimeError('disk full')):
+            events = await _stream(await self.async_client.get(self.url))
+
+        self.assertEqual(events[-1], ('error', {'error': 'Generation failed: disk full'}))
+
+    def test_wsgi_sends_only_the_final_event(self):
+        response = self.client.get(self.url)
+
+        self.assertNotIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = _events(response.content)
+        self.assertEqual([event for event, _ in events], ['complete'])
+        self.assertEqual(len(events[0][1]['test_cases']), self.problem.test_cases.count())
+
+
+class SingleFlightTests(SimpleTestCase):
+    def _wait_for_coalesced(self, count):
+        # Waiters only block once they have been counted
+        deadline = time.monotonic() + 5
+        while singleflight.stats()['coalesced'] < count:
+            self.assertLess(time.monotonic(), deadline, "waiters never joined the call")
+            time.sleep(0.01)
+
+    def test_concurrent_calls_share_one_result(self):
+        flight = singleflight.SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def work():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return 'value'
+
+        coalesced = singleflight.stats()['coalesced']
+        threads = [threading.Thread(target=lambda: results.append(flight.do('key', work))) for _ in range(3)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        self._wait_for_coalesced(coalesced + 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 3)
+        # The key is free again once the call has landed
+        self.assertEqual(flight.do('key', lambda: 'again'), 'again')
+
+    def test_waiters_share_the_exception(self):
+        flight = singleflight.SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        errors = []
+
+        def work():
+            started.set()
+            release.wait()
+            raise RuntimeError('boom')
+
+        def call():
+            try:
+                flight.do('key', work)
+            except RuntimeError as e:
+                errors.append(e)
+
+        coalesced = singleflight.stats()['coalesced']
+        threads = [threading.Thread(target=call) for _ in range(2)]
+        threads[0].start()
+        started.wait()
+        threads[1].start()
+        self._wait_for_coalesced(coalesced + 1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 2)
+        self.assertIs(errors[0], errors[1])
+
+    async def test_async_calls_share_one_result(self):
+        flight = singleflight.SingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await release.wait()
+            return 'value'
+
+        pending = [asyncio.ensure_future(flight.ado('key', work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+
+        self.assertEqual(await asyncio.gather(*pending), ['value'] * 3)
+        self.assertEqual(len(calls), 1)
+
+    async def test_cancelled_leader_leaves_the_call_running(self):
+        flight = singleflight.SingleFlight()
+        started, release = asyncio.Event(), asyncio.Event()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            started.set()
+            await release.wait()
+            return 'value'
+
+        leader = asyncio.ensure_future(flight.ado('key', work))
+        await started.wait()
+        waiter = asyncio.ensure_future(flight.ado('key', work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+
+        self.assertEqual(await waiter, 'value')
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight._tasks, {})
+
+
+class ParseProblemHtmlTests(SimpleTestCase):
+    def test_fixture_page_has_no_solutions(self):
+        page = scraper.parse_problem_html((FIXTURES_DIR / 'two-integer-sum.html').read_bytes())
+
+        self.assertEqual(page['title'], 'Two Sum')
+        self.assertTrue(page['description'][0].startswith('Given an array of integers nums'))
+        self.assertIn('Input: nums = [3,4,5,6], target = 7\nOutput: [0,1]', page['description'])
+        # The Solution tab is only rendered client-side, as on neetcode.io
+        self.assertEqual(page['solutions'], [])
+        self.assertFalse(scraper.is_complete(page))
+
+    def test_rendered_page_has_solutions(self):
+        page = rendered_fixture('two-integer-sum')
+
+        self.assertEqual([language for language, _ in page['solutions']], ['python', 'java', 'cpp', 'go'])
+        self.assertTrue(page['solutions'][0][1].startswith('class Solution:\n    def twoSum('))
+        self.assertIn('Map<Integer, Integer>', page['solutions'][1][1])
+        self.assertTrue(scraper.is_complete(page))
+
+    def test_server_rendered_solutions_are_found(self):
+        page = scraper.parse_problem_html(
+            '<html><body><h1>Demo</h1><div class="my-article-component-container"><p>Text</p><p> </p></div>'
+            '<div class="code-toolbar"><pre class="language-python"><code>pass</code></pre></div>'
+            '<div class="code-toolbar"><pre><code>no language</code></pre></div></body></html>'
+        )
+
+        self.assertEqual(page, {'title': 'Demo', 'description': ['Text'], 'solutions': [['python', 'pass']]})
+
+    def test_missing_fields(self):
+        page = scraper.parse_problem_html('<html><body><p>Loading...</p></body></html>')
+
+        self.assertEqual(page, {'title': None, 'description': None, 'solutions': []})
+
+
+class ScrapeFallbackTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        server, cls.url_template = serve_fixtures()
+        cls.addClassCleanup(server.shutdown)
+
+    def setUp(self):
+        self.pool = mock.MagicMock()
+        self.driver = self.pool.driver.return_value.__enter__.return_value
+
+    def test_incomplete_page_falls_back_to_selenium(self):
+        rendered = scraper.build_problem('is-anagram', rendered_fixture('is-anagram'))
+
+        with mock.patch.object(scraper, 'scrape_problem', return_value=rendered) as scrape_problem:
+            data = scraper.scrape('is-anagram', pool=self.pool, url_template=self.url_template)
+
+        scrape_problem.assert_called_once_with(self.driver, 'is-anagram', url=self.url_template.format(slug='is-anagram'))
+        self.assertEqual(data, rendered)
+
+    def test_http_backend_never_falls_back(self):
+        with mock.patch.object(scraper, 'scrape_problem') as scrape_problem, \
+                self.assertLogs('problems.scraper', 'WARNING'):
+            data = scraper.scrape('is-anagram', backend='http', url_template=self.url_template)
+
+        scrape_problem.assert_not_called()
+        self.assertEqual(data['title'], 'Valid Anagram')
+        self.assertEqual(data['solutions'], [])
+
+    def test_complete_page_skips_selenium(self):
+        page = rendered_fixture('is-anagram')
+
+        with mock.patch.object(scraper, 'fetch_problem', return_value=page), \
+                mock.patch.object(scraper, 'scrape_problem') as scrape_problem:
+            data = scraper.scrape('is-anagram', pool=self.pool)
+
+        scrape_problem.assert_not_called()
+        self.assertEqual(len(data['solutions']), len(page['solutions']))
+
+    def test_fallback_needs_a_pool(self):
+        with self.assertRaises(ValueError):
+            scraper.scrape('is-anagram', url_template=self.url_template)
+
+
+def _scraped(slug, **fields):
+    data = {
+        'slug': slug, 'title': slug.replace('-', ' ').title(), 'description': 'Description.',
+        'solutions': [('python', 'class Solution: pass'), ('java', 'class Solution {}')],
+        **fields,
+    }
+    data.setdefault('solution', '\n\n'.join(code for _, code in data['solutions']))
+    return data
+
+
+class SaveProblemTests(TestCase):
+    def test_created_then_unchanged(self):
+        problem, created, changed = scraper.save_problem(_scraped('two-sum'))
+
+        self.assertTrue(created and changed)
+        self.assertEqual(problem.content_hash, scraper.content_hash(_scraped('two-sum')))
+        self.assertEqual(list(problem.solutions.values_list('language', flat=True)), ['python', 'java'])
+
+        scraped_at, updated_at = problem.last_scraped_at, problem.updated_at
+        again, created, changed = scraper.save_problem(_scraped('two-sum'))
+        self.assertFalse(created or changed)
+        again.refresh_from_db()
+        # Only the scrape time moves; the ETag inputs stay put
+        self.assertGreater(again.last_scraped_at, scraped_at)
+        self.assertEqual(again.updated_at, updated_at)
+
+    def test_changed_content_is_written(self):
+        problem, _, _ = scraper.save_problem(_scraped('two-sum'))
+        Problem.objects.filter(pk=problem.pk).update(difficulty=3)
+
+        updated, created, changed = scraper.save_problem(_scraped('two-sum', solutions=[('go', 'func twoSum() {}')]))
+        self.assertFalse(created)
+        self.assertTrue(changed)
+        updated.refresh_from_db()
+        self.assertEqual(list(updated.solutions.values_list('language', 'code')), [('go', 'func twoSum() {}')])
+        # Difficulty isn't scraped, so a hand-set value survives
+        self.assertEqual(updated.difficulty, 3)
+
+
+class SaveProblemsTests(TestCase):
+    def test_batch_upsert(self):
+        batch = [_scraped('two-sum'), _scraped('valid-anagram')]
+
+        self.assertEqual(scraper.save_problems(batch), {'two-sum': True, 'valid-anagram': True})
+        self.assertEqual(scraper.save_problems(batch), {'two-sum': False, 'valid-anagram': False})
+
+        batch[1] = _scraped('valid-anagram', description='New description.', solutions=[('go', 'func f() {}')])
+        self.assertEqual(scraper.save_problems(batch), {'two-sum': False, 'valid-anagram': True})
+        problem = Problem.objects.get(slug='valid-anagram')
+        self.assertEqual(problem.description, 'New description.')
+        self.assertEqual(list(problem.solutions.values_list('language', flat=True)), ['go'])
+        self.assertEqual(Problem.objects.get(slug='two-sum').solutions.count(), 2)
+
+
+class ProblemWriterTests(TestCase):
+    def setUp(self):
+        self.flushes = []
+        # Only the scraper module's clock
+        patcher = mock.patch('problems.scraper.time')
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.clock.monotonic.return_value = 1000.0
+
+    def _writer(self, batch_size=2, flush_interval=30):
+        return scraper.ProblemWriter(batch_size, flush_interval, on_flush=lambda *result: self.flushes.append(result))
+
+    def test_flushes_full_batches(self):
+        writer = self._writer()
+        writer.add(_scraped('two-sum'))
+        self.assertEqual(self.flushes, [])
+
+        writer.add(_scraped('valid-anagram'))
+        self.assertEqual(self.flushes, [({'two-sum': True, 'valid-anagram': True}, {})])
+        self.assertIsNone(writer.due_in())
+
+    def test_flushes_after_the_interval_without_new_rows(self):
+        writer = self._writer()
+        writer.add(_scraped('two-sum'))
+        self.assertEqual(writer.due_in(), 30)
+
+        self.clock.monotonic.return_value = 1029.0
+        self.assertEqual(writer.flush_if_due(), {})
+        self.assertEqual(writer.due_in(), 1)
+
+        self.clock.monotonic.return_value = 1030.0
+        self.assertEqual(writer.flush_if_due(), {'two-sum': True})
+        self.assertEqual(len(self.flushes), 1)
+
+    def test_failed_batch_is_saved_row_by_row(self):
+        _problem('taken', title='Two Sum')
+        writer = self._writer()
+        writer.add(_scraped('valid-anagram'))
+        # Same title as an existing problem: the batch upsert fails on it
+        with self.assertLogs('problems.scraper', 'WARNING'):
+            writer.add(_scraped('two-sum'))
+
+        results, errors = self.flushes[0]
+        self.assertEqual(results, {'valid-anagram': True})
+        self.assertEqual(list(errors), ['two-sum'])
+        self.assertTrue(Problem.objects.filter(slug='valid-anagram').exists())
+        self.assertFalse(Problem.objects.filter(slug='two-sum').exists())
+
+
+class PromptBudgetTests(SimpleTestCase):
+    DATA = {
+        'description': 'word ' * 200,
+        'solutions': ['# brute force\n' + 'x = 1\n' * 100, '# optimal\nreturn 42'],
+    }
+
+    @staticmethod
+    def render(data):
+        return data['description'] + '\n'.join(data['solutions'])
+
+    def test_prompt_within_budget_is_unchanged(self):
+        prompt = prompts.enforce_budget(self.render, self.DATA, budget=10_000)
+
+        self.assertEqual(prompt, self.render(self.DATA))
+
+    def test_keeps_only_the_last_solution(self):
+        prompt = prompts.enforce_budget(self.render, self.DATA, budget=300)
+
+        self.assertNotIn('# brute force', prompt)
+        self.assertIn('# optimal', prompt)
+        self.assertIn(self.DATA['description'], prompt)
+        self.assertLessEqual(prompts.estimate_tokens(prompt), 300)
+
+    def test_truncates_the_description(self):
+        prompt = prompts.enforce_budget(self.render, self.DATA, budget=100)
+
+        self.assertIn(prompts.TRUNCATION_MARK, prompt)
+        self.assertTrue(prompt.endswith('# optimal\nreturn 42'))
+        self.assertLessEqual(prompts.estimate_tokens(prompt), 100)
+
+    def test_pick_solutions(self):
+        rows = [('java', 'class A {}'), ('python', 'one'), ('python', 'two')]
+
+        self.assertEqual(prompts.pick_solutions(rows, 'python'), ('python', ['one', 'two']))
+        self.assertEqual(prompts.pick_solutions(rows, 'rust'), ('java', ['class A {}']))
+        self.assertEqual(prompts.pick_solutions([], 'python'), ('python', []))
+
+    @override_settings(SANDBOX_ENABLED=False)
+    def test_prompt_holds_only_the_requested_language(self):
+        problem = Problem(slug='two-sum', title='Two Sum', description='Find two numbers.')
+        data = api.build_problem_data(problem, [('python', 'def two_sum(): pass'), ('java', 'class Solution {}')], 'java')
+
+        prompt = api.format_prompt(data)
+        self.assertIn('Here is a Java solution', prompt)
+        self.assertIn('class Solution {}', prompt)
+        self.assertNotIn('def two_sum', prompt)
+
+
+class SplitSolutionsMigrationTests(TransactionTestCase):
+    before = [('problems', '0005_solution')]
+    after = [('problems', '0006_split_problem_solutions')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_forwards_and_backwards(self):
+        apps = self.migrate(self.before)
+        Problem = apps.get_model('problems', 'Problem')
+        problem = Problem.objects.create(
+            slug='two-sum', title='Two Sum', description='', difficulty='Easy',
+            solution='Python Solution:\nclass Solution:\n    pass\n\nCpp Solution:\nclass Solution {};',
+        )
+        Problem.objects.create(slug='empty', title='Empty', description='', difficulty='Easy', solution='')
+
+        apps = self.migrate(self.after)
+        Solution = apps.get_model('problems', 'Solution')
+        self.assertEqual(
+            list(Solution.objects.order_by('position').values_list('problem_id', 'language', 'code', 'position')),
+            [(problem.pk, 'python', 'class Solution:\n    pass', 0), (problem.pk, 'cpp', 'class Solution {};', 1)],
+        )
+
+        apps = self.migrate(self.before)
+        self.assertFalse(apps.get_model('problems', 'Solution').objects.exists())
+        # The combined column is left as it was
+        self.assertEqual(apps.get_model('problems', 'Problem').objects.get(slug='two-sum').solution, problem.solution)
+
+
+class _LoopBoundClient:
+    # Stands in for GenerativeServiceAsyncClient, which only works on the loop it was created on
+    def __init__(self, **kwargs):
+        self.loop = asyncio.get_running_loop()
+
+    async def generate_content(self, request, **kwargs):
+        if asyncio.get_running_loop() is not self.loop:
+            raise RuntimeError('Event loop is closed')
+        from google.generativeai import protos
+        return protos.GenerateContentResponse(candidates=[{'content': {'parts': [{'text': 'generated'}]}}])
+
+
+class GeminiProviderTests(SimpleTestCase):
+    def test_async_calls_from_separate_event_loops(self):
+        with mock.patch('google.ai.generativelanguage.GenerativeServiceAsyncClient', _LoopBoundClient):
+            provider = llm.GeminiProvider('test-key', 'gemini-test')
+
+        # What WSGI does for every async view
+        self.assertEqual(asyncio.run(provider.agenerate('prompt')), 'generated')
+        self.assertEqual(asyncio.run(provider.agenerate('prompt')), 'generated')
+
+    def test_one_client_per_event_loop(self):
+        with mock.patch('google.ai.generativelanguage.GenerativeServiceAsyncClient', _LoopBoundClient):
+            provider = llm.GeminiProvider('test-key', 'gemini-test')
+
+        async def twice():
+            await provider.agenerate('prompt')
+            first = provider._async_model()
+            await provider.agenerate('prompt')
+            return first is provider._async_model()
+
+        self.assertTrue(asyncio.run(twice()))
+
+
+class CursorTests(TestCase):
+    def test_roundtrip(self):
+        for last_id in (0, 1, 2 ** 40):
+            cursor = encode_cursor(last_id)
+            self.assertNotIn('=', cursor)
+            self.assertEqual(decode_cursor(cursor), last_id)
+
+    def test_invalid_cursors(self):
+        for cursor in ('', 'not a cursor!', encode_cursor('7'), encode_cursor(True), 'eyJpZCI6', 'WzFd', 'eyJ4IjogMX0'):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+    async def test_keyset_pages(self):
+        for index in range(5):
+            await Problem.objects.acreate(slug=f'problem-{index}', title=f'Problem {index}', description='', solution='')
+
+        seen, cursor = [], None
+        while True:
+            rows, cursor = await keyset_page(Problem.objects.all(), cursor, 2)
+            seen.append([row.slug for row in rows])
+            if cursor is None:
+                break
+        self.assertEqual(seen, [['problem-0', 'problem-1'], ['problem-2', 'problem-3'], ['problem-4']])
+
+    def test_list_view_pages(self):
+        for index in range(3):
+            _problem(f'problem-{index}', description='Long text.')
+
+        first = self.client.get(reverse('problems'), {'limit': 2}).json()
+        self.assertEqual([row['slug'] for row in first['results']], ['problem-0', 'problem-1'])
+        self.assertNotIn('description', first['results'][0])
+
+        second = self.client.get(reverse('problems'), {'limit': 2, 'cursor': first['next_cursor'], 'fields': 'description'})
+        self.assertEqual([row['slug'] for row in second.json()['results']], ['problem-2'])
+        self.assertEqual(second.json()['results'][0]['description'], 'Long text.')
+        self.assertIsNone(second.json()['next_cursor'])
+
+        self.assertEqual(self.client.get(reverse('problems'), {'cursor': encode_cursor(True)}).status_code, 400)
+
+
+def _cases(*inputs, tier='small'):
+    return [{'tier': tier, 'input_data': text, 'generator': None, 'expected_output': '0'} for text in inputs]
+
+
+@override_settings(SANDBOX_ENABLED=False)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.problem = _problem('two-sum', description='Find two numbers.')
+        store_test_cases(self.problem, _cases('nums = [1, 2], target = 3', 'nums = [5], target = 5'))
+
+    def assertRevalidates(self, url):
+        # The ETag of a 200 gets a 304 next time, with the same validators and policy
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+        self.assertEqual(cached['ETag'], etag)
+        self.assertEqual(cached['Cache-Control'], response['Cache-Control'])
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304,
+        )
+        return etag
+
+    def test_problem_detail(self):
+        url = reverse('problem_detail', args=['two-sum'])
+        etag = self.assertRevalidates(url)
+
+        store_test_cases(self.problem, _cases('nums = [7, 8], target = 15'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        self.problem.description = 'Edited.'
+        self.problem.save()
+        self.assertNotEqual(self.client.get(url)['ETag'], response['ETag'])
+
+    def test_stored_test_cases(self):
+        url = reverse('generate_test_case', args=['two-sum'])
+        etag = self.assertRevalidates(url)
+
+        # Even the same cases stored again are a new version
+        store_test_cases(self.problem, _cases('nums = [1, 2], target = 3', 'nums = [5], target = 5'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_download(self):
+        test_case = self.problem.test_cases.first()
+        url = reverse('test_case_download', args=[test_case.pk, 'input'])
+        etag = self.assertRevalidates(url)
+
+        self.assertEqual(etag, f'"{test_case.input_sha256}"')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag)['Vary'], 'Accept-Encoding')
+
+    def test_compaction_changes_the_etag(self):
+        url = reverse('generate_test_case', args=['two-sum'])
+        # A flag left wrong by an older version of dedup
+        self.problem.test_cases.update(near_duplicate=True)
+        etag = self.client.get(url)['ETag']
+
+        call_command('compact_test_cases', stdout=StringIO())
+        self.assertFalse(self.problem.test_cases.filter(near_duplicate=True).exists())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class SearchTests(TestCase):
+    # Runs against whichever backend is configured: tsvector on PostgreSQL, FTS5 on SQLite
+    def setUp(self):
+        self.tree = _problem('binary-tree-paths', description='Return every root-to-leaf path of a binary tree.')
+        self.mention = _problem('two-sum', description='Nothing to do with a tree, only arrays of numbers here.')
+        _problem('valid-anagram', description='Compare letter counts of two strings.')
+
+    def slugs(self, query):
+        return list(search.ranked(Problem.objects.all(), query).values_list('slug', flat=True))
+
+    def test_best_match_first(self):
+        self.assertEqual(self.slugs('tree'), ['binary-tree-paths', 'two-sum'])
+        self.assertEqual(self.slugs('binary tree'), ['binary-tree-paths'])
+        self.assertEqual(self.slugs('graph'), [])
+
+    def test_user_input_is_not_query_syntax(self):
+        self.assertEqual(self.slugs('tree"'), ['binary-tree-paths', 'two-sum'])
+        self.assertEqual(self.slugs('!!!'), [])
+        self.assertEqual(self.slugs('   '), [])
+
+    def test_index_follows_writes(self):
+        self.tree.title = 'Graph Paths'
+        self.tree.save()
+        self.assertEqual(self.slugs('graph'), ['binary-tree-paths'])
+
+        self.tree.delete()
+        self.assertEqual(self.slugs('tree'), ['two-sum'])
+
+    def test_matching_keeps_the_queryset_order(self):
+        matches = search.matching(Problem.objects.order_by('-slug'), 'tree')
+
+        self.assertEqual(list(matches.values_list('slug', flat=True)), ['two-sum', 'binary-tree-paths'])
+
+    @override_settings(SANDBOX_ENABLED=False)
+    def test_search_view(self):
+        store_test_cases(self.mention, _cases('nums = [31337], target = 1', 'nums = [2], target = 4', tier='edge'))
+
+        response = self.client.get(reverse('search'), {'q': 'binary tree'})
+        self.assertEqual(response.status_code, 200)
+        result = response.json()['results'][0]
+        self.assertEqual((result['slug'], result['difficulty']), ('binary-tree-paths', 'Easy'))
+        self.assertIn('rank', result)
+
+        response = self.client.get(reverse('search'), {'q': '31337', 'type': 'test_cases'})
+        self.assertEqual(
+            [(row['problem_slug'], row['tier']) for row in response.json()['results']], [('two-sum', 'edge')],
+        )
+
+        self.assertEqual(self.client.get(reverse('search')).status_code, 400)
+        self.assertEqual(self.client.get(reverse('search'), {'q': 'tree', 'type': 'users'}).status_code, 400)
+
+    def test_fts5_query_quotes_every_term(self):
+        self.assertEqual(search.fts5_query('two-sum OR "x*'), '"two" "sum" "OR" "x"')
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite FTS5 triggers')
+    def test_install_repairs_dropped_triggers(self):
+        # What an ALTER that rebuilds the table does to them
+        with connection.cursor() as cursor:
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER problems_problem_fts_{suffix}")
+        _problem('graph-valid-tree')
+        self.assertEqual(self.slugs('graph'), [])
+
+        with self.assertLogs('problems.search', 'INFO'):
+            search.install(connection)
+        self.assertEqual(self.slugs('graph'), ['graph-valid-tree'])
+
+
+def _blob_storage(test):
+    # A throwaway blob directory for the test
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    storages = {**settings.STORAGES, blobs.STORAGE: {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': directory.name},
+    }}
+    override = override_settings(STORAGES=storages)
+    override.enable()
+    test.addCleanup(override.disable)
+    return directory.name
+
+
+@override_settings(SANDBOX_ENABLED=False, TEST_CASE_INLINE_MAX_BYTES=1024)
+class BlobStorageTests(TestCase):
+    def setUp(self):
+        self.directory = _blob_storage(self)
+        self.problem = _problem('two-sum')
+        self.large = 'nums = [' + ', '.join(str(i) for i in range(2000)) + ']'
+        store_test_cases(self.problem, _cases(self.large, 'nums = [1]'))
+        self.external = self.problem.test_cases.get(input_external=True)
+
+    def test_large_payload_round_trip(self):
+        self.assertEqual(self.external.input_data, '')
+        self.assertEqual(self.external.input_size, len(self.large))
+        self.assertEqual(read_payload(self.external, 'input'), self.large)
+        path = os.path.join(self.directory, blobs.blob_name(self.external.input_sha256))
+        self.assertLess(os.path.getsize(path), len(self.large))
+        # Small payloads stay in the row
+        inline = self.problem.test_cases.get(input_external=False)
+        self.assertEqual(read_payload(inline, 'input'), 'nums = [1]')
+
+    def test_identical_payloads_share_a_blob(self):
+        path = os.path.join(self.directory, blobs.blob_name(self.external.input_sha256))
+        os.utime(path, (0, 0))
+
+        store_test_cases(_problem('three-sum'), _cases(self.large))
+        self.assertEqual(sum(len(files) for _, _, files in os.walk(self.directory)), 1)
+        # Reuse counts as a write for prune_testcase_blobs
+        self.assertGreater(os.path.getmtime(path), 0)
+
+    async def _download(self, pk, **headers):
+        # headers as keywords, e.g. accept_encoding='gzip'
+        headers = {name.replace('_', '-'): value for name, value in headers.items()}
+        response = await self.async_client.get(reverse('test_case_download', args=[pk, 'input']), headers=headers)
+        body = b''.join([chunk async for chunk in response.streaming_content]) if response.status_code == 200 else b''
+        return response, body
+
+    async def test_gzip_and_identity_downloads(self):
+        identity, body = await self._download(self.external.pk)
+        self.assertEqual(body.decode(), self.large)
+        self.assertEqual(identity['Content-Length'], str(len(self.large)))
+        self.assertNotIn('Content-Encoding', identity)
+
+        compressed, body = await self._download(self.external.pk, accept_encoding='gzip, deflate')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body).decode(), self.large)
+        self.assertEqual(compressed['Vary'], 'Accept-Encoding')
+
+        # Each representation has its own strong ETag and only revalidates itself
+        self.assertEqual(identity['ETag'], f'"{self.external.input_sha256}"')
+        self.assertEqual(compressed['ETag'], f'"{self.external.input_sha256}-gzip"')
+        response, _ = await self._download(self.external.pk, if_none_match=compressed['ETag'])
+        self.assertEqual(response.status_code, 200)
+        response, _ = await self._download(
+            self.external.pk, if_none_match=compressed['ETag'], accept_encoding='gzip',
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_inline_payload_is_sent_as_is(self):
+        inline = await self.problem.test_cases.aget(input_external=False)
+
+        response, body = await self._download(inline.pk, accept_encoding='gzip')
+        self.assertEqual(body, b'nums = [1]')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['ETag'], f'"{inline.input_sha256}"')
+
+    def test_unknown_part(self):
+        url = reverse('test_case_download', args=[self.external.pk, 'solution'])
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_prune_keeps_referenced_blobs(self):
+        orphan, _ = blobs.put('no longer referenced ' * 100)
+        recent, _ = blobs.put('still being stored ' * 100)
+        for digest in (self.external.input_sha256, orphan):
+            os.utime(os.path.join(self.directory, blobs.blob_name(digest)), (0, 0))
+
+        out = StringIO()
+        call_command('prune_testcase_blobs', stdout=out)
+        self.assertIn('Removed 1 unreferenced blobs (1 in use)', out.getvalue())
+        self.assertEqual(blobs.read(self.external.input_sha256), self.large)
+        self.assertEqual(blobs.read(recent), 'still being stored ' * 100)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, blobs.blob_name(orphan))))
+
+
+class GeneratorSpecTests(SimpleTestCase):
+    def test_defaults(self):
+        spec = generators.validate({'variables': [{'name': 'n', 'type': 'int'}, {'name': 's', 'type': 'string'}]})
+
+        self.assertEqual(spec['seed'], 0)
+        self.assertEqual(spec['variables'][0], {'name': 'n', 'type': 'int', 'low': 0, 'high': 100, 'distribution': 'uniform'})
+        self.assertEqual(spec['variables'][1]['alphabet'], generators.DEFAULT_ALPHABET)
+        self.assertEqual((spec['variables'][1]['low'], spec['variables'][1]['high']), (1, 10))
+
+    def test_whole_float_bounds_become_ints(self):
+        spec = generators.validate({'variables': [{'name': 'nums', 'type': 'int_array', 'low': -1e9, 'high': 1e9, 'size': 1e3}]})
+
+        variable = spec['variables'][0]
+        self.assertEqual((variable['low'], variable['high'], variable['size']), (-10 ** 9, 10 ** 9, 1000))
+        self.assertIsInstance(variable['high'], int)
+
+    @override_settings(GENERATOR_MAX_ELEMENTS=100)
+    def test_invalid_specs(self):
+        invalid = [
+            {},
+            {'variables': []},
+            {'seed': -1, 'variables': [{'name': 'n', 'type': 'int'}]},
+            {'seed': True, 'variables': [{'name': 'n', 'type': 'int'}]},
+            {'variables': [{'name': '1n', 'type': 'int'}]},
+            {'variables': [{'name': 'n', 'type': 'complex'}]},
+            {'variables': [{'name': 'n', 'type': 'int', 'low': 0.5}]},
+            {'variables': [{'name': 'n', 'type': 'int', 'high': '10'}]},
+            {'variables': [{'name': 'n', 'type': 'int', 'low': 2 ** 63}]},
+            {'variables': [{'name': 'x', 'type': 'float', 'high': float('inf')}]},
+            {'variables': [{'name': 'x', 'type': 'float', 'low': float('nan')}]},
+            {'variables': [{'name': 'n', 'type': 'int', 'low': 5, 'high': 1}]},
+            {'variables': [{'name': 'n', 'type': 'int', 'distribution': 'poisson'}]},
+            {'variables': [{'name': 'nums', 'type': 'int_array', 'size': 101}]},
+            {'variables': [{'name': 'nums', 'type': 'int_array', 'size': -1}]},
+            {'variables': [{'name': 'nums', 'type': 'int_array', 'size': 10, 'sorted': 'up'}]},
+            {'variables': [{'name': 'nums', 'type': 'int_array', 'size': 10, 'low': 0, 'high': 5, 'unique': True}]},
+            {'variables': [{'name': 'nums', 'type': 'int_array', 'low': -2 ** 63, 'high': 2 ** 63 - 1, 'unique': True}]},
+            {'variables': [{'name': 'words', 'type': 'string_array', 'size': 10, 'high': 20}]},
+            {'variables': [{'name': 's', 'type': 'string', 'low': -1}]},
+        ]
+        for spec in invalid:
+            with self.subTest(spec=spec), self.assertRaises(generators.GeneratorSpecError):
+                generators.validate(spec)
+
+    def test_expansion_is_deterministic_and_within_bounds(self):
+        spec = generators.validate({'seed': 7, 'variables': [
+            {'name': 'nums', 'type': 'int_array', 'low': -50, 'high': 50, 'size': 40, 'unique': True, 'sorted': True},
+            {'name': 'target', 'type': 'int', 'low': 1, 'high': 3},
+        ]})
+        text = generators.expand(spec)
+
+        self.assertEqual(text, generators.expand(spec))
+        nums, target = re.fullmatch(r'nums = (\[.*\]), target = (\d+)', text).groups()
+        nums = json.loads(nums)
+        self.assertEqual(nums, sorted(set(nums)))
+        self.assertEqual(len(nums), 40)
+        self.assertTrue(all(-50 <= value <= 50 for value in nums))
+        self.assertIn(int(target), (1, 2, 3))
+
+    def test_chunks_join_to_the_same_text(self):
+        spec = generators.validate({'seed': 3, 'variables': [
+            {'name': 'words', 'type': 'string_array', 'size': 5, 'low': 2, 'high': 4, 'alphabet': 'ab'},
+            {'name': 'x', 'type': 'float', 'low': -1, 'high': 1, 'distribution': 'normal'},
+        ]})
+
+        with mock.patch.object(generators, 'CHUNK_ELEMENTS', 2):
+            chunks = list(generators.expand_chunks(spec))
+        self.assertEqual(''.join(chunks), generators.expand(spec))
+        words = json.loads(re.match(r'words = (\[.*?\])', generators.expand(spec)).group(1))
+        self.assertTrue(all(2 <= len(word) <= 4 and set(word) <= {'a', 'b'} for word in words))
+
+
+class SandboxArgumentTests(SimpleTestCase):
+    def test_json_arguments(self):
+        self.assertEqual(
+            sandbox.parse_arguments('nums = [2,7,11,15], target = 9'),
+            ((), {'nums': [2, 7, 11, 15], 'target': 9}),
+        )
+        self.assertEqual(
+            sandbox.parse_arguments(' s = "a, b = c", flag = true, rest = null '),
+            ((), {'s': 'a, b = c', 'flag': True, 'rest': None}),
+        )
+
+    def test_python_arguments(self):
+        self.assertEqual(sandbox.parse_arguments("s = 'abc', pair = (1, 2)"), ((), {'s': 'abc', 'pair': (1, 2)}))
+        self.assertEqual(sandbox.parse_arguments('[1, 2], 3'), (([1, 2], 3), {}))
+        self.assertEqual(
+            sandbox.parse_arguments('flag = True, rest = None, other = false'),
+            ((), {'flag': True, 'rest': None, 'other': False}),
+        )
+
+    def test_unreadable_arguments(self):
+        for text in ('nums = [1, 2', 'x = os.system("ls")', 'x = y', 'x = __import__("os")', 'x = 1 +'):
+            with self.subTest(text=text), self.assertRaises(sandbox.SandboxError):
+                sandbox.parse_arguments(text)
+
+    def test_calls(self):
+        expected = (['LRUCache', 'put', 'get'], [[2], [1, 1], [1]])
+        for text in (
+            '["LRUCache","put","get"]\n[[2],[1,1],[1]]',
+            '["LRUCache", "put", "get"], [[2], [1, 1], [1]]',
+            'operations = ["LRUCache","put","get"], arguments = [[2],[1,1],[1]]',
+        ):
+            with self.subTest(text=text):
+                self.assertEqual(sandbox.parse_calls(text), expected)
+        for text in ('["LRUCache","put"]\n[[2]]', '[1, 2]\n[[], []]', 'nums = [1, 2]'):
+            with self.subTest(text=text), self.assertRaises(sandbox.SandboxError):
+                sandbox.parse_calls(text)
+
+    def test_format_output(self):
+        self.assertEqual(sandbox.format_output([0, 1]), '[0,1]')
+        self.assertEqual(sandbox.format_output(True), 'true')
+        self.assertEqual(sandbox.format_output({3, 1, 2}), '[1,2,3]')
+        self.assertEqual(sandbox.format_output({'a': None}), '{"a":null}')
+        with self.assertRaises(sandbox.SandboxError):
+            sandbox.format_output(object())
+
+
+REVERSE_LIST = '''
+# Definition for singly-linked list.
+# class ListNode:
+#     def __init__(self, val=0, next=None):
+class Solution:
+    def reverseList(self, head: Optional[ListNode]) -> Optional[ListNode]:
+        prev = None
+        while head:
+            head.next, prev, head = prev, head, head.next
+        return prev
+'''
+
+
+class SandboxRunTests(SimpleTestCase):
+    def run_case(self, code, text):
+        # In this process; the workers run the same _run
+        return sandbox._run({}, code, {'input': text})
+
+    def test_linked_lists(self):
+        self.assertEqual(self.run_case(REVERSE_LIST, 'head = [1,2,3]'), '[3,2,1]')
+        self.assertEqual(self.run_case(REVERSE_LIST, 'head = []'), '[]')
+        merge = '''
+class Solution:
+    def mergeKLists(self, lists: List[Optional[ListNode]]) -> Optional[ListNode]:
+        values = []
+        for node in lists:
+            while node:
+                values.append(node.val)
+                node = node.next
+        head = None
+        for value in sorted(values, reverse=True):
+            head = ListNode(value, head)
+        return head
+'''
+        self.assertEqual(self.run_case(merge, 'lists = [[1,4,5],[1,3,4],[2,6]]'), '[1,1,2,3,4,4,5,6]')
+
+    def test_trees(self):
+        invert = '''
+class Solution:
+    def invertTree(self, root: Optional[TreeNode]) -> Optional[TreeNode]:
+        if root:
+            root.left, root.right = self.invertTree(root.right), self.invertTree(root.left)
+        return root
+'''
+        self.assertEqual(self.run_case(invert, 'root = [4,2,7,1,null,6,9]'), '[4,7,2,9,6,null,1]')
+        self.assertEqual(self.run_case(invert, 'root = []'), '[]')
+
+    def test_design_class_calls(self):
+        lru = '''
+class LRUCache:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.items = OrderedDict()
+
+    def get(self, key: int) -> int:
+        if key not in self.items:
+            return -1
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def put(self, key: int, value: int) -> None:
+        self.items[key] = value
+        self.items.move_to_end(key)
+        if len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+'''
+        self.assertEqual(
+            self.run_case(lru, '["LRUCache","put","put","get","put","get","get"]\n[[2],[1,1],[2,2],[1],[3,3],[2],[3]]'),
+            '[null,null,null,1,null,-1,3]',
+        )
+        with self.assertRaises(sandbox.SandboxError):
+            self.run_case(lru, '["MinStack","push"]\n[[],[1]]')
+
+    def test_code_without_a_class(self):
+        with self.assertRaises(sandbox.SandboxError):
+            sandbox._load('def two_sum(nums, target):\n    return []\n')
+
+    def test_dead_worker_is_replaced_and_pruned(self):
+        pool = sandbox.WorkerPool(1, settings.SANDBOX_MEMORY_MB * 1024 * 1024, 5, 30)
+        self.addCleanup(pool.shutdown)
+        self.assertEqual(pool.run(REVERSE_LIST, {'input': 'head = [1,2]'}), '[2,1]')
+        dead = pool._workers[0]
+        dead.process.kill()
+        dead.process.join()
+
+        self.assertEqual(pool.run(REVERSE_LIST, {'input': 'head = [1,2]'}), '[2,1]')
+        self.assertEqual(len(pool._workers), 1)
+        self.assertIsNot(pool._workers[0], dead)
+
+
+class _FailingPool:
+    # Loads anything with a class, then fails every case
+    def dry_run(self, code):
+        if 'class' not in code:
+            raise sandbox.SandboxError("The reference solution defines no class to call.")
+
+    def run_many(self, code, payloads):
+        return [(None, "NameError: name 'Node' is not defined")] * len(payloads)
+
+
+class _InputsOnlyProvider(llm.FakeProvider):
+    # Follows INPUT_INSTRUCTIONS, which FakeProvider ignores
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def generate(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        return super().generate(prompt, generation_config)
+
+    def _answer(self, prompt):
+        answer = super()._answer(prompt)
+        if 'Do not give expected outputs' in prompt:
+            for case in answer['test_cases']:
+                case.pop('expected_output')
+        return answer
+
+
+@override_settings(SANDBOX_ENABLED=True)
+class ReferenceFallbackTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(sandbox, 'get_pool', return_value=_FailingPool())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sandbox.loads.cache_clear()
+        self.addCleanup(sandbox.loads.cache_clear)
+        self.provider = _InputsOnlyProvider()
+        llm.set_provider(self.provider)
+        self.addCleanup(llm.set_provider, None)
+
+    def test_inputs_only_after_a_dry_run(self):
+        problem = Problem(slug='two-sum', title='Two Sum', description='Find two numbers.')
+
+        self.assertTrue(api.build_problem_data(problem, [('python', 'class Solution: pass')], 'python')['inputs_only'])
+        with self.assertLogs('problems.sandbox', 'WARNING'):
+            self.assertFalse(api.build_problem_data(problem, [('python', 'x = 1')], 'python')['inputs_only'])
+        self.assertFalse(api.build_problem_data(problem, [('java', 'class Solution {}')], 'java')['inputs_only'])
+
+    def test_failed_reference_asks_for_outputs(self):
+        problem = _problem('clone-graph')
+        problem.solutions.create(language='python', code='class Solution:\n    def cloneGraph(self, node): pass\n')
+
+        with self.assertLogs('problems.testcases', 'WARNING'):
+            stored = api.generate_and_store_test_cases('clone-graph', use_cache=False)
+
+        self.assertEqual(len(self.provider.prompts), 2)
+        self.assertIn('Do not give expected outputs', self.provider.prompts[0])
+        self.assertNotIn('Do not give expected outputs', self.provider.prompts[1])
+        written = [case for case in stored if not case.generator]
+        self.assertTrue(written)
+        self.assertTrue(all(read_payload(case, 'expected_output') and not case.expected_output_verified for case in written))
+
+    def test_batched_problems_are_retried_with_outputs(self):
+        for slug in ('clone-graph', 'copy-list-with-random-pointer'):
+            _problem(slug).solutions.create(language='python', code='class Solution:\n    def copy(self, node): pass\n')
+
+        with self.assertLogs('problems', 'WARNING'):
+            results = batching.generate_and_store_many(
+                [('clone-graph', 'python', False), ('copy-list-with-random-pointer', 'python', False)], use_cache=False,
+            )
+
+        # One batch with inputs only, then each problem alone with outputs
+        self.assertEqual(len(self.provider.prompts), 3)
+        for result in results.values():
+            self.assertIsInstance(result, list)
+            self.assertTrue(all(read_payload(case, 'expected_output') for case in result if not case.generator))
+
+
+class DeduplicationTests(SimpleTestCase):
+    def test_whitespace_outside_strings_is_ignored(self):
+        self.assertEqual(dedup.normalize(' nums = [1, 2,\n3] '), 'nums=[1,2,3]')
+        self.assertEqual(dedup.normalize('s = "a  b"'), 's="a  b"')
+        self.assertNotEqual(dedup.case_key('s = "a b"'), dedup.case_key('s = "ab"'))
+
+    def test_generator_key_ignores_field_order(self):
+        self.assertEqual(
+            dedup.case_key(generator={'seed': 1, 'variables': []}),
+            dedup.case_key(generator={'variables': [], 'seed': 1}),
+        )
+
+    def test_signature_similarity(self):
+        base = 'nums = [' + ', '.join(str(i) for i in range(200)) + '], target = 7'
+        near = base.replace('target = 7', 'target = 8')
+        other = 's = "' + 'xyz ' * 50 + '"'
+        signature = dedup.signature(dedup.normalize(base))
+
+        self.assertEqual(len(signature), dedup.NUM_PERM * 4)
+        self.assertEqual(dedup.similarity(signature, dedup.signature(dedup.normalize(base))), 1.0)
+        self.assertGreater(dedup.similarity(signature, dedup.signature(dedup.normalize(near))), 0.8)
+        self.assertLess(dedup.similarity(signature, dedup.signature(dedup.normalize(other))), 0.2)
+
+    def test_lsh_index_query(self):
+        base = 'nums = [' + ', '.join(str(i) for i in range(200)) + ']'
+        index = dedup.LSHIndex(threshold=0.8)
+        index.add('base', dedup.signature(base))
+        index.add('other', dedup.signature('s = "' + 'xyz ' * 50 + '"'))
+
+        matches = index.query(dedup.signature(base.replace('199', '200')))
+        self.assertEqual([key for key, _ in matches], ['base'])
+        self.assertEqual(index.query(dedup.signature('grid = [[0, 1], [1, 0]]')), [])
+
+    def test_deduplicate(self):
+        base = 'nums = [' + ', '.join(str(i) for i in range(200)) + ']'
+        cases = dedup.deduplicate([
+            {'input_data': base},
+            {'input_data': base.replace(', ', ',')},
+            {'input_data': base.replace('199', '200')},
+            {'input_data': 'grid = [[0, 1], [1, 0]]'},
+        ])
+
+        self.assertEqual([case['near_duplicate'] for case in cases], [False, True, False])
+        self.assertEqual(cases[0]['content_hash'], dedup.content_hash(dedup.normalize(base)))
+        self.assertEqual(len({case['content_hash'] for case in cases}), 3)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Row locks')
+@override_settings(SANDBOX_ENABLED=False)
+class ConcurrentStoreTests(TransactionTestCase):
+    def test_stores_for_a_problem_replace_rather_than_merge(self):
+        problem = _problem('two-sum')
+        manager = problem.test_cases.model.objects
+        bulk_create = manager.bulk_create
+        written, release, stored = threading.Event(), threading.Event(), threading.Event()
+        self.addCleanup(release.set)
+
+        def paused_bulk_create(*args, **kwargs):
+            # The first store stops after writing its set, before committing
+            rows = bulk_create(*args, **kwargs)
+            if threading.current_thread() is first:
+                written.set()
+                release.wait(10)
+            return rows
+
+        def store(inputs, done=None):
+            try:
+                store_test_cases(problem, _cases(*inputs))
+                if done:
+                    done.set()
+            finally:
+                connection.close()
+
+        with mock.patch.object(manager, 'bulk_create', paused_bulk_create):
+            first = threading.Thread(target=store, args=(['nums = [1]', 'nums = [2]'],))
+            first.start()
+            self.assertTrue(written.wait(10))
+            second = threading.Thread(target=store, args=(['nums = [3]', 'nums = [4]'], stored))
+            second.start()
+
+            self.assertFalse(stored.wait(0.5))
+            release.set()
+            first.join()
+            second.join()
+        self.assertTrue(stored.is_set())
+        self.assertEqual(
+            sorted(read_payload(case, 'input') for case in problem.test_cases.all()),
+            ['nums = [3]', 'nums = [4]'],
+        )
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.problem = _problem('two-sum')
+
+    def test_enqueue_returns_the_active_job(self):
+        job, created = jobs.enqueue(self.problem, 'python')
+        again, created_again = jobs.enqueue(self.problem, 'python', refresh=True, priority=5)
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.pk, job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.priority, 5)
+        self.assertTrue(job.refresh)
+        # Another language is its own job
+        self.assertTrue(jobs.enqueue(self.problem, 'cpp')[1])
+
+    def test_claim_takes_the_highest_priority_first(self):
+        low, _ = jobs.enqueue(self.problem, 'python')
+        high, _ = jobs.enqueue(_problem('add-two-numbers'), 'python', priority=10)
+
+        claimed = jobs.claim('worker-1')
+        self.assertEqual(claimed.pk, high.pk)
+        self.assertEqual(claimed.status, JobStatus.RUNNING)
+        self.assertEqual(claimed.locked_by, 'worker-1')
+        self.assertEqual(claimed.attempts, 1)
+        self.assertEqual(jobs.claim('worker-2').pk, low.pk)
+        self.assertIsNone(jobs.claim('worker-3'))
+
+    def test_claim_skips_jobs_not_yet_available(self):
+        job, _ = jobs.enqueue(self.problem, 'python')
+        GenerationJob.objects.filter(pk=job.pk).update(available_at=timezone.now() + timedelta(minutes=1))
+
+        self.assertIsNone(jobs.claim('worker-1'))
+
+    def test_expired_lease_is_requeued(self):
+        job, _ = jobs.enqueue(self.problem, 'python')
+        jobs.claim('worker-1')
+        GenerationJob.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        with self.assertLogs('problems.jobs', 'WARNING'):
+            jobs.requeue_expired()
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.QUEUED)
+        self.assertEqual(job.locked_by, '')
+        self.assertEqual(jobs.claim('worker-2').pk, job.pk)
+
+    @override_settings(GENERATION_JOB_MAX_ATTEMPTS=1)
+    def test_expired_lease_on_the_last_attempt_fails(self):
+        job, _ = jobs.enqueue(self.problem, 'python')
+        jobs.claim('worker-1')
+        GenerationJob.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        jobs.requeue_expired()
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_refresh_while_running_reruns_the_job(self):
+        jobs.enqueue(self.problem, 'python')
+        job = jobs.claim('worker-1')
+        again, created = jobs.enqueue(self.problem, 'python', refresh=True)
+
+        self.assertFalse(created)
+        self.assertEqual(again.pk, job.pk)
+        self.assertTrue(jobs._record(job, 'worker-1', None))
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.QUEUED)
+        self.assertTrue(job.refresh)
+        self.assertFalse(job.rerun)
+        self.assertEqual(job.attempts, 0)
+        self.assertIsNone(job.finished_at)
+
+    def test_failed_attempt_is_retried_later(self):
+        jobs.enqueue(self.problem, 'python')
+        job = jobs.claim('worker-1')
+
+        with self.assertLogs('problems.jobs', 'ERROR'):
+            self.assertFalse(jobs._record(job, 'worker-1', RuntimeError('model unavailable')))
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.QUEUED)
+        self.assertEqual(job.error, 'model unavailable')
+        self.assertGreater(job.available_at, timezone.now())
+        self.assertIsNone(job.finished_at)
+
+    @override_settings(GENERATION_JOB_MAX_ATTEMPTS=1)
+    def test_last_failed_attempt_fails_the_job(self):
+        jobs.enqueue(self.problem, 'python')
+        job = jobs.claim('worker-1')
+
+        with self.assertLogs('problems.jobs', 'ERROR'):
+            jobs._record(job, 'worker-1', RuntimeError('model unavailable'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_run_marks_the_job_done(self):
+        jobs.enqueue(self.problem, 'python', refresh=True)
+        job = jobs.claim('worker-1')
+
+        with mock.patch.object(jobs, 'generate_and_store_test_cases') as generate:
+            self.assertTrue(jobs.run(job, 'worker-1'))
+        generate.assert_called_once_with('two-sum', refresh=True, language='python', acquire=None)
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.DONE)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_lost_lease_is_not_finished(self):
+        jobs.enqueue(self.problem, 'python')
+        job = jobs.claim('worker-1')
+        GenerationJob.objects.filter(pk=job.pk).update(locked_by='worker-2')
+
+        with self.assertLogs('problems.jobs', 'WARNING'):
+            jobs._record(job, 'worker-1', None)
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.RUNNING)
+
+
+class _ScriptedProvider(llm.FakeProvider):
+    # Leaves the dropped problem keys out of batch responses, and refuses
+    # every call after the first quota_after
+    def __init__(self, dropped=(), quota_after=None):
+        super().__init__()
+        self.dropped = set(dropped)
+        self.quota_after = quota_after
+        self.prompts = []
+
+    def generate(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        if self.quota_after is not None and len(self.prompts) > self.quota_after:
+            raise llm.QuotaExceeded("429 Resource has been exhausted.")
+        text = super().generate(prompt, generation_config)
+        if 'Problem key:' not in prompt:
+            return text
+        parts = json.loads(text)
+        return json.dumps({key: part for key, part in parts.items() if key not in self.dropped})
+
+
+@override_settings(SANDBOX_ENABLED=False)
+class BatchGenerationTests(TestCase):
+    def setUp(self):
+        for slug in ('two-sum', 'valid-anagram', 'contains-duplicate'):
+            _problem(slug)
+
+    def use(self, provider):
+        llm.set_provider(provider)
+        self.addCleanup(llm.set_provider, None)
+        return provider
+
+    def test_results_are_keyed_by_slug_and_language(self):
+        provider = self.use(_ScriptedProvider())
+        items = [('two-sum', 'python', False), ('two-sum', 'cpp', False), ('valid-anagram', 'python', False)]
+
+        results = batching.generate_and_store_many(items)
+
+        self.assertEqual(set(results), {('two-sum', 'python'), ('two-sum', 'cpp'), ('valid-anagram', 'python')})
+        self.assertTrue(all(isinstance(result, list) for result in results.values()))
+        self.assertEqual(len(provider.prompts), 1)
+        self.assertIn('Problem key: two-sum/cpp', provider.prompts[0])
+        # Each part is cached under its own single-problem prompt
+        api.generate_test_case('two-sum', language='cpp')
+        self.assertEqual(len(provider.prompts), 1)
+
+    def test_problem_missing_from_the_response_is_retried_alone(self):
+        provider = self.use(_ScriptedProvider(dropped={'valid-anagram/python'}))
+
+        with self.assertLogs('problems.batching', 'WARNING'):
+            results = batching.generate_and_store_many([('two-sum', 'python', False), ('valid-anagram', 'python', False)])
+
+        self.assertEqual(len(provider.prompts), 2)
+        self.assertNotIn('Problem key:', provider.prompts[1])
+        self.assertIsInstance(results[('valid-anagram', 'python')], list)
+        self.assertIsInstance(results[('two-sum', 'python')], list)
+
+    def test_quota_error_fails_the_batch_without_retries(self):
+        provider = self.use(_ScriptedProvider(quota_after=0))
+        items = [('two-sum', 'python', False), ('valid-anagram', 'python', False)]
+
+        with self.assertLogs('problems.batching', 'WARNING'):
+            results = batching.generate_and_store_many(items)
+
+        self.assertEqual(len(provider.prompts), 1)
+        self.assertTrue(all(isinstance(result, llm.QuotaExceeded) for result in results.values()))
+
+    def test_quota_error_stops_the_per_problem_retries(self):
+        provider = self.use(_ScriptedProvider(dropped={'valid-anagram/python', 'contains-duplicate/python'}, quota_after=1))
+        items = [('two-sum', 'python', False), ('valid-anagram', 'python', False), ('contains-duplicate', 'python', False)]
+
+        with self.assertLogs('problems.batching', 'WARNING'):
+            results = batching.generate_and_store_many(items)
+
+        # The batch, then the first retry; the second isn't attempted
+        self.assertEqual(len(provider.prompts), 2)
+        self.assertIsInstance(results[('two-sum', 'python')], list)
+        self.assertIsInstance(results[('valid-anagram', 'python')], llm.QuotaExceeded)
+        self.assertIsInstance(results[('contains-duplicate', 'python')], llm.QuotaExceeded)
@@ -4,6 +4,12 @@ from django.urls import path
 from . import views  # Import your views if you have any
 
 urlpatterns = [
-    path('', views.get_problem_data, name='problems'),
-    path('generate-test-case/<slug:slug>/', views.generate_test_case, name='generate_test_case'),
+    path('', views.problem_list_view, name='problems'),
+    path('problems/<slug:slug>/', views.problem_detail_view, name='problem_detail'),
+    path('generate-test-case/<slug:slug>/', views.generate_test_case_view, name='generate_test_case'),
+    path('generate-test-case/<slug:slug>/stream/', views.generate_test_case_stream_view, name='generate_test_case_stream'),
+    path('test-cases/<int:pk>/<str:part>/', views.test_case_download_view, name='test_case_download'),
+    path('jobs/<int:pk>/', views.generation_job_view, name='generation_job'),
+    path('search/', views.search_view, name='search'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
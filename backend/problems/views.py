@@ -1,53 +1,262 @@
-import google.generativeai as genai
-from .models import Problem
-import os 
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, F, Max, Prefetch
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.http import require_GET
+from . import blobs, jobs, metrics, search
+from .api import DEFAULT_LANGUAGE, agenerate_test_case, astream_test_case
+from .conditional import finalize, make_etag, not_modified
+from .models import Difficulty, GenerationJob, JobStatus, Problem, TestCase, Tier
+from .pagination import InvalidCursor, keyset_page
+from .serializers import GenerationJobSerializer, ProblemSerializer, TestCaseSerializer
+from .testcases import TestCaseParseError, parse_test_cases, payload_chunks, store_test_cases
 
+@require_GET
+async def problem_list_view(request):
+    """
+    GET /?cursor=<next_cursor>&limit=<n>&fields=description,solution
+
+    Problems ordered by id with their test cases. description and solution
+    are left out (and not read from the DB) unless named in ?fields=.
+    """
+    try:
+        limit = int(request.GET.get('limit', settings.PROBLEM_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer."}, status=400)
+    limit = max(1, min(limit, settings.PROBLEM_MAX_PAGE_SIZE))
+
+    requested = set(filter(None, request.GET.get('fields', '').split(',')))
+    deferred = [name for name in ProblemSerializer.DEFERRABLE_FIELDS if name not in requested]
 
-api_key = os.getenv("API_KEY")
+    # Two queries per page: the problems, then all of their test cases
+    # (metadata only; payloads are fetched from each test case's download URL)
+    test_cases = TestCase.objects.defer(*TestCase.PAYLOADS.values())
+    queryset = Problem.objects.defer(*deferred).prefetch_related(Prefetch('test_cases', queryset=test_cases))
+    try:
+        problems, next_cursor = await keyset_page(queryset, request.GET.get('cursor'), limit)
+    except InvalidCursor as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    serializer = ProblemSerializer(problems, many=True, exclude=deferred, context={'inline_payloads': False})
+    # ConditionalGetMiddleware derives the ETag from the body here
+    return finalize(JsonResponse({"results": serializer.data, "next_cursor": next_cursor}), 'problems')
 
-def get_problem_data(slug):
+@require_GET
+async def search_view(request):
+    """
+    GET /search/?q=<terms>&type=problems|test_cases&limit=<n>
+
+    Ranked full-text matches, best first.
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({"error": "q is required."}, status=400)
     try:
-        problem = Problem.objects.get(slug=slug)
-        return {
-            "title": problem.title,
-            "description": problem.description,
-            "difficulty": problem.difficulty,
-            "solution": problem.solution,
-        }
-    except Problem.DoesNotExist:
-        return None
-
-def format_prompt(problem_data):
-    prompt = f"""
-    You are a highly capable coding assistant. Your task is to generate a comprehensive test case for the following problem:
-
-    Title: {problem_data['title']}
-    Difficulty: {problem_data['difficulty']}
-    Description: {problem_data['description']}
-
-    Here is a Python solution to the problem:
-    {problem_data['solution']}
-
-    Please provide a comprehensive test case with inputs and expected outputs for this problem. Return one easy test case where it is simple and short, one of medium size where it gets a little bit more complex
-    then return a super complex test case, advanced and pretty long relative to the problem, also provide two edge cases that the problem can have for a total of 5 test cases.
-    """
-    return prompt
-
-def generate_test_case(slug):
-    # Fetch problem data
-    problem_data = get_problem_data(slug)
-    if not problem_data:
-        return f"Problem with slug '{slug}' not found."
-
-    # Format the prompt
-    prompt = format_prompt(problem_data)
-
-    # Configure Gemini API
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(model_name="gemini-1.5-flash")
-
-    # Generate content based on the prompt
-    response = model.generate_content(prompt)
-
-    # Return the generated text
-    return response.text
+        limit = int(request.GET.get('limit', settings.SEARCH_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer."}, status=400)
+    limit = max(1, min(limit, settings.PROBLEM_MAX_PAGE_SIZE))
+
+    kind = request.GET.get('type', 'problems')
+    if kind == 'problems':
+        queryset = search.ranked(Problem.objects.all(), query).values('id', 'slug', 'title', 'difficulty', 'rank')
+        label = ('difficulty', Difficulty)
+    elif kind == 'test_cases':
+        queryset = search.ranked(TestCase.objects.all(), query).values(
+            'id', 'tier', 'rank', problem_slug=F('problem__slug'),
+        )
+        label = ('tier', Tier)
+    else:
+        return JsonResponse({"error": "type must be 'problems' or 'test_cases'."}, status=400)
+
+    field, choices = label
+    results = [{**row, field: choices(row[field]).label} async for row in queryset[:limit]]
+    return finalize(JsonResponse({"query": query, "type": kind, "results": results}), 'search')
+
+def test_case_validators(slug, count, max_id, updated_at):
+    # store_test_cases replaces the whole set with fresh ids, so the count,
+    # the highest id and the newest edit identify one version of it
+    return make_etag("test_cases", slug, count, max_id, updated_at), updated_at
+
+@require_GET
+async def problem_detail_view(request, slug):
+    # One indexed lookup decides a 304 before anything is loaded or serialized
+    version = await (
+        Problem.objects.filter(slug=slug)
+        .annotate(
+            test_case_count=Count('test_cases'),
+            test_case_max_id=Max('test_cases__id'),
+            test_cases_updated_at=Max('test_cases__updated_at'),
+        )
+        .values('id', 'content_hash', 'updated_at', 'test_case_count', 'test_case_max_id', 'test_cases_updated_at')
+        .afirst()
+    )
+    if version is None:
+        raise Http404("No Problem matches the given query.")
+
+    etag = make_etag("problem", *version.values())
+    last_modified = max(filter(None, [version['updated_at'], version['test_cases_updated_at']]))
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return finalize(response, 'problem_detail', etag, last_modified)
+
+    problem = await Problem.objects.prefetch_related('test_cases').aget(pk=version['id'])
+    return finalize(JsonResponse(ProblemSerializer(problem).data), 'problem_detail', etag, last_modified)
+
+@require_GET
+async def generate_test_case_view(request, slug):
+    refresh = request.GET.get('refresh') == 'true'
+    language = request.GET.get('language', DEFAULT_LANGUAGE)
+
+    test_cases = []
+    if not refresh:
+        # Hot path: validators from the problem_id index; a matching client
+        # gets a 304 without the rows being loaded
+        version = await TestCase.objects.filter(problem__slug=slug).aaggregate(
+            count=Count('id'), max_id=Max('id'), updated_at=Max('updated_at'),
+        )
+        if version['count']:
+            etag, last_modified = test_case_validators(slug, *version.values())
+            response = not_modified(request, etag, last_modified)
+            if response is not None:
+                return finalize(response, 'generate_test_case', etag, last_modified)
+            test_cases = [tc async for tc in TestCase.objects.filter(problem__slug=slug)]
+
+    if not test_cases:
+        problem = await aget_object_or_404(Problem, slug=slug)
+        if settings.GENERATION_QUEUE:
+            # A worker generates; the client polls the job's status_url
+            job, _ = await sync_to_async(jobs.enqueue)(
+                problem, language, refresh=refresh, priority=settings.GENERATION_JOB_INTERACTIVE_PRIORITY,
+            )
+            job.problem = problem
+            data = GenerationJobSerializer(job).data
+            response = JsonResponse(data, status=202)
+            response["Location"] = data["status_url"]
+            return finalize(response, 'generation_job')
+        try:
+            cases = parse_test_cases(await agenerate_test_case(slug, refresh=refresh, language=language))
+        except TestCaseParseError as e:
+            return JsonResponse({"error": f"Could not parse generated test cases: {e}"}, status=502)
+        test_cases = await sync_to_async(store_test_cases)(problem, cases)
+
+    etag, last_modified = test_case_validators(
+        slug, len(test_cases), max(tc.id for tc in test_cases), max(tc.updated_at for tc in test_cases),
+    )
+    serializer = TestCaseSerializer(test_cases, many=True)
+    return finalize(JsonResponse({"slug": slug, "test_cases": serializer.data}), 'generate_test_case', etag, last_modified)
+
+@require_GET
+async def generation_job_view(request, pk):
+    """
+    GET /jobs/<id>/
+
+    A generation job's status; once it is done, also the problem's test cases.
+    """
+    job = await aget_object_or_404(GenerationJob.objects.select_related('problem'), pk=pk)
+    data = GenerationJobSerializer(job).data
+    if job.status == JobStatus.DONE:
+        test_cases = [tc async for tc in TestCase.objects.filter(problem_id=job.problem_id)]
+        data["test_cases"] = TestCaseSerializer(test_cases, many=True).data
+    return finalize(JsonResponse(data), 'generation_job')
+
+@require_GET
+async def test_case_download_view(request, pk, part):
+    """
+    GET /test-cases/<id>/<input|expected_output>/
+
+    Streams one payload in chunks. Blob-stored payloads are sent as the
+    stored gzip bytes to clients that accept gzip, and decompressed chunk
+    by chunk otherwise; neither holds the whole payload in memory.
+    """
+    if part not in TestCase.PAYLOADS:
+        raise Http404("Unknown test case part.")
+    other = [field for name, field in TestCase.PAYLOADS.items() if name != part]
+    test_case = await aget_object_or_404(TestCase.objects.defer(*other), pk=pk)
+
+    digest = getattr(test_case, f"{part}_sha256")
+    gzipped = getattr(test_case, f"{part}_external") and 'gzip' in request.headers.get('Accept-Encoding', '')
+    # The gzip and identity bodies differ, so each gets its own strong ETag
+    etag = f'"{digest}-gzip"' if gzipped else f'"{digest}"'
+    response = not_modified(request, etag, test_case.updated_at)
+    if response is not None:
+        response["Vary"] = "Accept-Encoding"
+        return finalize(response, 'test_case_download', etag, test_case.updated_at)
+
+    if gzipped:
+        response = StreamingHttpResponse(
+            blobs.aiter_chunks(blobs.iter_chunks(digest, compressed=True)),
+            content_type="text/plain; charset=utf-8",
+        )
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = StreamingHttpResponse(
+            blobs.aiter_chunks(payload_chunks(test_case, part)),
+            content_type="text/plain; charset=utf-8",
+        )
+        response["Content-Length"] = getattr(test_case, f"{part}_size")
+    response["Vary"] = "Accept-Encoding"
+    response["Content-Disposition"] = f'attachment; filename="test-case-{pk}-{part}.txt"'
+    return finalize(response, 'test_case_download', etag, test_case.updated_at)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@require_GET
+async def generate_test_case_stream_view(request, slug):
+    """
+    GET /generate-test-case/<slug>/stream/
+
+    Server-sent events: "chunk" events with the model's text as it arrives,
+    then "complete" with the stored test cases, or "error". Streaming needs
+    the ASGI server (asgi.py); WSGI consumes an async iterator to the end
+    before sending it, so there the response is generated in one call and
+    carries only the final event.
+    """
+    problem = await aget_object_or_404(Problem, slug=slug)
+    refresh = request.GET.get('refresh') == 'true'
+    language = request.GET.get('language', DEFAULT_LANGUAGE)
+    streaming = isinstance(request, ASGIRequest)
+
+    async def events():
+        test_cases = [] if refresh else [tc async for tc in problem.test_cases.all()]
+
+        if not test_cases:
+            try:
+                if streaming:
+                    text = []
+                    async for chunk in astream_test_case(slug, refresh=refresh, language=language):
+                        text.append(chunk)
+                        yield sse_event("chunk", {"text": chunk})
+                    text = "".join(text)
+                else:
+                    text = await agenerate_test_case(slug, refresh=refresh, language=language)
+                cases = parse_test_cases(text)
+                # Inside the try: the client must always get an error or complete event
+                test_cases = await sync_to_async(store_test_cases)(problem, cases)
+            except TestCaseParseError as e:
+                yield sse_event("error", {"error": f"Could not parse generated test cases: {e}"})
+                return
+            except Exception as e:
+                yield sse_event("error", {"error": f"Generation failed: {e}"})
+                return
+
+        serializer = TestCaseSerializer(test_cases, many=True)
+        yield sse_event("complete", {"slug": slug, "test_cases": serializer.data})
+
+    if streaming:
+        response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    else:
+        response = HttpResponse("".join([event async for event in events()]), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+@require_GET
+def metrics_view(request):
+    # Prometheus scrape target; each worker process reports its own numbers
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")